@@ -0,0 +1,285 @@
+'''
+Copyright 2013 Cosnita Radu Viorel
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated 
+documentation files (the "Software"), to deal in the Software without restriction, including without limitation 
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, 
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE 
+WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR 
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, 
+ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+.. codeauthor:: Radu Viorel Cosnita <radu.cosnita@gmail.com>
+
+.. py:module:: aws.core.aws_async_http
+
+Module used to provide an asyncio http client that can execute signed requests against AWS services without blocking
+the event loop.
+'''
+from aws.core.aws_http import get_aws_response
+from urllib.parse import urlsplit
+import asyncio
+import time
+
+class AsyncAwsConnection(object):
+    '''Class used to provide a minimal HTTP/1.1 keep-alive connection on top of asyncio streams.'''
+    
+    def __init__(self, reader, writer):
+        self._reader = reader
+        self._writer = writer
+        self.released_at = None
+    
+    @property
+    def closed(self):
+        '''Property used to check if the connection was closed (by either side) so no request can be written to it.'''
+        
+        return self._writer.is_closing() or self._reader.at_eof()
+    
+    async def request(self, method, path, headers, body=None):
+        '''Method used to send a request over this connection and read the response.
+        
+        :param method: The HTTP method used for invoking the path.
+        :type method: string
+        :param path: The path (including query string) we want to invoke.
+        :type path: string
+        :param headers: A dictionary containing all headers we want to send.
+        :type headers: dict
+        :param body: The request body. Besides bytes it can be an iterable of bytes chunks which are streamed (in this
+        case the Content-Length header must be given).
+        :returns: A tuple (status, headers, content, keep_alive).'''
+        
+        if body is None:
+            body = b""
+        
+        streamed = not isinstance(body, (bytes, bytearray, memoryview))
+        
+        lines = ["%s %s HTTP/1.1" % (method, path)]
+        lines.extend("%s: %s" % (key, value) for key, value in headers.items())
+        
+        if not streamed and (body or method in ("POST", "PUT")) and \
+            not any(key.lower() == "content-length" for key in headers):
+            lines.append("Content-Length: %s" % len(body))
+        
+        head = ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+        
+        if streamed:
+            self._writer.write(head)
+            
+            for chunk in body:
+                self._writer.write(chunk)
+                await self._writer.drain()
+        else:
+            self._writer.write(head + body)
+        
+        await self._writer.drain()
+        
+        status_line = await self._reader.readline()
+        
+        if not status_line:
+            raise ConnectionResetError("Connection closed by remote host.")
+        
+        version, status = status_line.decode("latin-1").split(" ", 2)[:2]
+        status = int(status)
+        
+        resp_headers = {}
+        
+        while True:
+            line = await self._reader.readline()
+            
+            if line in (b"\r\n", b"\n", b""):
+                break
+            
+            key, value = line.decode("latin-1").split(":", 1)
+            resp_headers[key.strip().lower()] = value.strip()
+        
+        keep_alive = version == "HTTP/1.1" and resp_headers.get("connection", "").lower() != "close"
+        
+        if method == "HEAD" or status in (204, 304) or 100 <= status < 200:
+            content = b""
+        elif resp_headers.get("transfer-encoding", "").lower() == "chunked":
+            content = await self._read_chunked()
+        elif "content-length" in resp_headers:
+            content = await self._reader.readexactly(int(resp_headers["content-length"]))
+        else:
+            content = await self._reader.read()
+            keep_alive = False
+        
+        return status, resp_headers, content, keep_alive
+    
+    async def _read_chunked(self):
+        '''Method used to read a response body sent using chunked transfer encoding.'''
+        
+        chunks = []
+        
+        while True:
+            size = int((await self._reader.readline()).split(b";", 1)[0], 16)
+            
+            if size == 0:
+                break
+            
+            chunks.append(await self._reader.readexactly(size))
+            await self._reader.readline()
+        
+        # skip trailers.
+        while (await self._reader.readline()) not in (b"\r\n", b"\n", b""):
+            pass
+        
+        return b"".join(chunks)
+    
+    def close(self):
+        '''Method used to close the underlining socket.'''
+        
+        self._writer.close()
+
+class AsyncAwsConnectionPool(object):
+    '''Class used to keep a bounded number of asyncio connections per host. At most max_size connections are opened for
+    a host at any time; once the limit is reached callers wait for a connection to be released. Idle connections are
+    reused for max_idle seconds unless the remote host closed them meanwhile.'''
+    
+    def __init__(self, max_size=500, max_idle=60, connect=asyncio.open_connection, time=time):
+        '''
+        :param max_size: The maximum number of connections opened for each host.
+        :type max_size: int
+        :param max_idle: The number of seconds an idle connection is kept before being closed.
+        :type max_idle: float
+        :param connect: Coroutine used to open new streams (asyncio.open_connection signature).
+        '''
+        
+        if max_size < 1:
+            raise ValueError("Connection pool max_size must be at least 1.")
+        
+        self._max_size = max_size
+        self._max_idle = max_idle
+        self._connect = connect
+        self._time = time
+        
+        self._idle = {}
+        self._limits = {}
+    
+    async def acquire(self, host, port, ssl=None):
+        '''Method used to obtain a connection for the given host. It waits when max_size connections are already in use.
+        
+        :returns: A tuple (connection, reused).'''
+        
+        key = (host, port, bool(ssl))
+        
+        limit = self._limits.get(key)
+        
+        if limit is None:
+            limit = self._limits[key] = asyncio.Semaphore(self._max_size)
+        
+        await limit.acquire()
+        
+        try:
+            idle = self._idle.get(key)
+            now = self._time.time()
+            
+            while idle:
+                conn = idle.pop()
+                
+                if now - conn.released_at <= self._max_idle and not conn.closed:
+                    return conn, True
+                
+                conn.close()
+            
+            reader, writer = await self._connect(host, port, ssl=ssl)
+            
+            return AsyncAwsConnection(reader, writer), False
+        except BaseException:
+            limit.release()
+            raise
+    
+    def release(self, host, port, ssl, conn, reusable=True):
+        '''Method used to give a connection back to the pool once a request completed.'''
+        
+        key = (host, port, bool(ssl))
+        
+        if reusable:
+            conn.released_at = self._time.time()
+            self._idle.setdefault(key, []).append(conn)
+        else:
+            conn.close()
+        
+        self._limits[key].release()
+    
+    def close(self):
+        '''Method used to close all idle connections from the pool.'''
+        
+        idle, self._idle = self._idle, {}
+        
+        for connections in idle.values():
+            for conn in connections:
+                conn.close()
+
+class AsyncAwsHttpClient(object):
+    '''Class used to provide an asyncio aws http client. It behaves exactly like 
+    :py:class:`aws.core.aws_http.AwsHttpClient` but requests are coroutines so a single event loop can keep thousands of
+    requests in flight over pooled keep-alive connections.
+    
+    .. code-block:: python
+    
+        http_client = AsyncAwsHttpClient()
+        
+        content = await http_client.do_request(url, headers, "ReceiveMessage")
+    '''
+    
+    IDEMPOTENT_METHODS = frozenset(["GET", "HEAD", "PUT", "DELETE", "OPTIONS"])
+    
+    def __init__(self, pool=None):
+        self._pool = pool or AsyncAwsConnectionPool()
+    
+    async def do_request(self, url, headers, action, method="GET", body=None):
+        '''Method used to execute an aws http request. In case an exception occurs an aws strong type exception is thrown.
+        Otherwise the json response is returned.
+        
+        :param url: The AWS url we want to invoke through http.
+        :type url: string
+        :param headers: A dictionary containing all signed headers we want to send to aws.
+        :type headers: dict
+        :param action: The action we are currently invoking. It is used for extracting only useful part of the response.
+        :type action: string
+        :param method: The HTTP method used for invoking the url.
+        :type method: string
+        :param body: The request body (bytes or an iterable of bytes chunks streamed to aws).
+        :returns: json
+        :except: :py:class:`aws.core.aws_exceptions.AwsGenericException`
+        '''
+        
+        url_parts = urlsplit(url)
+        ssl = url_parts.scheme == "https" or None
+        port = url_parts.port or (443 if ssl else 80)
+        path = url_parts.path or "/"
+        
+        if url_parts.query:
+            path = "%s?%s" % (path, url_parts.query)
+        
+        headers = dict(headers)
+        headers.setdefault("Host", url_parts.netloc)
+        
+        while True:
+            conn, reused = await self._pool.acquire(url_parts.hostname, port, ssl)
+            reusable = False
+            
+            try:
+                status, resp_headers, content, reusable = await conn.request(method, path, headers, body)
+                break
+            except (ConnectionError, asyncio.IncompleteReadError):
+                # a reused keep-alive connection might have been closed by the server meanwhile. The request might
+                # have been processed already so only idempotent requests are sent again; streamed bodies can not be
+                # sent twice.
+                if not reused or method not in AsyncAwsHttpClient.IDEMPOTENT_METHODS or \
+                    not isinstance(body, (bytes, bytearray, memoryview, type(None))):
+                    raise
+            finally:
+                self._pool.release(url_parts.hostname, port, ssl, conn, reusable)
+        
+        return get_aws_response(status, content, action)
+    
+    def close(self):
+        '''Method used to close all idle connections.'''
+        
+        self._pool.close()
@@ -0,0 +1,158 @@
+'''
+Copyright 2013 Cosnita Radu Viorel
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated 
+documentation files (the "Software"), to deal in the Software without restriction, including without limitation 
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, 
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE 
+WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR 
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, 
+ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+.. codeauthor:: Radu Viorel Cosnita <radu.cosnita@gmail.com>
+
+.. py:module:: aws.core.aws_cache
+
+Module used to provide a bounded, thread safe cache whose entries expire after a fixed time to live. Concurrent
+lookups of a missing key are collapsed into a single load so a burst of callers results in a single aws request.
+'''
+from collections import OrderedDict
+import threading
+import time
+
+class AwsTtlCache(object):
+    '''Class used to provide a bounded cache with time to live entries. Once the cache is full the least recently used
+    entry is evicted. The cache can be shared by many clients and threads.
+    
+    .. code-block:: python
+    
+        queue_url_cache = AwsTtlCache(max_size=128, ttl=600)
+        
+        sqs_client1 = SqsClient("eu-west-1", queue_url_cache=queue_url_cache)
+        sqs_client2 = SqsClient("eu-west-1", queue_url_cache=queue_url_cache)
+    '''
+    
+    def __init__(self, max_size=1024, ttl=300, time=time):
+        '''
+        :param max_size: The maximum number of entries kept by the cache.
+        :type max_size: int
+        :param ttl: The number of seconds an entry is valid for.
+        :type ttl: float
+        '''
+        
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1.")
+        
+        self._max_size = max_size
+        self._ttl = ttl
+        self._time = time
+        
+        self._entries = OrderedDict()
+        self._loads = {}
+        self._lock = threading.Lock()
+    
+    def __len__(self):
+        return len(self._entries)
+    
+    def get(self, key):
+        '''Method used to obtain the value of a key. None is returned if the key is missing or expired.'''
+        
+        with self._lock:
+            return self._get(key)
+    
+    def _get(self, key):
+        '''Method used to obtain the value of a key. The cache lock must be held by the caller.'''
+        
+        entry = self._entries.get(key)
+        
+        if entry is None:
+            return None
+        
+        if self._time.time() >= entry[1]:
+            del self._entries[key]
+            
+            return None
+        
+        self._entries.move_to_end(key)
+        
+        return entry[0]
+    
+    def put(self, key, value):
+        '''Method used to store the value of a key for the cache time to live.'''
+        
+        with self._lock:
+            self._entries[key] = (value, self._time.time() + self._ttl)
+            self._entries.move_to_end(key)
+            
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+    
+    def get_or_load(self, key, loader):
+        '''Method used to obtain the value of a key, loading it if it is missing or expired. Only one thread loads a
+        given key at a time; the other threads asking for the same key wait for that load and receive its result or its
+        exception.
+        
+        :param key: The key we want to obtain the value for.
+        :type key: hashable
+        :param loader: A callable without arguments which returns the value of the key.
+        :type loader: callable
+        :returns: The cached or the newly loaded value.'''
+        
+        with self._lock:
+            value = self._get(key)
+            
+            if value is not None:
+                return value
+            
+            load = self._loads.get(key)
+            owner = load is None
+            
+            if owner:
+                load = self._loads[key] = [threading.Event(), None, None]
+        
+        if not owner:
+            load[0].wait()
+            
+            if load[2] is not None:
+                raise load[2]
+            
+            return load[1]
+        
+        try:
+            load[1] = loader()
+            
+            self.put(key, load[1])
+            
+            return load[1]
+        except Exception as ex:
+            load[2] = ex
+            
+            raise
+        finally:
+            with self._lock:
+                del self._loads[key]
+            
+            load[0].set()
+    
+    def invalidate(self, key):
+        '''Method used to remove a key from the cache.'''
+        
+        with self._lock:
+            self._entries.pop(key, None)
+    
+    def invalidate_value(self, value):
+        '''Method used to remove all keys whose value is equal to the given value.'''
+        
+        with self._lock:
+            for key in [key for key, entry in self._entries.items() if entry[0] == value]:
+                del self._entries[key]
+    
+    def clear(self):
+        '''Method used to remove all entries from the cache.'''
+        
+        with self._lock:
+            self._entries.clear()
\ No newline at end of file
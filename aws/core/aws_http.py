@@ -20,16 +20,160 @@ ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEAL
 Module used to provide a smart http client that can easily execute signed requests against AWS services.
 '''
 import json
+import threading
+import time
+from collections import deque
+from urllib.parse import urlsplit
 from aws.core.aws_exceptions_factory import AwsExceptionsFactory
 
+def get_aws_response(http_status, content, action):
+    '''Method used to convert a raw aws http response to the json result of the invoked action. In case the response
+    is an error an aws strong type exception is thrown.
+    
+    :param http_status: The http status code returned by aws.
+    :type http_status: int
+    :param content: The raw response body.
+    :type content: bytes
+    :param action: The action invoked against aws. It is used for extracting only useful part of the response.
+    :type action: string
+    :returns: json
+    :except: :py:class:`aws.core.aws_exceptions.AwsGenericException`
+    '''
+    
+    if http_status >= 400:
+        err_resp = json.loads(content.decode())
+        
+        raise AwsExceptionsFactory.get_exception(err_resp, http_status)
+    
+    if not content:
+        return {}
+    
+    content = json.loads(content.decode())
+    
+    return content["%sResponse" % action]["%sResult" % action]
+
+class AwsConnectionPool(object):
+    '''Class used to keep a bounded number of idle http connections per host so that consecutive requests against the
+    same AWS endpoint reuse an already opened (keep-alive) socket instead of opening a new one.
+    
+    .. code-block:: python
+    
+        import httplib2
+        
+        pool = AwsConnectionPool(httplib2.Http, max_size=10, max_idle=60)
+        
+        conn = pool.acquire("http://sqs.eu-west-1.amazonaws.com")
+        
+        try:
+            resp, content = conn.request("http://sqs.eu-west-1.amazonaws.com/", "GET")
+        finally:
+            pool.release("http://sqs.eu-west-1.amazonaws.com", conn)
+    '''
+    
+    def __init__(self, http_module, max_size=10, max_idle=60, time=time):
+        '''
+        :param http_module: Factory used to create new connections (e.g httplib2.Http).
+        :type http_module: callable
+        :param max_size: The maximum number of idle connections kept for each host.
+        :type max_size: int
+        :param max_idle: The number of seconds an idle connection is kept before being closed.
+        :type max_idle: float
+        '''
+        
+        if max_size < 1:
+            raise ValueError("Connection pool max_size must be at least 1.")
+        
+        self._http_module = http_module
+        self._max_size = max_size
+        self._max_idle = max_idle
+        self._time = time
+        
+        self._idle = {}
+        self._lock = threading.Lock()
+    
+    def acquire(self, host):
+        '''Method used to obtain a connection for the given host. An idle connection is reused if one is available,
+        otherwise a new connection is created.
+        
+        :param host: The scheme and network location of the request (e.g http://sqs.eu-west-1.amazonaws.com).
+        :type host: string
+        :returns: A connection object created by the http module.'''
+        
+        expired = []
+        conn = None
+        now = self._time.time()
+        
+        with self._lock:
+            idle = self._idle.get(host)
+            
+            while idle:
+                candidate, released_at = idle.pop()
+                
+                if now - released_at <= self._max_idle:
+                    conn = candidate
+                    break
+                
+                expired.append(candidate)
+                
+            # every connection older than the one we are reusing is expired as well.
+            while idle and now - idle[0][1] > self._max_idle:
+                expired.append(idle.popleft()[0])
+        
+        for expired_conn in expired:
+            self._close(expired_conn)
+        
+        if conn is None:
+            conn = self._http_module()
+        
+        return conn
+    
+    def release(self, host, conn, reusable=True):
+        '''Method used to give a connection back to the pool once a request completed.
+        
+        :param host: The host for which the connection was acquired.
+        :type host: string
+        :param conn: The connection previously obtained through acquire.
+        :param reusable: Flag indicating if the connection can be reused. Connections that raised errors must be discarded.
+        :type reusable: bool'''
+        
+        if reusable:
+            with self._lock:
+                idle = self._idle.setdefault(host, deque())
+                
+                if len(idle) < self._max_size:
+                    idle.append((conn, self._time.time()))
+                    return
+        
+        self._close(conn)
+        
+    def clear(self):
+        '''Method used to close all idle connections from the pool.'''
+        
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        
+        for connections in idle.values():
+            for conn, released_at in connections:
+                self._close(conn)
+    
+    def _close(self, conn):
+        '''Method used to close a connection discarded by the pool.'''
+        
+        close = getattr(conn, "close", None)
+        
+        if close is not None:
+            close()
+
 class AwsHttpClient(object):
     '''Class used to provide an aws http client that can easily handle exceptions and cast them to 
-    strong type exceptions.'''
+    strong type exceptions. Connections are kept in a :py:class:`AwsConnectionPool` so that requests against the same
+    host reuse keep-alive sockets.'''
     
-    def __init__(self, http_module):
+    def __init__(self, http_module, pool=None):
         self._http_module = http_module
+        self._pool = pool or AwsConnectionPool(http_module)
     
-    def do_request(self, url, headers, action, method="GET"):
+    def do_request(self, url, headers, action, method="GET", body=None):
         '''Method used to execute an aws http request. In case an exception occurs an aws strong type exception is thrown.
         Otherwise the json response is returned.
         
@@ -42,21 +186,26 @@ class AwsHttpClient(object):
         :type action: string
         :param method: The HTTP method used for invoking the url.
         :type method: string
+        :param body: The request body. Besides bytes it can be a file object or an iterable of bytes chunks which are 
+        streamed to aws (in this case the Content-Length header must be given).
         :returns: json
         :except: :py:class:`aws.core.aws_exceptions.AwsGenericException`
         '''
         
-        request = self._http_module()
-        resp, content = request.request(url, method, headers=headers)
+        url_parts = urlsplit(url)
+        host = "%s://%s" % (url_parts.scheme, url_parts.netloc)
         
-        if resp.status >= 400:
-            err_resp = json.loads(content.decode())
-            
-            raise AwsExceptionsFactory.get_exception(err_resp)
+        request = self._pool.acquire(host)
+        reusable = False
         
-        if not content:
-            return {}
-        
-        content = json.loads(content.decode())
+        try:
+            if body is None:
+                resp, content = request.request(url, method, headers=headers)
+            else:
+                resp, content = request.request(url, method, body=body, headers=headers)
+            
+            reusable = True
+        finally:
+            self._pool.release(host, request, reusable)
         
-        return content["%sResponse" % action]["%sResult" % action]
\ No newline at end of file
+        return get_aws_response(resp.status, content, action)
\ No newline at end of file
@@ -0,0 +1,467 @@
+'''
+Copyright 2013 Cosnita Radu Viorel
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated 
+documentation files (the "Software"), to deal in the Software without restriction, including without limitation 
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, 
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE 
+WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR 
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, 
+ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+.. codeauthor:: Radu Viorel Cosnita <radu.cosnita@gmail.com>
+
+.. py:module:: aws.core.aws_retry
+
+Module used to provide the retry layer shared by all aws clients. It classifies aws exceptions as retryable or not,
+computes capped exponential backoff delays with full jitter and slows down the send rate of a client whenever aws
+starts throttling it.
+'''
+from aws.core import aws_exceptions
+import asyncio
+import http.client
+import math
+import random
+import socket
+import threading
+import time
+
+class AwsRetryQuota(object):
+    '''Class used to provide a retry budget for a client. Each retry consumes tokens from the budget and each successful
+    request gives some of them back. Once the budget is exhausted errors are raised straight to the caller so that a
+    struggling service is not flooded with retries.'''
+    
+    def __init__(self, capacity=500, retry_cost=5, timeout_cost=10, success_refund=1):
+        '''
+        :param capacity: The maximum number of tokens available for retries.
+        :type capacity: int
+        :param retry_cost: The number of tokens consumed by a retry caused by an aws error.
+        :type retry_cost: int
+        :param timeout_cost: The number of tokens consumed by a retry caused by a network error.
+        :type timeout_cost: int
+        :param success_refund: The number of tokens given back by a request which succeeds without retries.
+        :type success_refund: int
+        '''
+        
+        self._capacity = capacity
+        self._retry_cost = retry_cost
+        self._timeout_cost = timeout_cost
+        self._success_refund = success_refund
+        
+        self._available = capacity
+        self._lock = threading.Lock()
+        
+    @property
+    def available(self):
+        '''Property used to obtain the number of tokens currently available.'''
+        
+        return self._available
+    
+    def acquire(self, network_error=False):
+        '''Method used to take the tokens required for a retry.
+        
+        :param network_error: Flag indicating if the retry is caused by a network error.
+        :type network_error: bool
+        :returns: The number of tokens taken or 0 if the budget is exhausted.'''
+        
+        cost = self._timeout_cost if network_error else self._retry_cost
+        
+        with self._lock:
+            if cost > self._available:
+                return 0
+            
+            self._available -= cost
+            
+            return cost
+            
+    def release(self, cost=0):
+        '''Method used to give tokens back after a successful request.
+        
+        :param cost: The number of tokens taken by the retries of the request. When 0 the success refund is given back.
+        :type cost: int'''
+        
+        with self._lock:
+            self._available = min(self._capacity, self._available + (cost or self._success_refund))
+
+class AwsAdaptiveRateLimiter(object):
+    '''Class used to provide an adaptive client side token bucket. The limiter is disabled until the first throttling
+    error is received. From that moment the fill rate is decreased multiplicatively with every throttling error and
+    increased additively while requests succeed. Once the fill rate becomes much larger than the rate the client
+    actually sends requests with, the limiter is disabled again.'''
+    
+    def __init__(self, min_rate=0.5, max_rate=None, beta=0.7, increase_rate=1.0, time=time):
+        '''
+        :param min_rate: The minimum number of requests per second allowed while throttled.
+        :type min_rate: float
+        :param max_rate: The maximum number of requests per second allowed while the limiter is enabled.
+        :type max_rate: float
+        :param beta: The factor the send rate is multiplied with when a throttling error is received.
+        :type beta: float
+        :param increase_rate: The number of requests per second the send rate grows with each second without throttling.
+        :type increase_rate: float
+        '''
+        
+        self._min_rate = min_rate
+        self._max_rate = max_rate
+        self._beta = beta
+        self._increase_rate = increase_rate
+        self._time = time
+        
+        self._enabled = False
+        self._fill_rate = None
+        self._tokens = 0
+        self._last_refill = None
+        self._last_increase = None
+        
+        self._measured_rate = 0
+        self._request_count = 0
+        self._last_measure = math.floor(time.time())
+        
+        self._lock = threading.Lock()
+        
+    @property
+    def enabled(self):
+        '''Property used to check if requests are currently rate limited.'''
+        
+        return self._enabled
+    
+    @property
+    def fill_rate(self):
+        '''Property used to obtain the number of requests per second currently allowed.'''
+        
+        return self._fill_rate
+    
+    def acquire(self):
+        '''Method used to take a token for sending a request. It never blocks; the caller must wait the returned number
+        of seconds before sending the request.
+        
+        :returns: The number of seconds to wait before sending the request.'''
+        
+        with self._lock:
+            now = self._time.time()
+            
+            self._measure(now)
+            
+            if not self._enabled:
+                return 0
+            
+            self._refill(now)
+            
+            self._tokens -= 1
+            
+            if self._tokens >= 0:
+                return 0
+            
+            return -self._tokens / self._fill_rate
+        
+    def on_success(self):
+        '''Method used to notify the limiter that a request succeeded.'''
+        
+        with self._lock:
+            if not self._enabled:
+                return
+            
+            now = self._time.time()
+            
+            self._refill(now)
+            self._fill_rate += self._increase_rate * (now - self._last_increase)
+            self._last_increase = now
+            
+            if self._max_rate is not None:
+                self._fill_rate = min(self._max_rate, self._fill_rate)
+            
+            if self._measured_rate and self._fill_rate > 2 * self._measured_rate:
+                self._enabled = False
+    
+    def on_throttle(self):
+        '''Method used to notify the limiter that a request was throttled. A throttle received before any request was
+        sent through the limiter is ignored since there is no send rate to decrease.'''
+        
+        with self._lock:
+            now = self._time.time()
+            
+            # until the first measurement completes the rate is estimated from the requests of the current interval.
+            rate = self._measured_rate or self._request_count / max(0.5, now - self._last_measure)
+            
+            if not rate and not self._enabled:
+                return
+            
+            if self._enabled:
+                self._refill(now)
+                rate = min(rate, self._fill_rate) if rate else self._fill_rate
+            
+            self._fill_rate = max(self._min_rate, rate * self._beta)
+            
+            if not self._enabled:
+                self._enabled = True
+                self._tokens = 0
+                self._last_refill = now
+            
+            self._tokens = min(self._tokens, self._capacity)
+            self._last_increase = now
+            
+    @property
+    def _capacity(self):
+        return max(1, self._fill_rate)
+    
+    def _refill(self, now):
+        '''Method used to add the tokens produced since last refill.'''
+        
+        self._tokens = min(self._capacity, self._tokens + (now - self._last_refill) * self._fill_rate)
+        self._last_refill = now
+        
+    def _measure(self, now):
+        '''Method used to keep an exponential moving average of the client send rate.'''
+        
+        self._request_count += 1
+        
+        bucket = math.floor(now * 2) / 2
+        
+        if bucket > self._last_measure:
+            current_rate = self._request_count / (bucket - self._last_measure)
+            
+            self._measured_rate = current_rate * 0.8 + self._measured_rate * 0.2
+            self._request_count = 0
+            self._last_measure = bucket
+
+class AwsFixedRateLimiter(object):
+    '''Class used to provide a client side token bucket with a fixed fill rate. It keeps a client under an aws quota
+    expressed per second (e.g. the ses maximum send rate).'''
+    
+    def __init__(self, max_rate, burst=None, time=time):
+        '''
+        :param max_rate: The number of tokens added each second.
+        :type max_rate: float
+        :param burst: The maximum number of tokens which can be taken at once after an idle period. When None one second
+                      worth of tokens is allowed.
+        :type burst: float
+        '''
+        
+        if max_rate <= 0:
+            raise ValueError("max_rate must be positive.")
+        
+        self._max_rate = max_rate
+        self._capacity = burst or max(1, max_rate)
+        self._time = time
+        
+        self._tokens = self._capacity
+        self._last_refill = time.time()
+        
+        self._lock = threading.Lock()
+    
+    @property
+    def max_rate(self):
+        '''Property used to obtain the number of tokens added each second.'''
+        
+        return self._max_rate
+    
+    def acquire(self, tokens=1):
+        '''Method used to take tokens for sending a request. It never blocks; the caller must wait the returned number of
+        seconds before sending the request. Tokens are reserved even when the caller has to wait so concurrent callers
+        are spread evenly.
+        
+        :returns: The number of seconds to wait before sending the request.'''
+        
+        with self._lock:
+            now = self._time.time()
+            
+            self._tokens = min(self._capacity, self._tokens + (now - self._last_refill) * self._max_rate)
+            self._last_refill = now
+            
+            self._tokens -= tokens
+            
+            if self._tokens >= 0:
+                return 0
+            
+            return -self._tokens / self._max_rate
+
+class AwsRetryPolicy(object):
+    '''Class used to retry aws requests which failed with transient errors. Delays between attempts follow capped
+    exponential backoff with full jitter so that clients throttled at the same moment do not retry in lockstep.
+    
+    .. code-block:: python
+    
+        from aws.core.aws_retry import AwsRetryPolicy
+        from aws.sqs.sqs_client import SqsClient
+        
+        retry_policy = AwsRetryPolicy(max_attempts=6, base_delay=0.1, max_delay=5, 
+                                      retryable_exceptions=SqsClient.RETRYABLE_EXCEPTIONS,
+                                      retryable_error_codes=SqsClient.RETRYABLE_ERROR_CODES)
+        
+        sqs_client = SqsClient("eu-west-1", retry_policy=retry_policy)
+    
+    Services with their own transient errors pass them using retryable_exceptions and retryable_error_codes. Network
+    errors are retried only for idempotent calls: a request whose connection failed might have been processed already.
+    '''
+    
+    RETRYABLE_EXCEPTIONS = (aws_exceptions.AwsRequestThrottledException, 
+                            aws_exceptions.AwsServiceUnavailableException,
+                            aws_exceptions.AwsInternalErrorException)
+    
+    RETRYABLE_ERROR_CODES = frozenset(["InternalError", "ServiceUnavailable", "RequestTimeout"])
+    
+    THROTTLING_EXCEPTIONS = (aws_exceptions.AwsRequestThrottledException,)
+    
+    THROTTLING_ERROR_CODES = frozenset(["RequestThrottled", "Throttling", "ThrottlingException", 
+                                        "RequestThrottledException", "RequestLimitExceeded", "SlowDown"])
+    
+    NETWORK_EXCEPTIONS = (ConnectionError, socket.timeout, http.client.HTTPException, asyncio.IncompleteReadError)
+    
+    def __init__(self, max_attempts=4, base_delay=0.05, max_delay=20, retry_quota=None, rate_limiter=None, 
+                 retryable_exceptions=(), retryable_error_codes=(), random=random, time=time):
+        '''
+        :param max_attempts: The maximum number of attempts (including the first one) made for a request.
+        :type max_attempts: int
+        :param base_delay: The delay in seconds used for computing the backoff of the first retry.
+        :type base_delay: float
+        :param max_delay: The maximum delay in seconds between two attempts.
+        :type max_delay: float
+        :param retry_quota: The retry budget of the client. By default each policy has its own budget.
+        :type retry_quota: :py:class:`AwsRetryQuota`
+        :param rate_limiter: The adaptive send rate limiter of the client. By default each policy has its own limiter.
+        :type rate_limiter: :py:class:`AwsAdaptiveRateLimiter`
+        :param retryable_exceptions: The service specific exception classes retried besides the generic aws ones.
+        :type retryable_exceptions: tuple
+        :param retryable_error_codes: The service specific error codes retried besides the generic aws ones.
+        :type retryable_error_codes: iterable
+        '''
+        
+        if max_attempts < 1:
+            raise ValueError("Retry policy max_attempts must be at least 1.")
+        
+        self._max_attempts = max_attempts
+        self._base_delay = base_delay
+        self._max_delay = max_delay
+        self._retry_quota = retry_quota or AwsRetryQuota()
+        self._rate_limiter = rate_limiter or AwsAdaptiveRateLimiter(time=time)
+        self._retryable_exceptions = AwsRetryPolicy.RETRYABLE_EXCEPTIONS + tuple(retryable_exceptions)
+        self._retryable_error_codes = AwsRetryPolicy.RETRYABLE_ERROR_CODES.union(retryable_error_codes)
+        self._random = random
+        self._time = time
+    
+    def is_throttle(self, ex):
+        '''Method used to check if the given exception means the client is sending requests too fast.'''
+        
+        if isinstance(ex, AwsRetryPolicy.THROTTLING_EXCEPTIONS):
+            return True
+        
+        return isinstance(ex, aws_exceptions.AwsGenericException) and \
+            ex.error_code in AwsRetryPolicy.THROTTLING_ERROR_CODES
+        
+    def is_retryable(self, ex, idempotent=True):
+        '''Method used to check if a request which failed with the given exception can be retried.
+        
+        :param idempotent: A flag telling if the request can be sent again safely after a network error.
+        :type idempotent: bool'''
+        
+        if isinstance(ex, AwsRetryPolicy.NETWORK_EXCEPTIONS):
+            return idempotent
+        
+        if isinstance(ex, self._retryable_exceptions):
+            return True
+        
+        if not isinstance(ex, aws_exceptions.AwsGenericException):
+            return False
+        
+        return self.is_throttle(ex) or ex.error_code in self._retryable_error_codes or \
+            (ex.http_status is not None and int(ex.http_status) >= 500)
+    
+    def get_delay(self, attempt):
+        '''Method used to compute the delay before the given retry attempt using full jitter.
+        
+        :param attempt: The number of the retry (0 for the first retry).
+        :type attempt: int
+        :returns: The number of seconds to wait.'''
+        
+        return self._random.uniform(0, min(self._max_delay, self._base_delay * 2 ** attempt))
+    
+    def call(self, func, *args, idempotent=True, **kwargs):
+        '''Method used to invoke the given function retrying it while it fails with retryable errors. Network errors are
+        retried only when idempotent is True.
+        
+        :returns: The value returned by func.
+        :except: The last exception raised by func when it can not be retried anymore.'''
+        
+        attempt = 0
+        retry_cost = 0
+        
+        while True:
+            delay = self._rate_limiter.acquire()
+            
+            if delay:
+                self._time.sleep(delay)
+            
+            try:
+                result = func(*args, **kwargs)
+            except Exception as ex:
+                cost = self._on_error(ex, attempt, idempotent)
+                
+                if not cost:
+                    raise
+                
+                retry_cost += cost
+                self._time.sleep(self.get_delay(attempt))
+                attempt += 1
+                
+                continue
+            
+            self._on_success(retry_cost)
+            
+            return result
+    
+    async def call_async(self, coro_func, *args, idempotent=True, **kwargs):
+        '''Coroutine used to await the given coroutine function retrying it while it fails with retryable errors. Network
+        errors are retried only when idempotent is True.
+        
+        :returns: The value returned by coro_func.
+        :except: The last exception raised by coro_func when it can not be retried anymore.'''
+        
+        attempt = 0
+        retry_cost = 0
+        
+        while True:
+            delay = self._rate_limiter.acquire()
+            
+            if delay:
+                await asyncio.sleep(delay)
+            
+            try:
+                result = await coro_func(*args, **kwargs)
+            except Exception as ex:
+                cost = self._on_error(ex, attempt, idempotent)
+                
+                if not cost:
+                    raise
+                
+                retry_cost += cost
+                await asyncio.sleep(self.get_delay(attempt))
+                attempt += 1
+                
+                continue
+            
+            self._on_success(retry_cost)
+            
+            return result
+        
+    def _on_error(self, ex, attempt, idempotent):
+        '''Method used to decide if a failed attempt can be retried.
+        
+        :returns: The number of retry budget tokens taken by the retry or 0 if the error must be raised.'''
+        
+        if self.is_throttle(ex):
+            self._rate_limiter.on_throttle()
+        
+        if attempt + 1 >= self._max_attempts or not self.is_retryable(ex, idempotent):
+            return 0
+        
+        return self._retry_quota.acquire(isinstance(ex, AwsRetryPolicy.NETWORK_EXCEPTIONS))
+    
+    def _on_success(self, retry_cost):
+        '''Method used to account a successful request.'''
+        
+        self._rate_limiter.on_success()
+        self._retry_quota.release(retry_cost)
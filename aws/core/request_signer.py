@@ -20,12 +20,108 @@ ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEAL
 
 from urllib.request import quote
 import binascii
+import functools
 import hashlib
+import heapq
 import hmac
+import threading
 import time
 
+EMPTY_PAYLOAD_HASH = hashlib.sha256(b"").hexdigest()
+STREAMING_PAYLOAD = "STREAMING-AWS4-HMAC-SHA256-PAYLOAD"
+STREAMING_CHUNK_ALGORITHM = "AWS4-HMAC-SHA256-PAYLOAD"
+PAYLOAD_CHUNK_SIZE = 64 * 1024
+FORM_CONTENT_TYPE = "application/x-www-form-urlencoded; charset=utf-8"
+
 def aws_quote(text_bytes):
-    return quote(text_bytes, safe="").replace('%7E', '~')
+    return quote(text_bytes, safe="~")
+
+def iter_payload(payload, chunk_size=PAYLOAD_CHUNK_SIZE):
+    '''Method used to iterate over a payload in chunks of exactly chunk_size bytes (the last chunk might be shorter).
+    
+    :param payload: A str, bytes, bytearray, memoryview, file object (opened in text or binary mode) or an iterable of
+    str / bytes chunks. Buffers are sliced without copying; file objects and iterables are consumed.
+    :param chunk_size: The size of the chunks in bytes.
+    :type chunk_size: int'''
+    
+    if payload is None:
+        return
+    
+    if isinstance(payload, str):
+        payload = payload.encode()
+    
+    if isinstance(payload, (bytes, bytearray, memoryview)):
+        payload = memoryview(payload).cast("B")
+        
+        for offset in range(0, len(payload), chunk_size):
+            yield payload[offset : offset + chunk_size]
+        
+        return
+    
+    if hasattr(payload, "read"):
+        payload = _iter_file(payload, chunk_size)
+    
+    buffer = bytearray()
+    
+    for chunk in payload:
+        if isinstance(chunk, str):
+            chunk = chunk.encode()
+        
+        if not buffer and len(chunk) == chunk_size:
+            yield chunk
+            continue
+        
+        buffer += chunk
+        
+        while len(buffer) >= chunk_size:
+            yield bytes(buffer[:chunk_size])
+            del buffer[:chunk_size]
+    
+    if buffer:
+        yield bytes(buffer)
+
+def _iter_file(file_obj, chunk_size):
+    '''Method used to read a file object in chunks until its end.'''
+    
+    while True:
+        chunk = file_obj.read(chunk_size)
+        
+        if not chunk:
+            return
+        
+        yield chunk
+
+def hash_payload(payload, chunk_size=PAYLOAD_CHUNK_SIZE):
+    '''Method used to calculate the hex encoded sha256 of a payload incrementally, without loading it in memory.
+    Seekable file objects are rewound to their original position so they can be sent afterwards; iterables are consumed
+    (use :py:meth:`AWSRequestSignerV4.sign_chunked_request` for payloads which can be read only once).
+    
+    :param payload: A str, bytes, bytearray, memoryview, file object or an iterable of str / bytes chunks.
+    :returns: The hex encoded sha256 of the payload.'''
+    
+    if not payload and isinstance(payload, (str, bytes, bytearray, type(None))):
+        return EMPTY_PAYLOAD_HASH
+    
+    position = None
+    
+    if hasattr(payload, "read") and hasattr(payload, "seekable") and payload.seekable():
+        position = payload.tell()
+    
+    hasher = hashlib.sha256()
+    
+    for chunk in iter_payload(payload, chunk_size):
+        hasher.update(chunk)
+        
+    if position is not None:
+        payload.seek(position)
+    
+    return hasher.hexdigest()
+
+@functools.lru_cache(maxsize=1024)
+def _aws_quote_key(key):
+    '''Method used to quote parameter names. Names are repeated for every request so they are quoted only once.'''
+    
+    return aws_quote(key)
 
 class AWSRequestSignerV4(object):
     '''Class used to provide the methods for signing a request using v4 algorithm.'''
@@ -37,18 +133,57 @@ class AWSRequestSignerV4(object):
         self._service = service
         
         self._request_scope = "aws4_request"
+        
+        self._date_scopes = {}
+        self._date_scopes_lock = threading.Lock()
+    
+    def _get_date_scope(self, request_date):
+        '''Method used to obtain the credential scope and the derived signing key for a given date (YYYYMMDD). Both
+        change only once per UTC day so they are cached; only the scopes of the two most recent dates are kept so that
+        requests signed right before and right after midnight do not invalidate each other.'''
+        
+        date_scope = self._date_scopes.get(request_date)
+        
+        if date_scope is not None:
+            return date_scope
+        
+        credential_scope = "%s/%s/%s/%s/%s" % (self._access_key, request_date, self._region, self._service, self._request_scope)
+        
+        digestmod = hashlib.sha256
+        kdate = hmac.new(("AWS4" + self._secret_key).encode(), request_date.encode(), digestmod).digest()
+        kregion = hmac.new(kdate, self._region.encode(), digestmod).digest()
+        kservice = hmac.new(kregion, self._service.encode(), digestmod).digest()
+        ksigning = hmac.new(kservice, self._request_scope.encode(), digestmod).digest()
+        
+        date_scope = (credential_scope, ksigning)
+        
+        with self._date_scopes_lock:
+            # the published dictionary is never mutated so readers do not need to take the lock.
+            date_scopes = dict(self._date_scopes)
+            date_scopes[request_date] = date_scope
+            
+            for date in sorted(date_scopes)[:-2]:
+                del date_scopes[date]
+            
+            self._date_scopes = date_scopes
+        
+        return date_scope
     
     def _get_credential_scope(self, request_date):
         '''Method used to obtain the credential scope string.'''
         
-        credential_scope = "%s/%s/%s/%s/%s" % (self._access_key, request_date, self._region, self._service, self._request_scope)
-        credential_scope = credential_scope
-                
-        return credential_scope
+        return self._get_date_scope(request_date)[0]
                 
     def get_canonical_string(self, request_date, host, endpoint, params, headers, method, payload=""):
-        '''Method used to obtain the canonical string used to sign the aws request.'''
+        '''Method used to obtain the canonical string used to sign the aws request. The payload can be a str, bytes,
+        memoryview, file object or an iterable of chunks; it is hashed incrementally (see :py:func:`hash_payload`).'''
 
+        return self._get_canonical_request(request_date, host, endpoint, params, headers, method, payload)[0]
+    
+    def _get_canonical_request(self, request_date, host, endpoint, params, headers, method, payload="", payload_hash=None):
+        '''Method used to obtain the canonical request together with the canonical query string so that the query does
+        not have to be sorted and quoted again when the signed url is built.'''
+        
         request_date_simple = request_date[:8]
         
         params['AWSAccessKeyId'] = self._access_key
@@ -58,29 +193,22 @@ class AWSRequestSignerV4(object):
         params["X-Amz-Date"] = request_date
         
         # create canonical headers
-        lowered_headers = {key.lower(): value.strip() for key, value in headers.items()}
-        canonicalized_headers = [key + ":" + lowered_headers[key] for key in sorted(lowered_headers.keys())]
-        canonicalized_headers = "\n".join(canonicalized_headers)
-            
-        # create signed headers
-        canonicalized_signed_headers = [key for key in sorted(lowered_headers.keys())]
-        canonicalized_signed_headers = ";".join(canonicalized_signed_headers)        
+        canonicalized_headers, canonicalized_signed_headers = get_canonical_headers(headers)
     
         params["X-Amz-SignedHeaders"] = canonicalized_signed_headers    
         
         # create canonical query
-        canonicalized_query = [aws_quote(param) + '=' + aws_quote(params[param])
+        canonicalized_query = [_aws_quote_key(param) + '=' + aws_quote(params[param])
                                 for param in sorted(params.keys())]
         canonicalized_query = '&'.join(canonicalized_query)
         
-        payload_hasher = hashlib.sha256()
-        payload_hasher.update(payload.encode())
-        payload = binascii.hexlify(payload_hasher.digest())
+        if payload_hash is None:
+            payload_hash = hash_payload(payload)
         
         canonical_request = method + "\n" + endpoint + "\n" + canonicalized_query + "\n" + canonicalized_headers +  "\n\n" \
-                            + canonicalized_signed_headers + "\n" + payload.decode()
+                            + canonicalized_signed_headers + "\n" + payload_hash
         
-        return canonical_request
+        return canonical_request, canonicalized_query
     
     def get_string_to_sign(self, algorithm, request_date, canonical_request):
         '''Method used to obtain string to sign used for generating the signature.'''
@@ -98,37 +226,333 @@ class AWSRequestSignerV4(object):
         
         return "\n".join(string_to_sign)
     
+    def get_signature(self, algorithm, request_date, canonical_request):
+        '''Method used to calculate the aws v4 signature of an already built canonical request.'''
+        
+        string_to_sign = self.get_string_to_sign(algorithm, request_date, canonical_request)
+        
+        ksigning = self._get_date_scope(request_date[:8])[1]
+        
+        signature = hmac.new(ksigning, string_to_sign.encode(), hashlib.sha256).digest()
+        
+        return binascii.hexlify(signature)
+    
     def calculate_signature(self, request_date, host, endpoint, params, headers, method, payload="", time=time):
         '''Method used to calculate the aws v4 signature.'''
             
         algorithm = params["SignatureMethod"]
         
         canonical_request = self.get_canonical_string(request_date, host, endpoint, params, headers, method, payload)
-        string_to_sign = self.get_string_to_sign(algorithm, request_date, canonical_request)
         
-        request_date_simple = request_date[:8]
+        return self.get_signature(algorithm, request_date, canonical_request)
+    
+    def sign_request(self, host, endpoint, params, headers, method, payload="", time=time):
+        '''Method used to sign a given request. It returns the signed url that can be used for http request.'''
         
-        digestmod = hashlib.sha256
-        kdate = hmac.new(("AWS4" + self._secret_key).encode(), request_date_simple.encode(), digestmod).digest()
-        kregion = hmac.new(kdate, self._region.encode(), digestmod).digest()
-        kservice = hmac.new(kregion, self._service.encode(), digestmod).digest()
-        ksigning = hmac.new(kservice, self._request_scope.encode(), digestmod).digest()
+        request_date = time.strftime("%Y%m%dT%H%M%SZ", time.gmtime())
         
-        signature = hmac.new(ksigning, string_to_sign.encode(), digestmod).digest()
+        canonical_request, canonical_query = self._get_canonical_request(request_date, host, endpoint, params, headers, 
+                                                                         method, payload)
         
-        return binascii.hexlify(signature)
+        signature = self.get_signature(params["SignatureMethod"], request_date, canonical_request)
+        
+        return 'http://%s%s?%s&X-Amz-Signature=%s' % \
+                (host, endpoint, canonical_query, aws_quote(signature))
     
-    def sign_request(self, host, endpoint, params, headers, method, payload="", time=time):
-        '''Method used to sign a given request. It returns the signed url that can be used for http request.'''
+    def get_chunk_signature(self, request_date, previous_signature, chunk):
+        '''Method used to calculate the signature of a chunk sent using aws-chunked streaming mode. Each chunk signature
+        is chained to the signature of the previous chunk (or to the seed signature for the first chunk).'''
+        
+        credential_scope = self._get_credential_scope(request_date[:8])
+        credential_scope = credential_scope[credential_scope.find("/") + 1 : ]
+        
+        string_to_sign = "\n".join([STREAMING_CHUNK_ALGORITHM, request_date, credential_scope, previous_signature,
+                                    EMPTY_PAYLOAD_HASH, hashlib.sha256(chunk).hexdigest()])
+        
+        ksigning = self._get_date_scope(request_date[:8])[1]
+        
+        return hmac.new(ksigning, string_to_sign.encode(), hashlib.sha256).hexdigest()
+    
+    def sign_chunked_request(self, host, endpoint, params, headers, method, payload, decoded_length, 
+                             chunk_size=PAYLOAD_CHUNK_SIZE, time=time):
+        '''Method used to sign a request whose payload is sent using aws-chunked streaming mode. The payload is never
+        loaded in memory: it is read chunk by chunk while the request body is sent and every chunk carries its own
+        signature. The streaming headers (Content-Encoding, Content-Length, X-Amz-Content-Sha256 and
+        X-Amz-Decoded-Content-Length) are added to headers.
+        
+        :param payload: A str, bytes, memoryview, file object or an iterable of chunks.
+        :param decoded_length: The length in bytes of the payload.
+        :type decoded_length: int
+        :param chunk_size: The size of each signed chunk (at least 8 KB except for the last one).
+        :type chunk_size: int
+        :returns: A tuple (url, body) where body is an iterable of the encoded request body.'''
+        
+        headers["Content-Encoding"] = "aws-chunked"
+        headers["Content-Length"] = str(AwsChunkedPayload.get_encoded_length(decoded_length, chunk_size))
+        headers["X-Amz-Content-Sha256"] = STREAMING_PAYLOAD
+        headers["X-Amz-Decoded-Content-Length"] = str(decoded_length)
         
         request_date = time.strftime("%Y%m%dT%H%M%SZ", time.gmtime())
         
-        signature = self.calculate_signature(request_date, host, endpoint, params, headers, method, payload, time)
+        canonical_request, canonical_query = self._get_canonical_request(request_date, host, endpoint, params, headers, 
+                                                                         method, payload_hash=STREAMING_PAYLOAD)
         
-        canonical_query = [aws_quote(param) + '=' + aws_quote(params[param])
-                                for param in sorted(params.keys())]
-        canonical_query = '&'.join(canonical_query)
+        signature = self.get_signature(params["SignatureMethod"], request_date, canonical_request)
+        
+        url = 'http://%s%s?%s&X-Amz-Signature=%s' % (host, endpoint, canonical_query, aws_quote(signature))
+        
+        return url, AwsChunkedPayload(self, request_date, signature.decode(), payload, chunk_size)
+    
+    def presign_request(self, host, endpoint, params, headers, method, expires, time=time):
+        '''Method used to obtain a presigned url which can be sent many times until it expires.
+        
+        :param expires: The number of seconds (at most 604800) the url is valid for.
+        :type expires: int
+        :returns: The signed url.'''
+        
+        params["X-Amz-Expires"] = str(expires)
+        
+        return self.sign_request(host, endpoint, params, headers, method, time=time)
+    
+    def sign_form_request(self, host, endpoint, params, headers, method="POST", time=time):
+        '''Method used to sign a request whose parameters are sent as an application/x-www-form-urlencoded body
+        instead of the query string. This keeps urls short no matter how large the parameters are and the body hash is
+        part of the signature. The form Content-Type is added to headers.
+        
+        :returns: A tuple (url, body) where body is the encoded form.'''
+        
+        headers["Content-Type"] = FORM_CONTENT_TYPE
+        
+        prepared_request = AwsPreparedRequest(self, host, {"SignatureMethod": params["SignatureMethod"]}, headers)
+        
+        return prepared_request.sign_form(endpoint, params, method, time=time)
+    
+    def prepare_request(self, host, params, headers):
+        '''Method used to obtain a prepared request for signing many requests which share the same host, constant
+        parameters and headers (e.g all requests of a client).
+        
+        :param host: The aws host requests are sent to.
+        :type host: string
+        :param params: The parameters sent with every request. It must contain SignatureMethod.
+        :type params: dict
+        :param headers: The headers sent (and signed) with every request.
+        :type headers: dict
+        :rtype: :py:class:`AwsPreparedRequest`'''
+        
+        return AwsPreparedRequest(self, host, params, headers)
+    
+def _is_auth_param(key):
+    '''Method used to tell if a parameter authenticates the request and must be kept in the query string when the
+    other parameters are sent in a form body.'''
+    
+    return key.startswith("X-Amz-")
+
+def get_canonical_headers(headers):
+    '''Method used to obtain the canonical headers and the signed headers strings for the given headers.'''
+    
+    lowered_headers = {key.lower(): value.strip() for key, value in headers.items()}
+    sorted_keys = sorted(lowered_headers.keys())
+    
+    canonicalized_headers = "\n".join(key + ":" + lowered_headers[key] for key in sorted_keys)
+    canonicalized_signed_headers = ";".join(sorted_keys)
+    
+    return canonicalized_headers, canonicalized_signed_headers
 
+class AwsPreparedRequest(object):
+    '''Class used to sign requests which share the same host, constant parameters and headers. Constant parameters and
+    headers are canonicalized and quoted once; signing a request only quotes the per call parameters and merges them
+    with the constant ones in a single sorted pass. The resulting urls are identical to the ones produced by
+    :py:meth:`AWSRequestSignerV4.sign_request`.
+    
+    .. code-block:: python
+    
+        signer = AWSRequestSignerV4(access_key, secret_key, "eu-west-1", "sqs")
+        prepared_request = signer.prepare_request("sqs.eu-west-1.amazonaws.com", 
+                                                  {"Version": "2012-11-05", 
+                                                   "SignatureMethod": "AWS4-HMAC-SHA256",
+                                                   "SignatureVersion": "4"},
+                                                  {"Host": "sqs.eu-west-1.amazonaws.com"})
         
-        return 'http://%s%s?%s&X-Amz-Signature=%s' % \
-                (host, endpoint, canonical_query, aws_quote(signature))
\ No newline at end of file
+        url = prepared_request.sign("/123/test-queue", {"Action": "ReceiveMessage"}, "GET")
+    '''
+    
+    def __init__(self, signer, host, params, headers):
+        self._signer = signer
+        self._host = host
+        self._algorithm = params["SignatureMethod"]
+        self._canonical_headers, self._signed_headers = get_canonical_headers(headers)
+        
+        constant_params = dict(params)
+        constant_params["AWSAccessKeyId"] = signer._access_key
+        constant_params["X-Amz-Algorithm"] = self._algorithm
+        constant_params["X-Amz-SignedHeaders"] = self._signed_headers
+        
+        self._constant_keys = frozenset(constant_params.keys())
+        self._constant_query = [(key, _aws_quote_key(key) + "=" + aws_quote(value)) 
+                                    for key, value in sorted(constant_params.items())]
+        self._constant_auth_query = [entry for entry in self._constant_query if _is_auth_param(entry[0])]
+        self._constant_form = [entry for entry in self._constant_query if not _is_auth_param(entry[0])]
+        
+        self._date_params = (None, None)
+        
+    def _get_date_params(self, time):
+        '''Method used to obtain the request date and the quoted date dependent parameters. They change at most once
+        per second so they are cached.'''
+        
+        now = int(time.time())
+        second, date_params = self._date_params
+        
+        if second == now:
+            return date_params
+        
+        request_date = time.strftime("%Y%m%dT%H%M%SZ", time.gmtime(now))
+        quoted_date = aws_quote(request_date)
+        credential_scope = self._signer._get_credential_scope(request_date[:8])
+        
+        date_params = (request_date, [("Timestamp", "Timestamp=" + quoted_date), 
+                                      ("X-Amz-Credential", "X-Amz-Credential=" + aws_quote(credential_scope)),
+                                      ("X-Amz-Date", "X-Amz-Date=" + quoted_date)])
+        
+        self._date_params = (now, date_params)
+        
+        return date_params
+    
+    def sign(self, endpoint, params, method, payload_hash=EMPTY_PAYLOAD_HASH, time=time):
+        '''Method used to sign a request. It returns the signed url that can be used for http request.
+        
+        :param endpoint: The endpoint (path) of the request.
+        :type endpoint: string
+        :param params: The per call parameters. They take precedence over the constant parameters.
+        :type params: dict
+        :param method: The HTTP method of the request.
+        :type method: string
+        :param payload_hash: The hex encoded sha256 of the request payload.
+        :type payload_hash: string
+        :returns: The signed url.'''
+        
+        request_date, date_params = self._get_date_params(time)
+        
+        call_query = [(key, _aws_quote_key(key) + "=" + aws_quote(value)) for key, value in params.items()]
+        call_query.extend(date_params)
+        call_query.sort()
+        
+        constant_query = self._constant_query
+        
+        if not self._constant_keys.isdisjoint(params):
+            constant_query = [entry for entry in constant_query if entry[0] not in params]
+        
+        canonical_query = "&".join(entry[1] for entry in heapq.merge(constant_query, call_query))
+        
+        canonical_request = method + "\n" + endpoint + "\n" + canonical_query + "\n" + self._canonical_headers + \
+                            "\n\n" + self._signed_headers + "\n" + payload_hash
+        
+        signature = self._signer.get_signature(self._algorithm, request_date, canonical_request)
+        
+        return 'http://%s%s?%s&X-Amz-Signature=%s' % (self._host, endpoint, canonical_query, signature.decode())
+    
+    def presign(self, endpoint, params, method, expires, time=time):
+        '''Method used to obtain a presigned url which can be sent many times until it expires.
+        
+        :param expires: The number of seconds (at most 604800) the url is valid for.
+        :type expires: int
+        :returns: The signed url.'''
+        
+        params = dict(params)
+        params["X-Amz-Expires"] = str(expires)
+        
+        return self.sign(endpoint, params, method, time=time)
+    
+    def sign_form(self, endpoint, params, method="POST", time=time):
+        '''Method used to sign a request whose parameters are sent as an application/x-www-form-urlencoded body. Only
+        the X-Amz-* authentication parameters remain in the query string; every other parameter (constant or per call)
+        is sent in the body whose sha256 is signed. The headers of the prepared request must contain the form
+        Content-Type.
+        
+        :param endpoint: The endpoint (path) of the request.
+        :type endpoint: string
+        :param params: The per call parameters. They take precedence over the constant parameters.
+        :type params: dict
+        :param method: The HTTP method of the request.
+        :type method: string
+        :returns: A tuple (url, body) where body is the encoded form.'''
+        
+        request_date, date_params = self._get_date_params(time)
+        
+        call_form = [(key, _aws_quote_key(key) + "=" + aws_quote(value)) for key, value in params.items()]
+        call_form.extend(entry for entry in date_params if not _is_auth_param(entry[0]))
+        call_form.sort()
+        
+        constant_form = self._constant_form
+        
+        if not self._constant_keys.isdisjoint(params):
+            constant_form = [entry for entry in constant_form if entry[0] not in params]
+        
+        body = "&".join(entry[1] for entry in heapq.merge(constant_form, call_form)).encode()
+        
+        auth_query = self._constant_auth_query + [entry for entry in date_params if _is_auth_param(entry[0])]
+        auth_query.sort()
+        
+        canonical_query = "&".join(entry[1] for entry in auth_query)
+        
+        canonical_request = method + "\n" + endpoint + "\n" + canonical_query + "\n" + self._canonical_headers + \
+                            "\n\n" + self._signed_headers + "\n" + hashlib.sha256(body).hexdigest()
+        
+        signature = self._signer.get_signature(self._algorithm, request_date, canonical_request)
+        
+        url = 'http://%s%s?%s&X-Amz-Signature=%s' % (self._host, endpoint, canonical_query, signature.decode())
+        
+        return url, body
+
+class AwsChunkedPayload(object):
+    '''Class used to provide the aws-chunked encoding of a payload. Iterating over it reads the payload chunk by chunk
+    and yields each chunk prefixed by its size and signature:
+    
+    .. code-block:: text
+    
+        <hex size>;chunk-signature=<signature>\\r\\n<chunk data>\\r\\n
+        ...
+        0;chunk-signature=<signature>\\r\\n\\r\\n
+    '''
+    
+    SIGNATURE_LENGTH = 64
+    
+    def __init__(self, signer, request_date, seed_signature, payload, chunk_size=PAYLOAD_CHUNK_SIZE):
+        self._signer = signer
+        self._request_date = request_date
+        self._seed_signature = seed_signature
+        self._payload = payload
+        self._chunk_size = chunk_size
+    
+    @staticmethod
+    def get_encoded_length(decoded_length, chunk_size=PAYLOAD_CHUNK_SIZE):
+        '''Method used to calculate the length of the aws-chunked encoding of a payload.
+        
+        :param decoded_length: The length in bytes of the payload.
+        :type decoded_length: int
+        :param chunk_size: The size of each signed chunk.
+        :type chunk_size: int
+        :returns: The encoded length in bytes.'''
+        
+        def get_chunk_length(size):
+            return len("%x" % size) + len(";chunk-signature=") + AwsChunkedPayload.SIGNATURE_LENGTH + 4 + size
+        
+        full_chunks, last_chunk = divmod(decoded_length, chunk_size)
+        
+        length = full_chunks * get_chunk_length(chunk_size) + get_chunk_length(0)
+        
+        if last_chunk:
+            length += get_chunk_length(last_chunk)
+        
+        return length
+    
+    def __iter__(self):
+        signature = self._seed_signature
+        
+        for chunk in iter_payload(self._payload, self._chunk_size):
+            signature = self._signer.get_chunk_signature(self._request_date, signature, chunk)
+            
+            yield ("%x;chunk-signature=%s\r\n" % (len(chunk), signature)).encode() + bytes(chunk) + b"\r\n"
+        
+        signature = self._signer.get_chunk_signature(self._request_date, signature, b"")
+        
+        yield ("0;chunk-signature=%s\r\n\r\n" % signature).encode()
\ No newline at end of file
@@ -0,0 +1,240 @@
+'''
+Copyright 2013 Cosnita Radu Viorel
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated 
+documentation files (the "Software"), to deal in the Software without restriction, including without limitation 
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, 
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE 
+WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR 
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, 
+ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+.. codeauthor:: Radu Viorel Cosnita <radu.cosnita@gmail.com>
+
+.. py:module:: aws.core.tests.aws_async_http
+
+Module used to provide the test suite for the asyncio aws http client.
+'''
+from aws.core.aws_async_http import AsyncAwsConnectionPool, AsyncAwsHttpClient
+from aws.core.aws_exceptions import AwsGenericException
+from aws.core.aws_exceptions_factory import AwsExceptionsFactory
+import asyncio
+import json
+import unittest
+
+class TestEx(AwsGenericException):
+    '''Just a mocked exception used in unit tests.'''
+    
+    def __init__(self, error_type, error_msg, request_id):
+        super().__init__(http_status = 403, error_type = error_type, error_code = "TestEx", 
+                         error_msg = error_msg, request_id = request_id)    
+
+class LocalAwsServer(object):
+    '''Local asyncio http server used as an AWS stand-in. It counts every socket accepted from clients and answers
+    with aws like json responses.'''
+    
+    def __init__(self, delay=0, chunked=False):
+        self.delay = delay
+        self.chunked = chunked
+        self.sockets_opened = 0
+        self.max_concurrent = 0
+        self.dropped = 0
+        
+        self._concurrent = 0
+        self._server = None
+        
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        
+        return "http://127.0.0.1:%s" % self._server.sockets[0].getsockname()[1]
+    
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+        
+    async def _handle(self, reader, writer):
+        self.sockets_opened += 1
+        
+        try:
+            while True:
+                request_line = await reader.readline()
+                
+                if not request_line:
+                    break
+                
+                while (await reader.readline()) not in (b"\r\n", b""):
+                    pass
+                
+                if request_line.split(b" ")[1].startswith(b"/drop"):
+                    # close the connection after reading the request without answering it.
+                    self.dropped += 1
+                    break
+                
+                self._concurrent += 1
+                self.max_concurrent = max(self.max_concurrent, self._concurrent)
+                
+                await asyncio.sleep(self.delay)
+                
+                self._concurrent -= 1
+                
+                path = request_line.decode().split(" ")[1]
+                
+                if path.startswith("/error"):
+                    status = "403 Forbidden"
+                    body = {"ErrorResponse": {"Error": {"Code": "TestEx", "Type": "Sender", "Message": "Test"},
+                                              "RequestId": "123"}}
+                else:
+                    status = "200 OK"
+                    body = {"SimpleResponse": {"SimpleResult": path}}
+                
+                body = json.dumps(body).encode()
+                
+                if self.chunked:
+                    middle = len(body) // 2
+                    payload = b"".join(b"%x\r\n%s\r\n" % (len(chunk), chunk) for chunk in (body[:middle], body[middle:]))
+                    
+                    writer.write(b"HTTP/1.1 " + status.encode() + b"\r\nTransfer-Encoding: chunked\r\n\r\n" + 
+                                 payload + b"0\r\n\r\n")
+                else:
+                    writer.write(b"HTTP/1.1 " + status.encode() + 
+                                 b"\r\nContent-Length: " + str(len(body)).encode() + b"\r\n\r\n" + body)
+                
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+class AsyncAwsHttpClientTests(unittest.IsolatedAsyncioTestCase):
+    '''Class used to provide all test cases for the asyncio aws http client.'''
+    
+    async def asyncSetUp(self):
+        AwsExceptionsFactory._EX_REGISTRY.clear()
+        AwsExceptionsFactory.add_exception("TestEx", TestEx)
+        
+        self._server = LocalAwsServer()
+        self._base_url = await self._server.start()
+        
+    async def asyncTearDown(self):
+        await self._server.stop()
+    
+    async def test_do_request_reuses_socket(self):
+        '''Test case for checking that sequential requests are sent over a single socket.'''
+        
+        http_client = AsyncAwsHttpClient()
+        
+        for i in range(20):
+            response = await http_client.do_request("%s/request/%s?a=b" % (self._base_url, i), {}, "Simple")
+            
+            self.assertEqual("/request/%s?a=b" % i, response)
+        
+        http_client.close()
+        
+        self.assertEqual(1, self._server.sockets_opened)
+        
+    async def test_do_request_chunked(self):
+        '''Test case for checking that chunked responses are correctly read.'''
+        
+        self._server.chunked = True
+        
+        http_client = AsyncAwsHttpClient()
+        
+        for i in range(2):
+            response = await http_client.do_request("%s/chunked" % self._base_url, {}, "Simple")
+            
+            self.assertEqual("/chunked", response)
+            
+        http_client.close()
+        
+        self.assertEqual(1, self._server.sockets_opened)
+        
+    async def test_do_request_exception(self):
+        '''Test case for checking that an http error response is correctly converted to a strong type exception.'''
+        
+        http_client = AsyncAwsHttpClient()
+        
+        with self.assertRaises(TestEx):
+            await http_client.do_request("%s/error" % self._base_url, {}, "Simple")
+        
+        http_client.close()
+    
+    async def test_do_request_concurrent(self):
+        '''Test case for checking that many concurrent requests are multiplexed on a single event loop without opening
+        more sockets than the pool allows.'''
+        
+        self._server.delay = 0.05
+        
+        http_client = AsyncAwsHttpClient(AsyncAwsConnectionPool(max_size=100))
+        
+        requests = [http_client.do_request("%s/request/%s" % (self._base_url, i), {}, "Simple") for i in range(300)]
+        responses = await asyncio.gather(*requests)
+        
+        http_client.close()
+        
+        self.assertEqual(["/request/%s" % i for i in range(300)], responses)
+        self.assertEqual(100, self._server.sockets_opened)
+        self.assertEqual(100, self._server.max_concurrent)
+        
+    async def test_do_request_stale_connection(self):
+        '''Test case for checking that a keep-alive connection closed by the server is transparently replaced.'''
+        
+        http_client = AsyncAwsHttpClient()
+        
+        await http_client.do_request("%s/first" % self._base_url, {}, "Simple")
+        
+        # drop the pooled connection so that it becomes stale.
+        port = int(self._base_url.split(":")[-1])
+        
+        for conn in http_client._pool._idle[("127.0.0.1", port, False)]:
+            conn._writer.transport.abort()
+        
+        response = await http_client.do_request("%s/second" % self._base_url, {}, "Simple")
+        
+        http_client.close()
+        
+        self.assertEqual("/second", response)
+        self.assertEqual(2, self._server.sockets_opened)
+    
+    
+    async def test_do_request_dropped_not_idempotent(self):
+        '''Test case for checking that a request which may have reached the server is sent again over a new connection
+        only when its method is idempotent.'''
+        
+        http_client = AsyncAwsHttpClient()
+        
+        for method, dropped in (("POST", 1), ("GET", 2)):
+            self._server.dropped = 0
+            
+            await http_client.do_request("%s/first" % self._base_url, {}, "Simple")
+            
+            with self.assertRaises(ConnectionError):
+                await http_client.do_request("%s/drop" % self._base_url, {}, "Simple", method, b"a=b")
+            
+            self.assertEqual(dropped, self._server.dropped)
+        
+        http_client.close()
+    
+    async def test_pool_skips_closed_connections(self):
+        '''Test case for checking that idle connections closed by the server are never reused.'''
+        
+        pool = AsyncAwsConnectionPool()
+        port = int(self._base_url.split(":")[-1])
+        
+        conn, reused = await pool.acquire("127.0.0.1", port)
+        
+        with self.assertRaises(ConnectionError):
+            await conn.request("GET", "/drop", {"Host": "127.0.0.1"})
+        
+        pool.release("127.0.0.1", port, None, conn)
+        
+        self.assertTrue(conn.closed)
+        
+        conn, reused = await pool.acquire("127.0.0.1", port)
+        pool.release("127.0.0.1", port, None, conn, False)
+        pool.close()
+        
+        self.assertFalse(reused)
\ No newline at end of file
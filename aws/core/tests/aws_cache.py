@@ -0,0 +1,117 @@
+'''
+Copyright 2013 Cosnita Radu Viorel
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated 
+documentation files (the "Software"), to deal in the Software without restriction, including without limitation 
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, 
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE 
+WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR 
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, 
+ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+.. codeauthor:: Radu Viorel Cosnita <radu.cosnita@gmail.com>
+
+.. py:module:: aws.core.tests.aws_cache
+
+Module used to provide the test suite for the aws ttl cache.
+'''
+from aws.core.aws_cache import AwsTtlCache
+import threading
+import time
+import unittest
+
+class FakeTime(object):
+    '''Time module stand-in whose clock is moved manually.'''
+    
+    def __init__(self, now):
+        self.now = now
+    
+    def time(self):
+        return self.now
+
+class AwsTtlCacheTests(unittest.TestCase):
+    '''Class used to provide all test cases for the aws ttl cache.'''
+    
+    def setUp(self):
+        self._time = FakeTime(1000)
+        self._cache = AwsTtlCache(max_size=2, ttl=60, time=self._time)
+    
+    def test_ttl(self):
+        '''Test case for making sure entries expire after their time to live.'''
+        
+        self._cache.put("a", 1)
+        
+        self._time.now += 59
+        self.assertEqual(1, self._cache.get("a"))
+        
+        self._time.now += 1
+        self.assertIsNone(self._cache.get("a"))
+        self.assertEqual(0, len(self._cache))
+    
+    def test_bounded(self):
+        '''Test case for making sure the least recently used entry is evicted once the cache is full.'''
+        
+        self._cache.put("a", 1)
+        self._cache.put("b", 2)
+        self._cache.get("a")
+        self._cache.put("c", 3)
+        
+        self.assertEqual(2, len(self._cache))
+        self.assertEqual(1, self._cache.get("a"))
+        self.assertIsNone(self._cache.get("b"))
+        self.assertEqual(3, self._cache.get("c"))
+    
+    def test_invalidate_value(self):
+        '''Test case for making sure all keys holding a value are invalidated.'''
+        
+        self._cache.put("a", "/123/q")
+        self._cache.put("b", "/123/other")
+        
+        self._cache.invalidate_value("/123/q")
+        
+        self.assertIsNone(self._cache.get("a"))
+        self.assertEqual("/123/other", self._cache.get("b"))
+    
+    def test_get_or_load_single_flight(self):
+        '''Test case for making sure concurrent lookups of the same key share a single load.'''
+        
+        cache = AwsTtlCache()
+        loads = []
+        started = threading.Event()
+        
+        def loader():
+            loads.append(1)
+            started.set()
+            time.sleep(0.1)
+            
+            return "/123/test-queue"
+        
+        results = []
+        
+        def lookup():
+            results.append(cache.get_or_load("test-queue", loader))
+        
+        threads = [threading.Thread(target=lookup) for i in range(20)]
+        
+        for thread in threads:
+            thread.start()
+        
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(1, len(loads))
+        self.assertEqual(["/123/test-queue"] * 20, results)
+    
+    def test_get_or_load_error(self):
+        '''Test case for making sure failed loads are not cached.'''
+        
+        def loader():
+            raise ValueError("load failed")
+        
+        self.assertRaises(ValueError, self._cache.get_or_load, "a", loader)
+        
+        self.assertEqual(1, self._cache.get_or_load("a", lambda: 1))
\ No newline at end of file
@@ -19,9 +19,16 @@ ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEAL
 '''
 from aws.core.aws_exceptions import AwsGenericException
 from aws.core.aws_exceptions_factory import AwsExceptionsFactory
-from aws.core.aws_http import AwsHttpClient
+from aws.core.aws_http import AwsConnectionPool, AwsHttpClient
+from aws.core.request_signer import AWSRequestSignerV4, AwsChunkedPayload
+from http.server import BaseHTTPRequestHandler, HTTPServer
 from mock import Mock
+from socketserver import ThreadingMixIn
+import hashlib
+import httplib2
+import io
 import json
+import threading
 import unittest
 
 class TestEx(AwsGenericException):
@@ -61,6 +68,24 @@ class AwsHttpClientTests(unittest.TestCase):
         
         self.assertRaises(TestEx, self._http_client.do_request, *[url, headers, action, "GET"])
         
+    def test_do_request_exception_generic(self):
+        '''Test case for checking that an unknown error code is converted to a generic exception holding the http status.'''
+        
+        resp = Mock()
+        resp.status = 503
+        
+        content = {"ErrorResponse": {"Error": 
+                                            {"Code": "Unknown", "Type": "Receiver", "Message": "Test"}, 
+                                          "RequestId": "123"}}
+        
+        self._http_cls.request = lambda url, method, headers: (resp, json.dumps(content).encode())
+        
+        with self.assertRaises(AwsGenericException) as ctx:
+            self._http_client.do_request("/aws/test", {}, "TestAction")
+            
+        self.assertEqual(503, ctx.exception.http_status)
+        self.assertEqual("Unknown", ctx.exception.error_code)
+        
     def test_do_request_no_ex(self):
         '''Test case for checking that a response is correctly retrieved when no error occurs.'''
         
@@ -95,4 +120,190 @@ class AwsHttpClientTests(unittest.TestCase):
         response = self._http_client.do_request(url, headers, action, "POST")
         
         self.assertIsNotNone(response)
-        self.assertEquals({}, response)
\ No newline at end of file
+        self.assertEquals({}, response)
+        
+class AwsConnectionPoolTests(unittest.TestCase):
+    '''Class used to provide all test cases for aws connection pool.'''
+    
+    def setUp(self):
+        self._time = Mock()
+        self._time.time = Mock(return_value=100)
+        
+        self._http_module = Mock(side_effect=lambda: Mock())
+        self._pool = AwsConnectionPool(self._http_module, max_size=2, max_idle=10, time=self._time)
+        
+    def test_acquire_reuses_released(self):
+        '''Test case for ensuring that a released connection is reused for the same host.'''
+        
+        conn = self._pool.acquire("http://host1")
+        self._pool.release("http://host1", conn)
+        
+        self.assertIs(conn, self._pool.acquire("http://host1"))
+        self.assertEqual(1, self._http_module.call_count)
+        
+    def test_acquire_per_host(self):
+        '''Test case for ensuring that connections are not shared between different hosts.'''
+        
+        conn = self._pool.acquire("http://host1")
+        self._pool.release("http://host1", conn)
+        
+        self.assertIsNot(conn, self._pool.acquire("http://host2"))
+        self.assertEqual(2, self._http_module.call_count)
+        
+    def test_acquire_idle_expired(self):
+        '''Test case for ensuring that connections idle for more than max_idle seconds are closed and not reused.'''
+        
+        conn = self._pool.acquire("http://host1")
+        self._pool.release("http://host1", conn)
+        
+        self._time.time.return_value = 111
+        
+        self.assertIsNot(conn, self._pool.acquire("http://host1"))
+        conn.close.assert_called_once_with()
+        
+    def test_release_pool_full(self):
+        '''Test case for ensuring that no more than max_size idle connections are kept for a host.'''
+        
+        connections = [self._pool.acquire("http://host1") for i in range(3)]
+        
+        for conn in connections:
+            self._pool.release("http://host1", conn)
+        
+        connections[0].close.assert_not_called()
+        connections[1].close.assert_not_called()
+        connections[2].close.assert_called_once_with()
+        
+    def test_release_not_reusable(self):
+        '''Test case for ensuring that broken connections are closed instead of being returned to the pool.'''
+        
+        conn = self._pool.acquire("http://host1")
+        self._pool.release("http://host1", conn, reusable=False)
+        
+        conn.close.assert_called_once_with()
+        self.assertIsNot(conn, self._pool.acquire("http://host1"))
+        
+    def test_clear(self):
+        '''Test case for ensuring that clear closes all idle connections.'''
+        
+        conn = self._pool.acquire("http://host1")
+        self._pool.release("http://host1", conn)
+        
+        self._pool.clear()
+        
+        conn.close.assert_called_once_with()
+        
+class CountingHttpServer(ThreadingMixIn, HTTPServer):
+    '''Local http server used as an AWS stand-in. It counts every socket accepted from clients.'''
+    
+    daemon_threads = True
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        
+        self.sockets_opened = 0
+    
+    def get_request(self):
+        request = super().get_request()
+        
+        self.sockets_opened += 1
+        
+        return request
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    '''Http handler that answers every request with a simple aws json response and keeps the connection alive.'''
+    
+    protocol_version = "HTTP/1.1"
+    
+    def do_GET(self):
+        body = json.dumps({"SimpleResponse": {"SimpleResult": self.path}}).encode()
+        
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        
+    def do_PUT(self):
+        hasher = hashlib.sha256()
+        remaining = int(self.headers["Content-Length"])
+        
+        while remaining:
+            chunk = self.rfile.read(min(remaining, 65536))
+            hasher.update(chunk)
+            remaining -= len(chunk)
+        
+        body = json.dumps({"PutResponse": {"PutResult": hasher.hexdigest()}}).encode()
+        
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, *args):
+        pass
+    
+class AwsHttpClientKeepAliveTests(unittest.TestCase):
+    '''Class used to check that aws http client reuses sockets against a local http server.'''
+    
+    def setUp(self):
+        self._server = CountingHttpServer(("127.0.0.1", 0), KeepAliveHandler)
+        self._server_thread = threading.Thread(target=self._server.serve_forever)
+        self._server_thread.daemon = True
+        self._server_thread.start()
+        
+        self._base_url = "http://127.0.0.1:%s" % self._server.server_address[1]
+        
+    def tearDown(self):
+        self._server.shutdown()
+        self._server.server_close()
+    
+    def test_do_request_reuses_socket(self):
+        '''Test case for checking that sequential requests are sent over a single socket.'''
+        
+        http_client = AwsHttpClient(httplib2.Http)
+        
+        for i in range(20):
+            response = http_client.do_request("%s/request/%s" % (self._base_url, i), {}, "Simple")
+            
+            self.assertEqual("/request/%s" % i, response)
+        
+        self.assertEqual(1, self._server.sockets_opened)
+        
+    def test_do_request_concurrent_bounded(self):
+        '''Test case for checking that concurrent requests never open more sockets than concurrent callers.'''
+        
+        num_threads = 4
+        http_client = AwsHttpClient(httplib2.Http, AwsConnectionPool(httplib2.Http, max_size=num_threads))
+        
+        def send_requests():
+            for i in range(10):
+                http_client.do_request("%s/request/%s" % (self._base_url, i), {}, "Simple")
+        
+        threads = [threading.Thread(target=send_requests) for i in range(num_threads)]
+        
+        for thread in threads:
+            thread.start()
+            
+        for thread in threads:
+            thread.join()
+        
+        self.assertLessEqual(self._server.sockets_opened, num_threads)
+        
+    def test_do_request_streamed_body(self):
+        '''Test case for checking that an aws-chunked body is streamed from a file object.'''
+        
+        payload = b"0123456789" * 100000
+        
+        signer = AWSRequestSignerV4("AKIDEXAMPLE", "wJalrXUtnFEMI/K7MDENG+bPxRfiCYEXAMPLEKEY", "eu-west-1", "s3")
+        headers = {"Host": self._base_url[len("http://"):]}
+        
+        url, body = signer.sign_chunked_request(headers["Host"], "/bucket/key", {"SignatureMethod": "AWS4-HMAC-SHA256"},
+                                                headers, "PUT", io.BytesIO(payload), len(payload))
+        
+        expected_hash = hashlib.sha256(b"".join(AwsChunkedPayload(signer, body._request_date, body._seed_signature, 
+                                                                  payload))).hexdigest()
+        
+        response = AwsHttpClient(httplib2.Http).do_request(url, headers, "Put", "PUT", body=body)
+        
+        self.assertEqual(expected_hash, response)
\ No newline at end of file
@@ -0,0 +1,323 @@
+'''
+Copyright 2013 Cosnita Radu Viorel
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated 
+documentation files (the "Software"), to deal in the Software without restriction, including without limitation 
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, 
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE 
+WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR 
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, 
+ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+.. codeauthor:: Radu Viorel Cosnita <radu.cosnita@gmail.com>
+
+.. py:module:: aws.core.tests.aws_retry
+
+Module used to provide the test suite for the aws retry layer.
+'''
+from aws.core import aws_exceptions
+from aws.core.aws_exceptions import AwsGenericException
+from aws.core.aws_retry import AwsAdaptiveRateLimiter, AwsFixedRateLimiter, AwsRetryPolicy, AwsRetryQuota
+from mock import Mock
+import unittest
+
+class FakeTime(object):
+    '''Clock stand-in which records sleeps instead of blocking.'''
+    
+    def __init__(self, now=1000.0):
+        self.now = now
+        self.sleeps = []
+        
+    def time(self):
+        return self.now
+    
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+class AwsRetryPolicyTests(unittest.TestCase):
+    '''Class used to provide all test cases for aws retry policy.'''
+    
+    def setUp(self):
+        self._time = FakeTime()
+        self._random = Mock()
+        self._random.uniform = Mock(side_effect=lambda low, high: high)
+        
+        self._policy = AwsRetryPolicy(max_attempts=4, base_delay=0.1, max_delay=0.3, random=self._random, time=self._time)
+        
+    def _throttled(self):
+        return aws_exceptions.AwsRequestThrottledException("Sender", "Rate exceeded", "123")
+        
+    def test_is_retryable(self):
+        '''Test case for ensuring transient aws and network errors are classified as retryable.'''
+        
+        retryable = [self._throttled(),
+                     aws_exceptions.AwsServiceUnavailableException("Receiver", "Unavailable", "123"),
+                     aws_exceptions.AwsInternalErrorException("Receiver", "Internal", "123"),
+                     AwsGenericException(503, "Receiver", "SomethingNew", "Unavailable", "123"),
+                     AwsGenericException(400, "Sender", "Throttling", "Rate exceeded", "123"),
+                     ConnectionResetError()]
+        
+        for ex in retryable:
+            self.assertTrue(self._policy.is_retryable(ex), ex)
+            
+    def test_is_not_retryable(self):
+        '''Test case for ensuring client errors are never retried.'''
+        
+        not_retryable = [aws_exceptions.AwsAccessDeniedException("Sender", "Denied", "123"),
+                         aws_exceptions.AwsInvalidParameterValueException("Sender", "Invalid", "123"),
+                         AwsGenericException(400, "Sender", "AWS.SimpleQueueService.InternalError", "Internal", "123"),
+                         AwsGenericException(400, "Sender", "SomethingNew", "Bad", "123"),
+                         ValueError()]
+        
+        for ex in not_retryable:
+            self.assertFalse(self._policy.is_retryable(ex), ex)
+    
+    def test_service_retryable(self):
+        '''Test case for ensuring service specific exceptions and error codes passed by the caller are retryable.'''
+        
+        class ServiceBusy(AwsGenericException):
+            pass
+        
+        policy = AwsRetryPolicy(retryable_exceptions=(ServiceBusy,), retryable_error_codes=["Service.Internal"])
+        
+        self.assertTrue(policy.is_retryable(ServiceBusy(400, "Receiver", "Busy", "Busy", "123")))
+        self.assertTrue(policy.is_retryable(AwsGenericException(400, "Receiver", "Service.Internal", "Internal", "123")))
+        self.assertTrue(policy.is_retryable(ConnectionResetError()))
+        self.assertFalse(self._policy.is_retryable(ServiceBusy(400, "Receiver", "Busy", "Busy", "123")))
+    
+    def test_network_errors_idempotent_only(self):
+        '''Test case for ensuring network errors are retried only for idempotent calls.'''
+        
+        self.assertFalse(self._policy.is_retryable(ConnectionResetError(), idempotent=False))
+        self.assertTrue(self._policy.is_retryable(self._throttled(), idempotent=False))
+        
+        func = Mock(side_effect=ConnectionResetError())
+        
+        self.assertRaises(ConnectionResetError, self._policy.call, func, idempotent=False)
+        self.assertEqual(1, func.call_count)
+        
+        func = Mock(side_effect=[self._throttled(), "result"])
+        
+        self.assertEqual("result", self._policy.call(func, idempotent=False))
+        self.assertEqual(2, func.call_count)
+    
+    def test_get_delay_capped(self):
+        '''Test case for ensuring backoff grows exponentially until max delay and uses full jitter.'''
+        
+        self.assertEqual([0.1, 0.2, 0.3, 0.3], [self._policy.get_delay(attempt) for attempt in range(4)])
+        
+        self._random.uniform.assert_called_with(0, 0.3)
+        
+    def test_call_retries_until_success(self):
+        '''Test case for ensuring retryable errors are retried with backoff until the call succeeds.'''
+        
+        func = Mock(side_effect=[ConnectionResetError(), self._throttled(), "result"])
+        
+        self.assertEqual("result", self._policy.call(func, 1, key=2))
+        
+        self.assertEqual(3, func.call_count)
+        func.assert_called_with(1, key=2)
+        self.assertEqual([0.1, 0.2], self._time.sleeps[:2])
+        
+    def test_call_not_retryable(self):
+        '''Test case for ensuring non retryable errors are raised straight away.'''
+        
+        func = Mock(side_effect=aws_exceptions.AwsAccessDeniedException("Sender", "Denied", "123"))
+        
+        self.assertRaises(aws_exceptions.AwsAccessDeniedException, self._policy.call, func)
+        self.assertEqual(1, func.call_count)
+        
+    def test_call_max_attempts(self):
+        '''Test case for ensuring the last error is raised once max attempts are exhausted.'''
+        
+        func = Mock(side_effect=aws_exceptions.AwsServiceUnavailableException("Receiver", "Unavailable", "123"))
+        
+        self.assertRaises(aws_exceptions.AwsServiceUnavailableException, self._policy.call, func)
+        self.assertEqual(4, func.call_count)
+        
+    def test_call_retry_quota_exhausted(self):
+        '''Test case for ensuring no retries are made once the retry budget is exhausted.'''
+        
+        policy = AwsRetryPolicy(retry_quota=AwsRetryQuota(capacity=10, retry_cost=5), random=self._random, 
+                                time=self._time)
+        
+        func = Mock(side_effect=aws_exceptions.AwsServiceUnavailableException("Receiver", "Unavailable", "123"))
+        
+        self.assertRaises(aws_exceptions.AwsServiceUnavailableException, policy.call, func)
+        self.assertEqual(3, func.call_count)
+        
+        func.reset_mock()
+        
+        self.assertRaises(aws_exceptions.AwsServiceUnavailableException, policy.call, func)
+        self.assertEqual(1, func.call_count)
+    
+    def test_call_throttle_enables_rate_limiter(self):
+        '''Test case for ensuring throttling errors slow down the send rate of following requests.'''
+        
+        rate_limiter = AwsAdaptiveRateLimiter(time=self._time)
+        policy = AwsRetryPolicy(rate_limiter=rate_limiter, random=self._random, time=self._time)
+        
+        self.assertFalse(rate_limiter.enabled)
+        
+        func = Mock(side_effect=[self._throttled(), "result"])
+        policy.call(func)
+        
+        self.assertTrue(rate_limiter.enabled)
+        
+class AwsRetryPolicyAsyncTests(unittest.IsolatedAsyncioTestCase):
+    '''Class used to provide test cases for the asyncio flavour of aws retry policy.'''
+    
+    async def test_call_async_retries_until_success(self):
+        '''Test case for ensuring retryable errors of coroutines are retried until success.'''
+        
+        policy = AwsRetryPolicy(base_delay=0.001, max_delay=0.001)
+        
+        results = [aws_exceptions.AwsServiceUnavailableException("Receiver", "Unavailable", "123"), "result"]
+        
+        async def func(value):
+            result = results.pop(0)
+            
+            if isinstance(result, Exception):
+                raise result
+            
+            return result + value
+        
+        self.assertEqual("result!", await policy.call_async(func, "!"))
+        self.assertEqual([], results)
+        
+class AwsRetryQuotaTests(unittest.TestCase):
+    '''Class used to provide all test cases for aws retry quota.'''
+    
+    def test_acquire_release(self):
+        '''Test case for ensuring retries consume the budget and successes give it back.'''
+        
+        quota = AwsRetryQuota(capacity=12, retry_cost=5, timeout_cost=10, success_refund=1)
+        
+        self.assertEqual(5, quota.acquire())
+        self.assertEqual(0, quota.acquire(network_error=True))
+        self.assertEqual(5, quota.acquire())
+        self.assertEqual(0, quota.acquire())
+        
+        quota.release(5)
+        quota.release()
+        
+        self.assertEqual(8, quota.available)
+        
+        quota.release(100)
+        
+        self.assertEqual(12, quota.available)
+
+class AwsAdaptiveRateLimiterTests(unittest.TestCase):
+    '''Class used to provide all test cases for aws adaptive rate limiter.'''
+    
+    def setUp(self):
+        self._time = FakeTime()
+        self._limiter = AwsAdaptiveRateLimiter(min_rate=0.5, beta=0.5, increase_rate=1.0, time=self._time)
+        
+    def _send(self, num_requests, rate):
+        delays = []
+        
+        for i in range(num_requests):
+            delays.append(self._limiter.acquire())
+            self._time.now += 1.0 / rate
+            
+        return delays
+    
+    def test_disabled_until_throttled(self):
+        '''Test case for ensuring requests are never delayed before the first throttling error.'''
+        
+        self.assertEqual([0] * 100, self._send(100, 50))
+        self.assertIsNone(self._limiter.fill_rate)
+        
+    def test_throttle_decreases_rate(self):
+        '''Test case for ensuring throttling errors decrease the send rate multiplicatively.'''
+        
+        self._send(100, 20)
+        
+        self._limiter.on_throttle()
+        
+        self.assertTrue(self._limiter.enabled)
+        self.assertAlmostEqual(10, self._limiter.fill_rate, delta=1)
+        
+        first_rate = self._limiter.fill_rate
+        
+        self._limiter.on_throttle()
+        
+        self.assertAlmostEqual(first_rate / 2, self._limiter.fill_rate)
+        
+        # a burst of requests must be spread according to the fill rate.
+        delays = [self._limiter.acquire() for i in range(5)]
+        
+        self.assertEqual(sorted(delays), delays)
+        self.assertGreater(delays[-1], 0)
+        
+    def test_success_increases_rate(self):
+        '''Test case for ensuring the send rate grows back while requests succeed.'''
+        
+        self._send(100, 20)
+        self._limiter.on_throttle()
+        
+        throttled_rate = self._limiter.fill_rate
+        
+        self._time.now += 2
+        self._limiter.on_success()
+        
+        self.assertAlmostEqual(throttled_rate + 2, self._limiter.fill_rate)
+        
+    def test_throttle_before_measurement(self):
+        '''Test case for ensuring a throttle received before the first rate measurement uses the current send rate.'''
+        
+        for i in range(10):
+            self._limiter.acquire()
+        
+        self._limiter.on_throttle()
+        
+        self.assertTrue(self._limiter.enabled)
+        self.assertAlmostEqual(10, self._limiter.fill_rate)
+    
+    def test_throttle_without_requests(self):
+        '''Test case for ensuring a throttle received before any request does not enable the limiter.'''
+        
+        self._limiter.on_throttle()
+        
+        self.assertFalse(self._limiter.enabled)
+        self.assertIsNone(self._limiter.fill_rate)
+    
+    def test_min_rate(self):
+        '''Test case for ensuring the send rate never drops under min rate.'''
+        
+        self._send(10, 20)
+        
+        for i in range(20):
+            self._limiter.on_throttle()
+        
+        self.assertEqual(0.5, self._limiter.fill_rate)
+
+class AwsFixedRateLimiterTests(unittest.TestCase):
+    '''Class used to provide all test cases for the fixed rate limiter.'''
+    
+    def setUp(self):
+        self._time = FakeTime()
+        self._limiter = AwsFixedRateLimiter(max_rate=10, burst=2, time=self._time)
+    
+    def test_burst_then_rate(self):
+        '''Test case for ensuring the burst is allowed at once and later tokens are spread at the fill rate.'''
+        
+        self.assertEqual([0, 0], [self._limiter.acquire(), self._limiter.acquire()])
+        self.assertAlmostEqual(0.1, self._limiter.acquire())
+        self.assertAlmostEqual(0.5, self._limiter.acquire(4))
+        
+        self._time.now += 2
+        
+        self.assertEqual(0, self._limiter.acquire(2))
+        self.assertAlmostEqual(0.1, self._limiter.acquire())
+    
+    def test_invalid_rate(self):
+        '''Test case for ensuring the fill rate must be positive.'''
+        
+        self.assertRaises(ValueError, AwsFixedRateLimiter, 0)
\ No newline at end of file
@@ -0,0 +1,79 @@
+'''
+Copyright 2013 Cosnita Radu Viorel
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated 
+documentation files (the "Software"), to deal in the Software without restriction, including without limitation 
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, 
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE 
+WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR 
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, 
+ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+.. codeauthor:: Radu Viorel Cosnita <radu.cosnita@gmail.com>
+
+.. py:module:: aws.core.tests.bench_request_signer
+
+Module used to provide a micro benchmark comparing the time needed to sign a request through
+:py:meth:`aws.core.request_signer.AWSRequestSignerV4.sign_request` and through a prepared request.
+
+.. code-block:: bash
+
+    python -m aws.core.tests.bench_request_signer
+'''
+from aws.core.request_signer import AWSRequestSignerV4
+import timeit
+
+HOST = "sqs.eu-west-1.amazonaws.com"
+
+GENERIC_PARAMS = {"Version": "2012-11-05",
+                  "SignatureMethod": "AWS4-HMAC-SHA256",
+                  "SignatureVersion": "4"}
+
+GENERIC_HEADERS = {"Cache-Control": "no-cache",
+                   "Content-Type": "application/json; charset=UTF-8",
+                   "Accept": "application/json",
+                   "Host": HOST}
+
+def get_scenarios():
+    '''Method used to obtain the requests signed by the benchmark.'''
+    
+    delete_params = {"Action": "DeleteMessageBatch"}
+    
+    for i in range(1, 11):
+        delete_params["DeleteMessageBatchRequestEntry.%s.Id" % i] = str(i)
+        delete_params["DeleteMessageBatchRequestEntry.%s.ReceiptHandle" % i] = "MbZj6wDWli+JvwwJaBV+3dcjk2YW2vA3+STFFljT" * 4
+        
+    return [("ReceiveMessage", "/123456789012/test-queue", {"Action": "ReceiveMessage", "MaxNumberOfMessages": "10"}),
+            ("SendMessage", "/123456789012/test-queue", {"Action": "SendMessage", "MessageBody": '{"name": "Test"}' * 20}),
+            ("DeleteMessageBatch(10)", "/123456789012/test-queue", delete_params)]
+
+def run(number=5000):
+    '''Method used to run the benchmark and print the signing time per request.'''
+    
+    signer = AWSRequestSignerV4("AKIDEXAMPLE", "wJalrXUtnFEMI/K7MDENG+bPxRfiCYEXAMPLEKEY", "eu-west-1", "sqs")
+    prepared_request = signer.prepare_request(HOST, GENERIC_PARAMS, GENERIC_HEADERS)
+    
+    print("%-25s %15s %15s %10s" % ("request", "sign_request", "prepared", "speedup"))
+    
+    for name, endpoint, params in get_scenarios():
+        def sign_request():
+            request_params = dict(GENERIC_PARAMS)
+            request_params.update(params)
+            
+            signer.sign_request(HOST, endpoint, request_params, dict(GENERIC_HEADERS), "GET")
+            
+        def sign_prepared():
+            prepared_request.sign(endpoint, params, "GET")
+        
+        generic_time = min(timeit.repeat(sign_request, number=number, repeat=3)) / number
+        prepared_time = min(timeit.repeat(sign_prepared, number=number, repeat=3)) / number
+        
+        print("%-25s %12.2f us %12.2f us %9.1fx" % (name, generic_time * 1e6, prepared_time * 1e6, 
+                                                  generic_time / prepared_time))
+
+if __name__ == "__main__":
+    run()
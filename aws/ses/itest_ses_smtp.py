@@ -15,79 +15,20 @@ ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEAL
 
 .. codeauthor:: Radu Viorel Cosnita <radu.cosnita@gmail.com>
 .. py:module:: aws.ses.itest_ses_smtp
+
+Module used to send a dummy email through aws smtp interface. Put your smtp credentials in
+:py:class:`aws.ses.ses_smtp.AwsSmtpProvider` before running it.
 '''
 
-from email import encoders
-from email.mime.base import MIMEBase
-from email.mime.multipart import MIMEMultipart
-from email.utils import COMMASPACE, formatdate
-from smtplib import SMTP
-import os
-from email.mime.text import MIMEText
+from aws.ses.ses_smtp import AwsSmtpProvider
 
-class AwsSmtpProvider(object):
-    '''Method used to provide an email provider for aws smtp interface.'''
-    
-    HOST = 'email-smtp.us-east-1.amazonaws.com'
-    PORT = 25
-    
-    USERNAME = 'Put your smtp username'
-    PASSWORD = 'Put your smtp password'
-    
-    def __init__(self):
-        self._smtp = SMTP()
-    
-    def _build_html_message(self, from_addr, to_addr, subject, body):
-        '''Method used to build a html message object that also contains attachments.'''
-        
-        assert type(to_addr) == list
-        
-        msg = MIMEMultipart("alternative")
-        msg["From"] = from_addr
-        msg["To"] = COMMASPACE.join(to_addr)
-        msg["Date"] = formatdate(localtime = True)
-        msg["Subject"] = subject
-        
-        msg.attach(MIMEText(body, "html"))
-                
-        return msg        
+def send_mail():
+    '''Method used to send a dummy mail through aws smtp interface.'''
     
-    def _build_raw_message(self, from_addr, to_addr, subject, body, files):
-        '''Method used to build a message object that also contains attachments.'''
-        
-        assert type(to_addr) == list
-        assert type(files) == list
-        
-        msg = MIMEMultipart()
-        msg["From"] = from_addr
-        msg["To"] = COMMASPACE.join(to_addr)
-        msg["Date"] = formatdate(localtime = True)
-        msg["Subject"] = subject
-        
-        msg.attach(MIMEText(body))
-        
-        for file in files:
-            part = MIMEBase("application", "octet-stream")
-            
-            with open(file, "rb") as f: 
-                part.set_payload(f.read())
-                
-            encoders.encode_base64(part)
-            
-            part.add_header("Content-Disposition", "attachment; filename=%s" % os.path.basename(file))
-            
-            msg.attach(part)
-        
-        return msg
-        
-    def send_mail(self):
-        '''Method used to send a dummy mail through aws smtp interface.'''
-        
-        files = ["/home/rcosnita/tmp/photos/100_users_2min_rampup.png"]
-        from_addr = "radu.cosnita@gmail.com"
-        to_addr = ["radu.cosnita@gmail.com"]
-        subject = "Non html message"
-        body = """\
+    from_addr = "radu.cosnita@gmail.com"
+    to_addr = ["radu.cosnita@gmail.com"]
+    subject = "Non html message"
+    body = """\
 <html>
     <head></head>
     
@@ -95,19 +36,13 @@ class AwsSmtpProvider(object):
         <h1>Simple body that also has attached files.</h1>
     </body>
 </html>"""
-        
-        try:
-            self._smtp.connect(AwsSmtpProvider.HOST, AwsSmtpProvider.PORT)
-            self._smtp.starttls()
-            self._smtp.login(AwsSmtpProvider.USERNAME, AwsSmtpProvider.PASSWORD)
-            
-            msg = self._build_html_message(from_addr, to_addr, subject, body)
-            
-            self._smtp.sendmail(from_addr, to_addr, msg.as_string())
-        finally:        
-            self._smtp.quit()
-
-if __name__ == "__main__":
+    
     email_provider = AwsSmtpProvider()
     
-    email_provider.send_mail()
\ No newline at end of file
+    try:
+        email_provider.send_mail(from_addr, to_addr, subject, body)
+    finally:
+        email_provider.close()
+
+if __name__ == "__main__":
+    send_mail()
\ No newline at end of file
@@ -0,0 +1,478 @@
+'''
+Copyright 2013 Cosnita Radu Viorel
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated 
+documentation files (the "Software"), to deal in the Software without restriction, including without limitation 
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, 
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE 
+WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR 
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, 
+ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+.. codeauthor:: Radu Viorel Cosnita <radu.cosnita@gmail.com>
+
+.. py:module:: aws.ses.ses_async_smtp
+
+Module used to provide the asyncio email sender for amazon Simple Email Service smtp interface. A single event loop can
+drive many concurrent smtp sessions.
+'''
+from aws.ses.ses_smtp import AwsSmtpBaseProvider, SmtpSessionPoolBase
+from smtplib import SMTPAuthenticationError, SMTPDataError, SMTPNotSupportedError, SMTPRecipientsRefused, \
+    SMTPResponseException, SMTPSenderRefused, SMTPServerDisconnected, quoteaddr
+import asyncio
+import base64
+import re
+import time
+
+CRLF = b"\r\n"
+
+class AsyncSmtpSession(object):
+    '''Class used to provide an asyncio smtp connection. It supports STARTTLS, AUTH PLAIN / LOGIN and sends the MAIL,
+    RCPT and DATA commands of an email in a single write when the server advertises PIPELINING. Errors are reported
+    using the :py:mod:`smtplib` exceptions.'''
+    
+    def __init__(self, reader, writer, host, timeout=30):
+        self._reader = reader
+        self._writer = writer
+        self._host = host
+        self._timeout = timeout
+        
+        self.extensions = {}
+        self.sent = 0
+        self.reused = False
+        self.last_used = None
+        self.data_started = False
+    
+    @staticmethod
+    async def connect(host, port, timeout=30):
+        '''Coroutine used to open a connection to an smtp server and to read its greeting.
+        
+        :rtype: :py:class:`AsyncSmtpSession`'''
+        
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+        
+        session = AsyncSmtpSession(reader, writer, host, timeout)
+        
+        try:
+            code, msg = await session._read_reply()
+            
+            if code != 220:
+                raise SMTPResponseException(code, msg)
+        except BaseException:
+            session.abort()
+            
+            raise
+        
+        return session
+    
+    async def _read_reply(self):
+        '''Coroutine used to read a (possibly multiline) reply.
+        
+        :returns: A tuple (code, message) where message holds the reply lines joined by new lines.'''
+        
+        lines = []
+        
+        while True:
+            try:
+                line = await asyncio.wait_for(self._reader.readline(), self._timeout)
+            except (asyncio.IncompleteReadError, ConnectionError) as ex:
+                raise SMTPServerDisconnected("Connection unexpectedly closed: %s" % ex)
+            
+            if not line:
+                raise SMTPServerDisconnected("Connection unexpectedly closed")
+            
+            lines.append(line[4:].strip())
+            
+            if line[3:4] != b"-":
+                break
+        
+        try:
+            code = int(line[:3])
+        except ValueError:
+            raise SMTPServerDisconnected("Invalid smtp reply: %r" % line)
+        
+        return code, b"\n".join(lines)
+    
+    async def _write(self, data):
+        '''Coroutine used to write data to the server and to wait until it is sent.'''
+        
+        try:
+            self._writer.write(data)
+            
+            await asyncio.wait_for(self._writer.drain(), self._timeout)
+        except ConnectionError as ex:
+            raise SMTPServerDisconnected("Connection unexpectedly closed: %s" % ex)
+    
+    async def command(self, line):
+        '''Coroutine used to send a command and to read its reply.
+        
+        :returns: A tuple (code, message).'''
+        
+        await self._write(line.encode() + CRLF)
+        
+        return await self._read_reply()
+    
+    async def ehlo(self, name="localhost"):
+        '''Coroutine used to greet the server and to record the extensions it supports.'''
+        
+        code, msg = await self.command("EHLO %s" % name)
+        
+        if code != 250:
+            raise SMTPResponseException(code, msg)
+        
+        self.extensions = {}
+        
+        for line in msg.decode("latin-1").split("\n")[1:]:
+            name, _, params = line.partition(" ")
+            
+            self.extensions[name.lower()] = params
+    
+    async def starttls(self, ssl_context):
+        '''Coroutine used to upgrade the connection to tls. The server is greeted again because the extensions it
+        supports can change.'''
+        
+        if "starttls" not in self.extensions:
+            raise SMTPNotSupportedError("STARTTLS extension not supported by server.")
+        
+        code, msg = await self.command("STARTTLS")
+        
+        if code != 220:
+            raise SMTPResponseException(code, msg)
+        
+        await self._writer.start_tls(ssl_context, server_hostname=self._host)
+        
+        await self.ehlo()
+    
+    async def login(self, username, password):
+        '''Coroutine used to authenticate using AUTH PLAIN or AUTH LOGIN.'''
+        
+        mechanisms = self.extensions.get("auth", "").upper().split()
+        
+        if "PLAIN" in mechanisms:
+            token = base64.b64encode(("\0%s\0%s" % (username, password)).encode()).decode()
+            
+            code, msg = await self.command("AUTH PLAIN %s" % token)
+        elif "LOGIN" in mechanisms:
+            code, msg = await self.command("AUTH LOGIN")
+            
+            for value in (username, password):
+                if code != 334:
+                    break
+                
+                code, msg = await self.command(base64.b64encode(value.encode()).decode())
+        else:
+            raise SMTPNotSupportedError("No suitable authentication method found.")
+        
+        if code != 235:
+            raise SMTPAuthenticationError(code, msg)
+    
+    async def noop(self):
+        '''Coroutine used to check the connection is alive.
+        
+        :returns: A tuple (code, message).'''
+        
+        return await self.command("NOOP")
+    
+    def _get_data(self, msg):
+        '''Method used to convert an email to the DATA payload: line endings become CRLF, lines starting with a dot get
+        an extra dot and the terminating dot line is added.'''
+        
+        if isinstance(msg, str):
+            msg = re.sub(r"(?:\r\n|\n|\r(?!\n))", "\r\n", msg).encode("ascii")
+        
+        msg = re.sub(br"(?m)^\.", b"..", msg)
+        
+        if not msg.endswith(CRLF):
+            msg += CRLF
+        
+        return msg + b"." + CRLF
+    
+    async def sendmail(self, from_addr, to_addrs, msg):
+        '''Coroutine used to send an email. It follows the semantic of :py:meth:`smtplib.SMTP.sendmail` and records in
+        data_started if the email content was written; an email which failed before it was not delivered. Addresses with
+        display names (e.g "News <news@example.com>") are reduced to the address, like smtplib does.
+        
+        :param from_addr: The envelope sender.
+        :type from_addr: string
+        :param to_addrs: The envelope recipients.
+        :type to_addrs: list
+        :param msg: The email content.
+        :type msg: string or bytes
+        :returns: A dictionary with an entry (code, message) for each refused recipient.'''
+        
+        self.data_started = False
+        
+        if isinstance(to_addrs, str):
+            to_addrs = [to_addrs]
+        
+        commands = ["MAIL FROM:%s" % quoteaddr(from_addr)]
+        commands.extend("RCPT TO:%s" % quoteaddr(to_addr) for to_addr in to_addrs)
+        commands.append("DATA")
+        
+        if "pipelining" in self.extensions:
+            await self._write(b"".join(command.encode() + CRLF for command in commands))
+            
+            replies = [await self._read_reply() for command in commands]
+        else:
+            replies = [await self.command(commands[0])]
+            
+            if replies[0][0] == 250:
+                for command in commands[1:-1]:
+                    replies.append(await self.command(command))
+                
+                if any(reply[0] in (250, 251) for reply in replies[1:]):
+                    replies.append(await self.command(commands[-1]))
+        
+        if replies[0][0] != 250:
+            await self._reset()
+            
+            raise SMTPSenderRefused(replies[0][0], replies[0][1], from_addr)
+        
+        refused = {}
+        
+        for to_addr, reply in zip(to_addrs, replies[1:]):
+            if reply[0] not in (250, 251):
+                refused[to_addr] = reply
+        
+        data_reply = replies[len(to_addrs) + 1] if len(replies) > len(to_addrs) + 1 else None
+        
+        if len(refused) == len(to_addrs):
+            if data_reply and data_reply[0] == 354:
+                await self._write(b"." + CRLF)
+                await self._read_reply()
+            
+            await self._reset()
+            
+            raise SMTPRecipientsRefused(refused)
+        
+        if data_reply[0] != 354:
+            await self._reset()
+            
+            raise SMTPDataError(data_reply[0], data_reply[1])
+        
+        self.data_started = True
+        
+        await self._write(self._get_data(msg))
+        
+        code, reply_msg = await self._read_reply()
+        
+        if code != 250:
+            raise SMTPDataError(code, reply_msg)
+        
+        return refused
+    
+    async def _reset(self):
+        '''Coroutine used to abort the current email transaction.'''
+        
+        await self.command("RSET")
+    
+    def abort(self):
+        '''Method used to close the connection without saying goodbye.'''
+        
+        self._writer.close()
+    
+    async def close(self):
+        '''Coroutine used to end the smtp session. Errors are ignored because the connection might be already broken.'''
+        
+        try:
+            await self.command("QUIT")
+        except (SMTPServerDisconnected, OSError, asyncio.TimeoutError):
+            pass
+        
+        self.abort()
+
+class AsyncSmtpSessionPool(SmtpSessionPoolBase):
+    '''Class used to provide a pool of logged in asyncio smtp sessions. Sessions are reused across sends according to
+    the policy of :py:class:`aws.ses.ses_smtp.SmtpSessionPoolBase` and at most max_size sessions are open at once.
+    The pool must be used from a single event loop.'''
+    
+    def __init__(self, host, port, username=None, password=None, starttls=True, max_size=4, max_messages=100, 
+                 noop_interval=5, timeout=30, ssl_context=None, time=time):
+        super().__init__(host, port, username, password, starttls, max_size, max_messages, noop_interval, timeout, 
+                         ssl_context, time)
+        
+        self._slots = asyncio.Semaphore(max_size)
+    
+    def _is_broken(self, ex):
+        '''Method used to decide if an error raised by a session leaves the connection unusable. A cancelled send leaves
+        the session in the middle of an smtp transaction.'''
+        
+        return isinstance(ex, asyncio.CancelledError) or super()._is_broken(ex)
+    
+    async def _connect(self):
+        '''Coroutine used to open and log in a new smtp session.'''
+        
+        session = await AsyncSmtpSession.connect(self._host, self._port, self._timeout)
+        
+        try:
+            await session.ehlo()
+            
+            if self._starttls:
+                await session.starttls(self._get_ssl_context())
+            
+            if self._username:
+                await session.login(self._username, self._password)
+        except BaseException:
+            session.abort()
+            
+            raise
+        
+        session.last_used = self._time.time()
+        
+        return session
+    
+    async def _is_alive(self, session):
+        '''Coroutine used to check if an idle session can be reused.'''
+        
+        if self._is_expired(session):
+            return False
+        
+        if not self._needs_check(session):
+            return True
+        
+        try:
+            return (await session.noop())[0] == 250
+        except (SMTPServerDisconnected, OSError, asyncio.TimeoutError):
+            return False
+    
+    async def acquire(self):
+        '''Coroutine used to obtain a logged in session. Idle sessions are reused when they are still alive, otherwise a
+        new session is opened. It waits while max_size sessions are in use.
+        
+        :rtype: :py:class:`AsyncSmtpSession`'''
+        
+        if self._closed:
+            raise ValueError("The smtp session pool is closed.")
+        
+        await self._slots.acquire()
+        
+        try:
+            while self._idle:
+                session = self._idle.pop()
+                
+                if await self._is_alive(session):
+                    session.reused = True
+                    
+                    return session
+                
+                await session.close()
+            
+            return await self._connect()
+        except BaseException:
+            self._slots.release()
+            
+            raise
+    
+    async def release(self, session, ex=None):
+        '''Coroutine used to give a session back to the pool.
+        
+        :param session: The session obtained from :py:meth:`acquire`.
+        :type session: :py:class:`AsyncSmtpSession`
+        :param ex: The error raised while the session was used, if any. Sessions broken by it are closed.
+        :type ex: Exception'''
+        
+        try:
+            if ex is not None and self._is_broken(ex):
+                session.abort()
+                return
+            
+            if not self._can_reuse(session):
+                await session.close()
+                return
+            
+            session.last_used = self._time.time()
+            
+            self._idle.append(session)
+        finally:
+            self._slots.release()
+    
+    async def sendmail(self, from_addr, to_addrs, msg):
+        '''Coroutine used to send an email using a pooled session. When a reused session turns out to be disconnected
+        before the email content was written the email is sent again once using a new session. Later failures are raised
+        since the server might have accepted the email already. See :py:meth:`AsyncSmtpSession.sendmail`.'''
+        
+        while True:
+            session = await self.acquire()
+            
+            try:
+                refused = await session.sendmail(from_addr, to_addrs, msg)
+            except BaseException as ex:
+                await self.release(session, ex)
+                
+                if session.reused and not session.data_started and isinstance(ex, Exception) and self._is_broken(ex):
+                    continue
+                
+                raise
+            
+            session.sent += 1
+            
+            await self.release(session)
+            
+            return refused
+    
+    async def close(self):
+        '''Coroutine used to close all idle sessions. Sessions in use are closed when they are released.'''
+        
+        self._closed = True
+        
+        sessions = list(self._idle)
+        self._idle.clear()
+        
+        await asyncio.gather(*[session.close() for session in sessions])
+
+class AsyncAwsSmtpProvider(AwsSmtpBaseProvider):
+    '''Class used to provide the asyncio email provider for aws smtp interface. Emails are built like
+    :py:class:`aws.ses.ses_smtp.AwsSmtpProvider` does and sent through an :py:class:`AsyncSmtpSessionPool`, so many
+    emails can be sent concurrently from a single event loop.
+    
+    .. code-block:: python
+    
+        provider = AsyncAwsSmtpProvider(max_size=20)
+        template = provider.create_template("news@example.com", "Hello $name", html="<p>Dear $name</p>")
+        
+        await asyncio.gather(*[provider.send_message(template.create_message([email], {"name": name}))
+                                    for email, name in recipients])
+        
+        await provider.close()
+    '''
+    
+    def __init__(self, host=AwsSmtpBaseProvider.HOST, port=AwsSmtpBaseProvider.PORT, 
+                 username=AwsSmtpBaseProvider.USERNAME, password=AwsSmtpBaseProvider.PASSWORD, pool=None, 
+                 attachment_cache=None, **pool_args):
+        '''
+        :param pool: The asyncio smtp session pool used to send emails. When None a pool is created for the given host
+                     and credentials; pool_args are passed to it.
+        :type pool: :py:class:`AsyncSmtpSessionPool`
+        :param attachment_cache: The cache of encoded attachments. When None the provider uses its own cache.
+        :type attachment_cache: :py:class:`aws.ses.ses_attachments.SesAttachmentCache`
+        '''
+        
+        super().__init__(attachment_cache)
+        
+        self._pool = pool or AsyncSmtpSessionPool(host, port, username, password, **pool_args)
+    
+    async def send_message(self, message):
+        '''Coroutine used to send an email.
+        
+        :param message: The email to send.
+        :type message: :py:class:`aws.ses.ses_domain.SesMessage`
+        :returns: A dictionary with an entry for each refused recipient.'''
+        
+        return await self._pool.sendmail(message.from_addr, message.to_addrs, message.get_content())
+    
+    async def send_mail(self, from_addr, to_addr, subject, body, files=None):
+        '''Coroutine used to send an email through aws smtp interface. The parameters are the ones of
+        :py:meth:`create_message`.
+        
+        :returns: A dictionary with an entry for each refused recipient.'''
+        
+        return await self.send_message(self.create_message(from_addr, to_addr, subject, body, files))
+    
+    async def close(self):
+        '''Coroutine used to close the smtp sessions of the provider.'''
+        
+        await self._pool.close()
\ No newline at end of file
@@ -0,0 +1,147 @@
+'''
+Copyright 2013 Cosnita Radu Viorel
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated 
+documentation files (the "Software"), to deal in the Software without restriction, including without limitation 
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, 
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE 
+WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR 
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, 
+ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+.. codeauthor:: Radu Viorel Cosnita <radu.cosnita@gmail.com>
+
+.. py:module:: aws.ses.ses_attachments
+
+Module used to provide the attachment pipeline of the ses smtp sender. Files are base64 encoded in streaming chunks and
+the encoded parts are cached so an attachment sent to many recipients is encoded once.
+'''
+from aws.core.aws_cache import AwsTtlCache
+from email.generator import Generator
+from email.mime.base import MIMEBase
+import base64
+import io
+import os
+import re
+import uuid
+
+def render_message(msg):
+    '''Method used to serialize an email like :py:meth:`email.message.Message.as_string` does, except that base64 encoded
+    payloads are spliced in one go instead of being written line by line. Serializing an email with a 10 MB attachment
+    is dominated by the line by line copy so this makes it several times faster. Each base64 payload is replaced by a
+    short marker while the email is serialized by :py:class:`email.generator.Generator` and restored afterwards.
+    
+    The rendered email is a new string so the peak memory of rendering is about twice the encoded attachments.
+    
+    :param msg: The email.
+    :type msg: :py:class:`email.message.Message`
+    :rtype: string'''
+    
+    token = uuid.uuid4().hex
+    payloads = []
+    
+    for part in msg.walk():
+        payload = part.get_payload()
+        
+        if part.is_multipart() or not isinstance(payload, str) or part.get("Content-Transfer-Encoding") != "base64":
+            continue
+        
+        part.set_payload("=_%s_%s_=" % (token, len(payloads)))
+        payloads.append((part, payload))
+    
+    fp = io.StringIO()
+    
+    try:
+        Generator(fp, mangle_from_=False, policy=msg.policy).flatten(msg)
+    finally:
+        for part, payload in payloads:
+            part.set_payload(payload)
+    
+    segments = re.split("=_%s_(\\d+)_=" % token, fp.getvalue())
+    linesep = msg.policy.linesep
+    
+    for i in range(1, len(segments), 2):
+        payload = payloads[int(segments[i])][1]
+        
+        segments[i] = payload if linesep == "\n" else payload.replace("\n", linesep)
+    
+    return "".join(segments)
+
+class SesAttachmentCache(object):
+    '''Class used to provide base64 encoded attachment parts. Files are read and encoded in chunks which are a multiple of
+    57 bytes (one 76 characters base64 line) so the raw file is never held in memory. Encoded files are cached by path,
+    modification time and size; changing a file makes the next email encode it again. Files larger than max_file_size
+    are encoded for each email and never cached so the cache memory stays bounded by max_files * max_file_size. The
+    encoded content of every attachment is held in memory while an email is sent, whether it is cached or not; the
+    pipeline does not stream attachments to the smtp connection.
+    
+    The cache is thread safe and concurrent emails attaching the same file wait for a single encoding.'''
+    
+    CHUNK_SIZE = 57 * 16 * 1024
+    
+    def __init__(self, max_files=16, max_file_size=10 * 1024 * 1024, ttl=3600):
+        '''
+        :param max_files: The maximum number of encoded files kept in memory.
+        :type max_files: int
+        :param max_file_size: The size in bytes above which files are not cached.
+        :type max_file_size: int
+        :param ttl: The number of seconds an encoded file is kept for.
+        :type ttl: float
+        '''
+        
+        self._max_file_size = max_file_size
+        self._cache = AwsTtlCache(max_files, ttl)
+    
+    def _encode(self, path):
+        '''Method used to base64 encode a file chunk by chunk.
+        
+        :returns: The encoded file split in lines of 76 characters.
+        :rtype: string'''
+        
+        chunks = []
+        
+        with open(path, "rb") as f:
+            while True:
+                chunk = f.read(SesAttachmentCache.CHUNK_SIZE)
+                
+                if not chunk:
+                    break
+                
+                chunks.append(base64.encodebytes(chunk).decode("ascii"))
+        
+        return "".join(chunks)
+    
+    def get_encoded(self, path):
+        '''Method used to obtain the base64 encoded content of a file.
+        
+        :param path: The file path.
+        :type path: string
+        :rtype: string'''
+        
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        
+        if stat.st_size > self._max_file_size:
+            return self._encode(path)
+        
+        return self._cache.get_or_load((path, stat.st_mtime_ns, stat.st_size), lambda: self._encode(path))
+    
+    def create_part(self, path):
+        '''Method used to build the mime part attaching a file to an email. The part payload is the cached encoded
+        content so building it does not copy the file.
+        
+        :param path: The file path.
+        :type path: string
+        :rtype: :py:class:`email.mime.base.MIMEBase`'''
+        
+        part = MIMEBase("application", "octet-stream")
+        part.set_payload(self.get_encoded(path))
+        
+        part["Content-Transfer-Encoding"] = "base64"
+        part.add_header("Content-Disposition", "attachment", filename=os.path.basename(path))
+        
+        return part
\ No newline at end of file
@@ -0,0 +1,159 @@
+'''
+Copyright 2013 Cosnita Radu Viorel
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated 
+documentation files (the "Software"), to deal in the Software without restriction, including without limitation 
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, 
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE 
+WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR 
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, 
+ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+.. codeauthor:: Radu Viorel Cosnita <radu.cosnita@gmail.com>
+
+.. py:module:: aws.ses.ses_bulk_sender
+
+Module used to provide a bulk email sender which spreads emails over a pool of smtp sessions while staying under the ses
+sending quota.
+'''
+from aws.core.aws_retry import AwsFixedRateLimiter
+from aws.ses.ses_domain import SesSendResult
+from concurrent.futures import ThreadPoolExecutor
+from smtplib import SMTPRecipientsRefused, SMTPResponseException
+import concurrent.futures
+import time
+
+class SesBulkSender(object):
+    '''Class used to send large numbers of emails through a :py:class:`aws.ses.ses_smtp.SmtpSessionPool`. Emails are sent
+    by max_concurrency threads, each using its own pooled session, so throughput is bounded by the ses maximum send rate
+    instead of the latency of a single connection. Ses counts its send rate in recipients so a token is taken for each
+    recipient. Transient failures (4xx replies such as "454 Throttling failure") are retried with exponential backoff.
+    
+    .. code-block:: python
+    
+        sender = SesBulkSender(smtp_pool, max_rate=14, max_concurrency=4)
+        
+        for result in sender.send(messages):
+            if not result:
+                print(result.recipient, result.error_code, result.error_msg)
+    '''
+    
+    def __init__(self, smtp_pool, max_rate, max_concurrency=4, max_attempts=3, base_delay=1, rate_limiter=None, 
+                 time=time):
+        '''
+        :param smtp_pool: The pool of smtp sessions used to send emails. It should allow max_concurrency sessions.
+        :type smtp_pool: :py:class:`aws.ses.ses_smtp.SmtpSessionPool`
+        :param max_rate: The maximum number of recipients per second (the ses maximum send rate).
+        :type max_rate: float
+        :param max_concurrency: The maximum number of emails sent concurrently.
+        :type max_concurrency: int
+        :param max_attempts: The maximum number of times an email failing with a transient error is sent.
+        :type max_attempts: int
+        :param base_delay: The number of seconds waited before the first retry. It doubles with each retry.
+        :type base_delay: float
+        :param rate_limiter: The rate limiter shared by the senders of the same ses account. When None the sender uses its
+                             own limiter of max_rate.
+        :type rate_limiter: :py:class:`aws.core.aws_retry.AwsFixedRateLimiter`
+        '''
+        
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1.")
+        
+        self._smtp_pool = smtp_pool
+        self._max_concurrency = max_concurrency
+        self._max_attempts = max_attempts
+        self._base_delay = base_delay
+        self._time = time
+        
+        self._rate_limiter = rate_limiter or AwsFixedRateLimiter(max_rate, time=time)
+    
+    def _is_transient(self, ex):
+        '''Method used to check if an email refused with the given error can be sent again later.'''
+        
+        return isinstance(ex, SMTPResponseException) and 400 <= ex.smtp_code < 500
+    
+    def _fail_message(self, message, ex):
+        '''Method used to build the failed results of all recipients of an email which could not be sent.'''
+        
+        return [SesSendResult(message, recipient, None, str(ex) or ex.__class__.__name__) 
+                    for recipient in message.to_addrs]
+    
+    def _send_message(self, message):
+        '''Method used to send a single email, waiting for the rate limiter and retrying transient failures. Any error
+        (e.g an email which can not be encoded or a closed pool) fails the recipients of the email only.
+        
+        :returns: A list with a :py:class:`aws.ses.ses_domain.SesSendResult` for each recipient.'''
+        
+        try:
+            content = message.get_content()
+        except Exception as ex:
+            return self._fail_message(message, ex)
+        
+        for attempt in range(self._max_attempts):
+            delay = self._rate_limiter.acquire(len(message.to_addrs))
+            
+            if delay:
+                self._time.sleep(delay)
+            
+            try:
+                refused = self._smtp_pool.sendmail(message.from_addr, message.to_addrs, content)
+            except SMTPRecipientsRefused as ex:
+                refused = ex.recipients
+            except SMTPResponseException as ex:
+                if self._is_transient(ex) and attempt < self._max_attempts - 1:
+                    self._time.sleep(self._base_delay * 2 ** attempt)
+                    continue
+                
+                error_msg = ex.smtp_error.decode(errors="replace") if isinstance(ex.smtp_error, bytes) else ex.smtp_error
+                
+                return [SesSendResult(message, recipient, ex.smtp_code, error_msg) for recipient in message.to_addrs]
+            except Exception as ex:
+                return self._fail_message(message, ex)
+            
+            return [self._cast_recipient_result(message, recipient, refused) for recipient in message.to_addrs]
+    
+    def _cast_recipient_result(self, message, recipient, refused):
+        '''Method used to build the result of a recipient from the refused recipients reported by the smtp server.'''
+        
+        if recipient not in refused:
+            return SesSendResult(message, recipient)
+        
+        error_code, error_msg = refused[recipient]
+        
+        return SesSendResult(message, recipient, error_code, error_msg.decode(errors="replace"))
+    
+    def send(self, messages):
+        '''Method used to send any number of emails. Messages are read from the iterable only as sending capacity
+        becomes available so huge (or lazily built) mailings keep a bounded memory footprint.
+        
+        :param messages: The emails to send.
+        :type messages: iterable of :py:class:`aws.ses.ses_domain.SesMessage`
+        :returns: A generator of :py:class:`aws.ses.ses_domain.SesSendResult`, one for each recipient, in the order the
+                  emails are sent.'''
+        
+        executor = ThreadPoolExecutor(self._max_concurrency)
+        pending = set()
+        
+        try:
+            for message in messages:
+                if len(pending) >= 2 * self._max_concurrency:
+                    done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                    
+                    for future in done:
+                        yield from future.result()
+                
+                pending.add(executor.submit(self._send_message, message))
+            
+            for future in concurrent.futures.as_completed(pending):
+                yield from future.result()
+            
+            pending = set()
+        finally:
+            for future in pending:
+                future.cancel()
+            
+            executor.shutdown(wait=True)
\ No newline at end of file
@@ -0,0 +1,68 @@
+'''
+Copyright 2013 Cosnita Radu Viorel
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated 
+documentation files (the "Software"), to deal in the Software without restriction, including without limitation 
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, 
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE 
+WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR 
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, 
+ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+.. codeauthor:: Radu Viorel Cosnita <radu.cosnita@gmail.com>
+
+.. py:module:: aws.ses.ses_domain
+
+Module used to describe the emails sent through amazon Simple Email Service and the outcome of sending them.
+'''
+from aws.ses.ses_attachments import render_message
+from email.message import Message
+
+class SesMessage(object):
+    '''This object is used to describe an email ready to be sent: the envelope sender, the envelope recipients and the
+    email content.'''
+    
+    def __init__(self, from_addr, to_addrs, content):
+        '''
+        :param from_addr: The envelope sender.
+        :type from_addr: string
+        :param to_addrs: The envelope recipients.
+        :type to_addrs: list
+        :param content: The email content.
+        :type content: string, bytes or :py:class:`email.message.Message`
+        '''
+        
+        self.from_addr = from_addr
+        self.to_addrs = to_addrs
+        self.content = content
+    
+    def get_content(self):
+        '''Method used to obtain the email content as it is sent over smtp.'''
+        
+        if isinstance(self.content, Message):
+            return render_message(self.content)
+        
+        return self.content
+
+class SesSendResult(object):
+    '''This object is used to describe the outcome of sending an email to one of its recipients. It evaluates to True
+    when the email was accepted for the recipient.'''
+    
+    def __init__(self, message, recipient, error_code=None, error_msg=None):
+        self.message = message
+        self.recipient = recipient
+        self.error_code = error_code
+        self.error_msg = error_msg
+    
+    def __bool__(self):
+        return self.error_msg is None
+    
+    def __repr__(self):
+        if self:
+            return "SesSendResult(%s, sent)" % self.recipient
+        
+        return "SesSendResult(%s, %s, %s)" % (self.recipient, self.error_code, self.error_msg)
\ No newline at end of file
@@ -0,0 +1,451 @@
+'''
+Copyright 2013 Cosnita Radu Viorel
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated 
+documentation files (the "Software"), to deal in the Software without restriction, including without limitation 
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, 
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE 
+WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR 
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, 
+ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+.. codeauthor:: Radu Viorel Cosnita <radu.cosnita@gmail.com>
+
+.. py:module:: aws.ses.ses_smtp
+
+Module used to provide the email sender for amazon Simple Email Service smtp interface. Emails are sent through a pool of
+logged in smtp sessions so the connect, STARTTLS and AUTH round trips are paid once per session instead of once per
+email.
+'''
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from email.utils import COMMASPACE, formatdate
+from aws.core.aws_retry import AwsFixedRateLimiter
+from aws.ses.ses_attachments import SesAttachmentCache
+from aws.ses.ses_bulk_sender import SesBulkSender
+from aws.ses.ses_domain import SesMessage
+from aws.ses.ses_templates import SesMessageTemplate
+from smtplib import SMTP, SMTPException, SMTPResponseException, SMTPServerDisconnected
+import collections
+import ssl
+import threading
+import time
+import uuid
+
+class SmtpSession(object):
+    '''Class used to hold a logged in smtp connection of a :py:class:`SmtpSessionPool` together with its usage.'''
+    
+    def __init__(self, smtp, created):
+        self.smtp = smtp
+        self.sent = 0
+        self.reused = False
+        self.last_used = created
+        self.data_started = False
+        
+        self._data = smtp.data
+        smtp.data = self._start_data
+    
+    def _start_data(self, msg):
+        '''Method used in place of the DATA command of the smtp connection to record that the email content is sent.'''
+        
+        self.data_started = True
+        
+        return self._data(msg)
+    
+    def sendmail(self, from_addr, to_addrs, msg):
+        '''Method used to send an email using :py:meth:`smtplib.SMTP.sendmail`. It records in data_started if the DATA
+        command was sent; an email which failed before DATA was not delivered.
+        
+        :returns: A dictionary with an entry (code, message) for each refused recipient.'''
+        
+        self.data_started = False
+        
+        return self.smtp.sendmail(from_addr, to_addrs, msg)
+    
+    def close(self):
+        '''Method used to end the smtp session. Errors are ignored because the connection might be already broken.'''
+        
+        try:
+            self.smtp.quit()
+        except (SMTPException, OSError):
+            self.smtp.close()
+
+class SmtpSessionPoolBase(object):
+    '''Class used to provide the session policy shared by the blocking and the asyncio smtp session pools: sessions are
+    checked with NOOP when they were idle for more than noop_interval seconds, dropped after an error which leaves the
+    connection unusable and recycled after max_messages emails.'''
+    
+    def __init__(self, host, port, username=None, password=None, starttls=True, max_size=4, max_messages=100, 
+                 noop_interval=5, timeout=30, ssl_context=None, time=time):
+        '''
+        :param host: The smtp server host.
+        :type host: string
+        :param port: The smtp server port.
+        :type port: int
+        :param username: The smtp username. When None no AUTH is done.
+        :type username: string
+        :param password: The smtp password.
+        :type password: string
+        :param starttls: Flag telling if the connection is upgraded to tls using STARTTLS.
+        :type starttls: bool
+        :param max_size: The maximum number of open sessions.
+        :type max_size: int
+        :param max_messages: The number of emails after which a session is closed and a new one is opened.
+        :type max_messages: int
+        :param noop_interval: The number of idle seconds after which a session is checked with NOOP before being reused.
+        :type noop_interval: float
+        :param timeout: The socket timeout in seconds.
+        :type timeout: float
+        :param ssl_context: The ssl context used by STARTTLS. When None the default context is used.
+        :type ssl_context: :py:class:`ssl.SSLContext`
+        '''
+        
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1.")
+        
+        self._host = host
+        self._port = port
+        self._username = username
+        self._password = password
+        self._starttls = starttls
+        self._max_messages = max_messages
+        self._noop_interval = noop_interval
+        self._timeout = timeout
+        self._ssl_context = ssl_context
+        self._time = time
+        
+        self._max_size = max_size
+        self._idle = collections.deque()
+        self._closed = False
+    
+    @property
+    def max_size(self):
+        '''Property used to obtain the maximum number of open sessions.'''
+        
+        return self._max_size
+    
+    def _get_ssl_context(self):
+        '''Method used to obtain the ssl context used by STARTTLS.'''
+        
+        return self._ssl_context or ssl.create_default_context()
+    
+    def _is_expired(self, session):
+        '''Method used to check if a session sent max_messages emails and must be replaced.'''
+        
+        return session.sent >= self._max_messages
+    
+    def _needs_check(self, session):
+        '''Method used to check if an idle session must be checked with NOOP before being reused.'''
+        
+        return self._time.time() - session.last_used > self._noop_interval
+    
+    def _is_broken(self, ex):
+        '''Method used to decide if an error raised by a session leaves the connection unusable. Rejected senders,
+        recipients or message contents do not break the session.'''
+        
+        if isinstance(ex, SMTPServerDisconnected):
+            return True
+        
+        if isinstance(ex, SMTPResponseException):
+            return ex.smtp_code == 421
+        
+        return isinstance(ex, OSError) and not isinstance(ex, SMTPException)
+    
+    def _can_reuse(self, session, ex=None):
+        '''Method used to check if a released session can go back to the idle sessions.'''
+        
+        return not self._closed and not (ex is not None and self._is_broken(ex)) and not self._is_expired(session)
+
+class SmtpSessionPool(SmtpSessionPoolBase):
+    '''Class used to provide a thread safe pool of logged in smtp sessions. Sessions are reused across sends and threads
+    according to the policy of :py:class:`SmtpSessionPoolBase`.'''
+    
+    def __init__(self, host, port, username=None, password=None, starttls=True, max_size=4, max_messages=100, 
+                 noop_interval=5, timeout=30, ssl_context=None, smtp_class=SMTP, time=time):
+        super().__init__(host, port, username, password, starttls, max_size, max_messages, noop_interval, timeout, 
+                         ssl_context, time)
+        
+        self._smtp_class = smtp_class
+        
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_size)
+    
+    def _connect(self):
+        '''Method used to open and log in a new smtp session.'''
+        
+        smtp = self._smtp_class(self._host, self._port, timeout=self._timeout)
+        
+        try:
+            if self._starttls:
+                smtp.starttls(context=self._get_ssl_context())
+            
+            if self._username:
+                smtp.login(self._username, self._password)
+        except Exception:
+            smtp.close()
+            
+            raise
+        
+        return SmtpSession(smtp, self._time.time())
+    
+    def _is_alive(self, session):
+        '''Method used to check if an idle session can be reused.'''
+        
+        if self._is_expired(session):
+            return False
+        
+        if not self._needs_check(session):
+            return True
+        
+        try:
+            return session.smtp.noop()[0] == 250
+        except (SMTPException, OSError):
+            return False
+    
+    def acquire(self):
+        '''Method used to obtain a logged in session. Idle sessions are reused when they are still alive, otherwise a new
+        session is opened. It blocks while max_size sessions are in use.
+        
+        :rtype: :py:class:`SmtpSession`'''
+        
+        if self._closed:
+            raise ValueError("The smtp session pool is closed.")
+        
+        self._slots.acquire()
+        
+        try:
+            while True:
+                with self._lock:
+                    session = self._idle.pop() if self._idle else None
+                
+                if session is None:
+                    return self._connect()
+                
+                if self._is_alive(session):
+                    session.reused = True
+                    
+                    return session
+                
+                session.close()
+        except Exception:
+            self._slots.release()
+            
+            raise
+    
+    def release(self, session, ex=None):
+        '''Method used to give a session back to the pool.
+        
+        :param session: The session obtained from :py:meth:`acquire`.
+        :type session: :py:class:`SmtpSession`
+        :param ex: The error raised while the session was used, if any. Sessions broken by it are closed.
+        :type ex: Exception'''
+        
+        try:
+            if not self._can_reuse(session, ex):
+                session.close()
+                return
+            
+            session.last_used = self._time.time()
+            
+            with self._lock:
+                self._idle.append(session)
+        finally:
+            self._slots.release()
+    
+    def sendmail(self, from_addr, to_addrs, msg):
+        '''Method used to send an email using a pooled session. When a reused session turns out to be disconnected (e.g
+        the server dropped it while idle) before the DATA command was sent, the email is sent again once using a new
+        session. Failures after DATA are raised since the server might have accepted the email already.
+        
+        :param from_addr: The envelope sender.
+        :type from_addr: string
+        :param to_addrs: The envelope recipients.
+        :type to_addrs: list
+        :param msg: The email content.
+        :type msg: string or bytes
+        :returns: A dictionary with an entry for each refused recipient (see :py:meth:`smtplib.SMTP.sendmail`).'''
+        
+        while True:
+            session = self.acquire()
+            
+            try:
+                refused = session.sendmail(from_addr, to_addrs, msg)
+            except Exception as ex:
+                self.release(session, ex)
+                
+                if session.reused and not session.data_started and self._is_broken(ex):
+                    continue
+                
+                raise
+            
+            session.sent += 1
+            
+            self.release(session)
+            
+            return refused
+    
+    def close(self):
+        '''Method used to close all idle sessions. Sessions in use are closed when they are released.'''
+        
+        self._closed = True
+        
+        with self._lock:
+            sessions = list(self._idle)
+            self._idle.clear()
+        
+        for session in sessions:
+            session.close()
+
+class AwsSmtpBaseProvider(object):
+    '''Class used to provide the email building blocks shared by the blocking and the asyncio aws smtp providers. It
+    knows how to build emails but it never sends them.'''
+    
+    HOST = 'email-smtp.us-east-1.amazonaws.com'
+    PORT = 25
+    
+    USERNAME = 'Put your smtp username'
+    PASSWORD = 'Put your smtp password'
+    
+    def __init__(self, attachment_cache=None):
+        '''
+        :param attachment_cache: The cache of encoded attachments. When None the provider uses its own cache.
+        :type attachment_cache: :py:class:`aws.ses.ses_attachments.SesAttachmentCache`
+        '''
+        
+        self._attachment_cache = attachment_cache or SesAttachmentCache()
+    
+    def _build_html_message(self, from_addr, to_addr, subject, body):
+        '''Method used to build a html message object that also contains attachments.'''
+        
+        assert type(to_addr) == list
+        
+        msg = MIMEMultipart("alternative")
+        msg["From"] = from_addr
+        msg["To"] = COMMASPACE.join(to_addr)
+        msg["Date"] = formatdate(localtime = True)
+        msg["Subject"] = subject
+        
+        msg.attach(MIMEText(body, "html"))
+                
+        return msg        
+    
+    def _build_raw_message(self, from_addr, to_addr, subject, body, files):
+        '''Method used to build a message object that also contains attachments. Attachments are encoded once and
+        reused by every email attaching them (see :py:class:`aws.ses.ses_attachments.SesAttachmentCache`).'''
+        
+        assert type(to_addr) == list
+        assert type(files) == list
+        
+        # "=_" never appears in base64 or quoted printable content so the boundary does not have to be searched for in
+        # the (possibly huge) encoded attachments.
+        msg = MIMEMultipart(boundary="=_%s" % uuid.uuid4().hex)
+        msg["From"] = from_addr
+        msg["To"] = COMMASPACE.join(to_addr)
+        msg["Date"] = formatdate(localtime = True)
+        msg["Subject"] = subject
+        
+        msg.attach(MIMEText(body))
+        
+        for file in files:
+            msg.attach(self._attachment_cache.create_part(file))
+        
+        return msg
+    
+    def create_message(self, from_addr, to_addr, subject, body, files=None):
+        '''Method used to build an email. Emails without attachments are html emails.
+        
+        :param from_addr: The sender address.
+        :type from_addr: string
+        :param to_addr: The recipient addresses.
+        :type to_addr: list
+        :param subject: The email subject.
+        :type subject: string
+        :param body: The email body.
+        :type body: string
+        :param files: The paths of the files attached to the email.
+        :type files: list
+        :rtype: :py:class:`aws.ses.ses_domain.SesMessage`'''
+        
+        if files:
+            msg = self._build_raw_message(from_addr, to_addr, subject, body, files)
+        else:
+            msg = self._build_html_message(from_addr, to_addr, subject, body)
+        
+        return SesMessage(from_addr, to_addr, msg)
+    
+    def create_template(self, from_addr, subject, html=None, text=None, files=None):
+        '''Method used to compile an email template for mass mailings. Attachments are encoded using the provider
+        attachment cache. See :py:class:`aws.ses.ses_templates.SesMessageTemplate`.
+        
+        :rtype: :py:class:`aws.ses.ses_templates.SesMessageTemplate`'''
+        
+        return SesMessageTemplate(from_addr, subject, html, text, files, self._attachment_cache)
+
+class AwsSmtpProvider(AwsSmtpBaseProvider):
+    '''Class used to provide an email provider for aws smtp interface. Emails are sent through a
+    :py:class:`SmtpSessionPool` so the provider can be shared by many threads.'''
+    
+    def __init__(self, host=AwsSmtpBaseProvider.HOST, port=AwsSmtpBaseProvider.PORT, 
+                 username=AwsSmtpBaseProvider.USERNAME, password=AwsSmtpBaseProvider.PASSWORD, pool=None, 
+                 attachment_cache=None, **pool_args):
+        '''
+        :param pool: The smtp session pool used to send emails. When None a pool is created for the given host and
+                     credentials; pool_args are passed to it.
+        :type pool: :py:class:`SmtpSessionPool`
+        :param attachment_cache: The cache of encoded attachments. When None the provider uses its own cache.
+        :type attachment_cache: :py:class:`aws.ses.ses_attachments.SesAttachmentCache`
+        '''
+        
+        super().__init__(attachment_cache)
+        
+        self._pool = pool or SmtpSessionPool(host, port, username, password, **pool_args)
+        
+        self._rate_limiter = None
+        self._rate_limiter_lock = threading.Lock()
+    
+    def _get_rate_limiter(self, max_rate):
+        '''Method used to obtain the rate limiter shared by all bulk sends of this provider. It is replaced only when the
+        maximum send rate changes.'''
+        
+        with self._rate_limiter_lock:
+            if self._rate_limiter is None or self._rate_limiter.max_rate != max_rate:
+                self._rate_limiter = AwsFixedRateLimiter(max_rate)
+            
+            return self._rate_limiter
+    
+    def send_mail(self, from_addr, to_addr, subject, body, files=None):
+        '''Method used to send an email through aws smtp interface. The parameters are the ones of
+        :py:meth:`create_message`.
+        
+        :returns: A dictionary with an entry for each refused recipient.'''
+        
+        message = self.create_message(from_addr, to_addr, subject, body, files)
+        
+        return self._pool.sendmail(message.from_addr, message.to_addrs, message.get_content())
+    
+    def send_bulk(self, messages, max_rate, max_concurrency=None):
+        '''Method used to send any number of emails concurrently while staying under the ses maximum send rate. See
+        :py:class:`aws.ses.ses_bulk_sender.SesBulkSender`. Concurrent bulk sends of the provider share one rate limiter
+        so together they stay under max_rate.
+        
+        :param messages: The emails to send.
+        :type messages: iterable of :py:class:`aws.ses.ses_domain.SesMessage`
+        :param max_rate: The maximum number of recipients per second.
+        :type max_rate: float
+        :param max_concurrency: The maximum number of emails sent concurrently. When None it is the pool size.
+        :type max_concurrency: int
+        :returns: A generator of :py:class:`aws.ses.ses_domain.SesSendResult`, one for each recipient.'''
+        
+        sender = SesBulkSender(self._pool, max_rate, max_concurrency or self._pool.max_size, 
+                               rate_limiter=self._get_rate_limiter(max_rate))
+        
+        return sender.send(messages)
+    
+    def close(self):
+        '''Method used to close the smtp sessions of the provider.'''
+        
+        self._pool.close()
\ No newline at end of file
@@ -0,0 +1,224 @@
+'''
+Copyright 2013 Cosnita Radu Viorel
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated 
+documentation files (the "Software"), to deal in the Software without restriction, including without limitation 
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, 
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE 
+WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR 
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, 
+ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+.. codeauthor:: Radu Viorel Cosnita <radu.cosnita@gmail.com>
+
+.. py:module:: aws.ses.ses_templates
+
+Module used to provide precompiled email templates for mass mailings. The mime structure of an email is serialized once
+and each recipient email is produced by splicing its headers and substitution values into the serialized segments.
+'''
+from aws.ses.ses_attachments import render_message
+from aws.ses.ses_domain import SesMessage
+from email.header import Header
+from email.mime.base import MIMEBase
+from email.mime.multipart import MIMEMultipart
+from email.utils import COMMASPACE, formataddr, formatdate, parseaddr
+import base64
+import re
+import string
+import uuid
+
+def compile_text(text):
+    '''Method used to split a text using :py:class:`string.Template` placeholders ($name or ${name}) into segments.
+    
+    :returns: A list where even positions hold literal text and odd positions hold placeholder names.'''
+    
+    segments = []
+    literal = []
+    pos = 0
+    
+    for match in string.Template.pattern.finditer(text):
+        literal.append(text[pos : match.start()])
+        pos = match.end()
+        
+        if match.group("escaped") is not None:
+            literal.append("$")
+            continue
+        
+        name = match.group("named") or match.group("braced")
+        
+        if name is None:
+            raise ValueError("Invalid placeholder in template at position %s." % match.start())
+        
+        segments.append("".join(literal))
+        segments.append(name)
+        
+        literal = []
+    
+    literal.append(text[pos:])
+    segments.append("".join(literal))
+    
+    return segments
+
+def substitute(segments, values):
+    '''Method used to join the segments obtained from :py:func:`compile_text` replacing placeholders with values. It
+    raises KeyError when a placeholder has no value.'''
+    
+    if len(segments) == 1:
+        return segments[0]
+    
+    parts = list(segments)
+    
+    for i in range(1, len(parts), 2):
+        parts[i] = str(values[parts[i]])
+    
+    return "".join(parts)
+
+class SesMessageTemplate(object):
+    '''Class used to provide an email template compiled once and rendered for any number of recipients. The subject
+    and the bodies can contain :py:class:`string.Template` placeholders. Bodies are utf-8 text parts sent base64
+    encoded; attachments are encoded once, when the template is compiled.
+    
+    Rendering an email only substitutes the placeholders, encodes the bodies and joins the precompiled segments, so
+    it is an order of magnitude cheaper than building and serializing an :py:mod:`email` object tree.
+    
+    .. code-block:: python
+    
+        template = SesMessageTemplate("news@example.com", "Hello $name", html="<p>Dear $name, ...</p>")
+        
+        messages = (template.create_message([email], {"name": name}) for email, name in recipients)
+        
+        results = provider.send_bulk(messages, max_rate=14)
+    '''
+    
+    def __init__(self, from_addr, subject, html=None, text=None, files=None, attachment_cache=None):
+        '''
+        :param from_addr: The sender address.
+        :type from_addr: string
+        :param subject: The subject template.
+        :type subject: string
+        :param html: The html body template.
+        :type html: string
+        :param text: The plain text body template. When both html and text are given the email is
+                     multipart/alternative.
+        :type text: string
+        :param files: The paths of the files attached to every email.
+        :type files: list
+        :param attachment_cache: The cache used to encode the attachments. It is required when files are given.
+        :type attachment_cache: :py:class:`aws.ses.ses_attachments.SesAttachmentCache`
+        '''
+        
+        if html is None and text is None:
+            raise ValueError("A template needs an html or a text body.")
+        
+        self._from_addr = self._check_header(from_addr)
+        self._subject = compile_text(subject)
+        self._bodies = [compile_text(body) for body in (text, html) if body is not None]
+        
+        self._segments = self._compile_skeleton(html, text, files or [], attachment_cache)
+    
+    def _create_body_part(self, subtype, marker):
+        '''Method used to build a utf-8 base64 text part whose payload is the given marker.'''
+        
+        part = MIMEBase("text", subtype, charset="utf-8")
+        part["Content-Transfer-Encoding"] = "base64"
+        part.set_payload(marker)
+        
+        return part
+    
+    def _compile_skeleton(self, html, text, files, attachment_cache):
+        '''Method used to serialize the mime structure of the template with markers in place of the recipient specific
+        headers and bodies and to split it at the markers.
+        
+        :returns: A list where even positions hold serialized text and odd positions hold marker names.'''
+        
+        token = uuid.uuid4().hex
+        get_marker = lambda name: "=_%s_%s_=" % (token, name)
+        
+        bodies = []
+        
+        if text is not None:
+            bodies.append(self._create_body_part("plain", get_marker("body0")))
+        
+        if html is not None:
+            bodies.append(self._create_body_part("html", get_marker("body%s" % len(bodies))))
+        
+        msg = bodies[0]
+        
+        if len(bodies) > 1:
+            msg = MIMEMultipart("alternative", boundary="=_%s_alt" % token, _subparts=bodies)
+        
+        if files:
+            msg = MIMEMultipart(boundary="=_%s_mixed" % token, _subparts=[msg])
+            
+            for file in files:
+                msg.attach(attachment_cache.create_part(file))
+        
+        msg["From"] = self._from_addr
+        msg["To"] = get_marker("to")
+        msg["Date"] = get_marker("date")
+        msg["Subject"] = get_marker("subject")
+        
+        return re.split("=_%s_(\\w+)_=" % token, render_message(msg))
+    
+    def _check_header(self, value):
+        '''Method used to reject header values containing line breaks which would inject headers in the email.'''
+        
+        if "\r" in value or "\n" in value:
+            raise ValueError("Header value %r can not contain line breaks." % value)
+        
+        return value
+    
+    def _encode_header(self, value):
+        '''Method used to encode a header value as a mime encoded word unless it is plain ascii.'''
+        
+        self._check_header(value)
+        
+        if value.isascii():
+            return value
+        
+        return Header(value, "utf-8").encode()
+    
+    def _encode_addresses(self, addrs):
+        '''Method used to encode an address list header. Only the display names are mime encoded (RFC 2047 does not
+        allow encoded words in the addresses themselves).'''
+        
+        return COMMASPACE.join(formataddr(parseaddr(self._check_header(addr)), "utf-8") for addr in addrs)
+    
+    def render(self, to_addrs, values=None):
+        '''Method used to render the email of the given recipients.
+        
+        :param to_addrs: The recipient addresses.
+        :type to_addrs: list
+        :param values: The placeholder values.
+        :type values: dict
+        :returns: The email content ready to be sent over smtp.
+        :rtype: string'''
+        
+        values = values or {}
+        
+        markers = {"to": self._encode_addresses(to_addrs),
+                   "date": formatdate(localtime = True),
+                   "subject": self._encode_header(substitute(self._subject, values))}
+        
+        for i in range(len(self._bodies)):
+            body = substitute(self._bodies[i], values).encode("utf-8")
+            
+            markers["body%s" % i] = base64.encodebytes(body).decode("ascii")
+        
+        parts = list(self._segments)
+        
+        for i in range(1, len(parts), 2):
+            parts[i] = markers[parts[i]]
+        
+        return "".join(parts)
+    
+    def create_message(self, to_addrs, values=None):
+        '''Method used to render the email of the given recipients. See :py:meth:`render`.
+        
+        :rtype: :py:class:`aws.ses.ses_domain.SesMessage`'''
+        
+        return SesMessage(self._from_addr, to_addrs, self.render(to_addrs, values))
\ No newline at end of file
@@ -0,0 +1,57 @@
+'''
+Copyright 2013 Cosnita Radu Viorel
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated 
+documentation files (the "Software"), to deal in the Software without restriction, including without limitation 
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, 
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE 
+WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR 
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, 
+ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+.. codeauthor:: Radu Viorel Cosnita <radu.cosnita@gmail.com>
+
+.. py:module:: aws.ses.tests.bench_ses_templates
+
+Module used to provide a micro benchmark comparing the cost of building an email for each recipient using the email object
+tree and using a precompiled template.
+
+.. code-block:: bash
+
+    python -m aws.ses.tests.bench_ses_templates
+'''
+from aws.ses.ses_smtp import AwsSmtpProvider
+import timeit
+
+HTML = "<html><body><h1>Hello %s</h1>" + "<p>Newsletter paragraph with some text about our products.</p>" * 40 + \
+       "</body></html>"
+
+def get_scenarios():
+    '''Method used to obtain the functions building an email for a recipient.'''
+    
+    provider = AwsSmtpProvider(pool=object())
+    template = provider.create_template("news@example.com", "Hello $name", html=HTML % "$name")
+    
+    def build_tree():
+        return provider.create_message("news@example.com", ["to@example.com"], "Hello Radu", HTML % "Radu").get_content()
+    
+    def render_template():
+        return template.create_message(["to@example.com"], {"name": "Radu"}).get_content()
+    
+    return [("email object tree", build_tree),
+            ("precompiled template", render_template)]
+
+def run(number=2000):
+    '''Method used to run the benchmark and print the time needed to build an email.'''
+    
+    for name, build in get_scenarios():
+        duration = min(timeit.repeat(build, number=number, repeat=3)) / number
+        
+        print("%-22s %8.1f us / email" % (name, duration * 1e6))
+
+if __name__ == "__main__":
+    run()
\ No newline at end of file
@@ -0,0 +1,212 @@
+'''
+Copyright 2013 Cosnita Radu Viorel
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated 
+documentation files (the "Software"), to deal in the Software without restriction, including without limitation 
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, 
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE 
+WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR 
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, 
+ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+.. codeauthor:: Radu Viorel Cosnita <radu.cosnita@gmail.com>
+
+.. py:module:: aws.ses.tests.ses_async_smtp
+
+Module used to provide the test suite for the asyncio ses smtp sender.
+'''
+from aws.ses.ses_async_smtp import AsyncAwsSmtpProvider, AsyncSmtpSession, AsyncSmtpSessionPool
+from aws.ses.tests.smtp_sink import SmtpSink, create_ssl_contexts
+from email import message_from_bytes
+from mock import patch
+from smtplib import SMTPAuthenticationError, SMTPRecipientsRefused, SMTPServerDisconnected
+import asyncio
+import os
+import tempfile
+import unittest
+
+class AsyncSmtpSessionPoolTests(unittest.IsolatedAsyncioTestCase):
+    '''Class used to provide all test cases for the asyncio smtp sessions and their pool.'''
+    
+    def setUp(self):
+        self._sink = SmtpSink(credentials=("user", "secret"), rejected=["bad@example.com"]).start()
+        self._pool = AsyncSmtpSessionPool(self._sink.host, self._sink.port, "user", "secret", starttls=False, 
+                                          max_size=2)
+    
+    async def asyncTearDown(self):
+        await self._pool.close()
+    
+    def tearDown(self):
+        self._sink.stop()
+    
+    async def test_sessions_reused(self):
+        '''Test case for making sure concurrent emails share at most max_size logged in sessions.'''
+        
+        await asyncio.gather(*[self._pool.sendmail("from@example.com", ["to@example.com"], "Subject: %s\r\n\r\nbody" % i)
+                                    for i in range(10)])
+        
+        self.assertEqual(10, len(self._sink.messages))
+        self.assertLessEqual(self._sink.connections, 2)
+        self.assertEqual(self._sink.connections, self._sink.commands.count("AUTH"))
+    
+    async def test_pipelining(self):
+        '''Test case for making sure MAIL, RCPT and DATA are written at once when the server supports pipelining and one
+        by one otherwise.'''
+        
+        for pipelining, writes in ((True, 2), (False, 5)):
+            session = await self._pool.acquire()
+            
+            if not pipelining:
+                del session.extensions["pipelining"]
+            
+            with patch.object(session, "_write", wraps=session._write) as write:
+                await session.sendmail("from@example.com", ["a@example.com", "b@example.com"], "body")
+            
+            await self._pool.release(session)
+            
+            self.assertEqual(writes, write.call_count)
+        
+        self.assertEqual([("from@example.com", ["a@example.com", "b@example.com"], b"body\r\n")] * 2, 
+                         self._sink.messages)
+    
+    async def test_display_name_addresses(self):
+        '''Test case for making sure addresses with display names are sent as plain addresses in the envelope.'''
+        
+        await self._pool.sendmail("News <news@example.com>", ["Jane Doe <jane@example.com>", "bob@example.com"], "body")
+        
+        self.assertEqual([("news@example.com", ["jane@example.com", "bob@example.com"])], 
+                         [message[:2] for message in self._sink.messages])
+    
+    async def test_dot_stuffing(self):
+        '''Test case for making sure lines starting with a dot and bare new lines are sent correctly.'''
+        
+        await self._pool.sendmail("from@example.com", ["to@example.com"], "Subject: dots\n\n.\n..two\nend")
+        await self._pool.sendmail("from@example.com", ["to@example.com"], b"Subject: bytes\r\n\r\n.line\r\n")
+        
+        self.assertEqual([b"Subject: dots\r\n\r\n.\r\n..two\r\nend\r\n", b"Subject: bytes\r\n\r\n.line\r\n"],
+                         [message[2] for message in self._sink.messages])
+    
+    async def test_refused_recipients(self):
+        '''Test case for making sure refused recipients are reported and do not break the session.'''
+        
+        for pipelining in (True, False):
+            session = await self._pool.acquire()
+            
+            if not pipelining:
+                del session.extensions["pipelining"]
+            
+            refused = await session.sendmail("from@example.com", ["to@example.com", "bad@example.com"], "body")
+            
+            self.assertEqual({"bad@example.com": (550, b"Mailbox unavailable")}, refused)
+            
+            with self.assertRaises(SMTPRecipientsRefused):
+                await session.sendmail("from@example.com", ["bad@example.com"], "body")
+            
+            await self._pool.release(session)
+        
+        await self._pool.sendmail("from@example.com", ["to@example.com"], "body")
+        
+        self.assertEqual(3, len(self._sink.messages))
+        self.assertEqual(1, self._sink.connections)
+    
+    async def test_dropped_session_resent(self):
+        '''Test case for making sure an email sent over a disconnected idle session is sent again on a new session.'''
+        
+        await self._pool.sendmail("from@example.com", ["to@example.com"], "body")
+        
+        self._sink.drop_connections()
+        
+        await self._pool.sendmail("from@example.com", ["to@example.com"], "body")
+        
+        self.assertEqual(2, len(self._sink.messages))
+        self.assertEqual(2, self._sink.connections)
+    
+    async def test_dropped_after_data_not_resent(self):
+        '''Test case for making sure an email whose content was written is not sent again when the session drops.'''
+        
+        await self._pool.sendmail("from@example.com", ["to@example.com"], "body")
+        
+        self._sink.dropped_after_data = 1
+        
+        with self.assertRaises(SMTPServerDisconnected):
+            await self._pool.sendmail("from@example.com", ["to@example.com"], "body")
+        
+        self.assertEqual(2, len(self._sink.messages))
+        self.assertEqual(1, self._sink.connections)
+    
+    async def test_login_failure(self):
+        '''Test case for making sure authentication failures are raised for AUTH PLAIN and AUTH LOGIN.'''
+        
+        for mechanism in ("PLAIN", "LOGIN"):
+            session = await AsyncSmtpSession.connect(self._sink.host, self._sink.port)
+            
+            await session.ehlo()
+            
+            session.extensions["auth"] = mechanism
+            
+            with self.assertRaises(SMTPAuthenticationError):
+                await session.login("user", "wrong")
+            
+            await session.login("user", "secret")
+            await session.close()
+    
+    async def test_starttls(self):
+        '''Test case for making sure sessions are upgraded to tls before logging in.'''
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            ssl_contexts = create_ssl_contexts(tmp_dir)
+        
+        if not ssl_contexts:
+            self.skipTest("openssl is not available.")
+        
+        sink = SmtpSink(credentials=("user", "secret"), ssl_context=ssl_contexts[0]).start()
+        self.addCleanup(sink.stop)
+        
+        pool = AsyncSmtpSessionPool(sink.host, sink.port, "user", "secret", ssl_context=ssl_contexts[1])
+        
+        await pool.sendmail("from@example.com", ["to@example.com"], "body")
+        await pool.close()
+        
+        self.assertEqual(["EHLO", "STARTTLS", "EHLO", "AUTH", "MAIL", "RCPT", "DATA", "QUIT"], sink.commands)
+        self.assertEqual(1, len(sink.messages))
+
+class AsyncAwsSmtpProviderTests(unittest.IsolatedAsyncioTestCase):
+    '''Class used to provide all test cases for the asyncio aws smtp provider.'''
+    
+    def setUp(self):
+        self._sink = SmtpSink().start()
+        self._provider = AsyncAwsSmtpProvider(self._sink.host, self._sink.port, None, None, starttls=False)
+    
+    async def asyncTearDown(self):
+        await self._provider.close()
+    
+    def tearDown(self):
+        self._sink.stop()
+    
+    async def test_send_mail(self):
+        '''Test case for making sure emails built by the shared builders are sent.'''
+        
+        with tempfile.NamedTemporaryFile(suffix=".bin", delete=False) as attachment:
+            attachment.write(os.urandom(3000))
+        
+        self.addCleanup(os.unlink, attachment.name)
+        
+        await self._provider.send_mail("from@example.com", ["to@example.com"], "Files", "Hello", [attachment.name])
+        
+        template = self._provider.create_template("from@example.com", "Hello $name", html="<p>$name</p>")
+        
+        await asyncio.gather(*[self._provider.send_message(template.create_message(["to-%s@example.com" % i],
+                                                                                   {"name": i})) for i in range(5)])
+        
+        raw_msg = message_from_bytes(self._sink.messages[0][2])
+        
+        with open(attachment.name, "rb") as f:
+            self.assertEqual(f.read(), raw_msg.get_payload()[1].get_payload(decode=True))
+        
+        self.assertEqual(sorted(b"<p>%s</p>" % str(i).encode() for i in range(5)),
+                         sorted(message_from_bytes(message[2]).get_payload(decode=True) 
+                                    for message in self._sink.messages[1:]))
\ No newline at end of file
@@ -0,0 +1,120 @@
+'''
+Copyright 2013 Cosnita Radu Viorel
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated 
+documentation files (the "Software"), to deal in the Software without restriction, including without limitation 
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, 
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE 
+WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR 
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, 
+ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+.. codeauthor:: Radu Viorel Cosnita <radu.cosnita@gmail.com>
+
+.. py:module:: aws.ses.tests.ses_attachments
+
+Module used to provide the test suite for the ses attachment pipeline.
+'''
+from aws.ses.ses_attachments import SesAttachmentCache, render_message
+from email import message_from_string, policy
+from email.mime.text import MIMEText
+from email.mime.multipart import MIMEMultipart
+from mock import patch
+import base64
+import os
+import tempfile
+import unittest
+
+class SesAttachmentCacheTests(unittest.TestCase):
+    '''Class used to provide all test cases for the attachment cache.'''
+    
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self._cache = SesAttachmentCache(max_file_size=64 * 1024)
+    
+    def tearDown(self):
+        self._tmp_dir.cleanup()
+    
+    def _write_file(self, data, name="attachment.bin"):
+        path = os.path.join(self._tmp_dir.name, name)
+        
+        with open(path, "wb") as f:
+            f.write(data)
+        
+        return path
+    
+    def test_encoded_in_chunks(self):
+        '''Test case for making sure chunked encoding produces the same lines as encoding the whole file at once.'''
+        
+        with patch.object(SesAttachmentCache, "CHUNK_SIZE", 57 * 3):
+            for size in (0, 1, 57, 57 * 3, 57 * 3 + 1, 1000):
+                data = os.urandom(size)
+                
+                self.assertEqual(base64.encodebytes(data).decode(), self._cache.get_encoded(self._write_file(data)))
+    
+    def test_cached_by_mtime(self):
+        '''Test case for making sure files are encoded once and encoded again after they change.'''
+        
+        path = self._write_file(b"first")
+        
+        with patch.object(self._cache, "_encode", wraps=self._cache._encode) as encode:
+            for i in range(3):
+                self.assertEqual(base64.encodebytes(b"first").decode(), self._cache.get_encoded(path))
+            
+            self.assertEqual(1, encode.call_count)
+            
+            self._write_file(b"second")
+            os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 10 ** 9))
+            
+            self.assertEqual(base64.encodebytes(b"second").decode(), self._cache.get_encoded(path))
+            self.assertEqual(2, encode.call_count)
+    
+    def test_large_files_not_cached(self):
+        '''Test case for making sure files larger than max_file_size are encoded for each email.'''
+        
+        path = self._write_file(b"a" * (64 * 1024 + 1))
+        
+        with patch.object(self._cache, "_encode", wraps=self._cache._encode) as encode:
+            self._cache.get_encoded(path)
+            self._cache.get_encoded(path)
+            
+            self.assertEqual(2, encode.call_count)
+    
+    def test_create_part(self):
+        '''Test case for making sure attachment parts are decoded to the original file content.'''
+        
+        data = os.urandom(5000)
+        
+        msg = MIMEMultipart()
+        msg.attach(self._cache.create_part(self._write_file(data, "report.pdf")))
+        
+        part = message_from_string(msg.as_string()).get_payload()[0]
+        
+        self.assertEqual("report.pdf", part.get_filename())
+        self.assertEqual(data, part.get_payload(decode=True))
+    
+    def test_create_part_filename(self):
+        '''Test case for making sure file names with separators or non ascii characters are quoted in the part headers.'''
+        
+        for filename in ("my report; v2.pdf", "raport anual ăîș.pdf"):
+            msg = MIMEMultipart()
+            msg.attach(self._cache.create_part(self._write_file(b"data", filename)))
+            
+            part = message_from_string(render_message(msg)).get_payload()[0]
+            
+            self.assertEqual(filename, part.get_filename())
+    
+    def test_render_message(self):
+        '''Test case for making sure emails are rendered exactly like as_string does for any line separator.'''
+        
+        for msg_policy in (policy.compat32, policy.SMTP):
+            msg = MIMEMultipart(policy=msg_policy)
+            msg["Subject"] = "Report"
+            msg.attach(MIMEText("Hello\n.\nWorld"))
+            msg.attach(self._cache.create_part(self._write_file(os.urandom(3000))))
+            
+            self.assertEqual(msg.as_string(), render_message(msg))
\ No newline at end of file
@@ -0,0 +1,201 @@
+'''
+Copyright 2013 Cosnita Radu Viorel
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated 
+documentation files (the "Software"), to deal in the Software without restriction, including without limitation 
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, 
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE 
+WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR 
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, 
+ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+.. codeauthor:: Radu Viorel Cosnita <radu.cosnita@gmail.com>
+
+.. py:module:: aws.ses.tests.ses_bulk_sender
+
+Module used to provide the test suite for the ses bulk sender.
+'''
+from aws.ses.ses_bulk_sender import SesBulkSender
+from aws.ses.ses_domain import SesMessage
+from aws.ses.ses_smtp import AwsSmtpProvider, SmtpSessionPool
+from aws.ses.tests.smtp_sink import SmtpSink
+from mock import Mock, patch
+from smtplib import SMTPDataError
+import threading
+import time
+import unittest
+
+class SesBulkSenderTests(unittest.TestCase):
+    '''Class used to provide all test cases for the ses bulk sender.'''
+    
+    def setUp(self):
+        self._sink = SmtpSink(rejected=["bad@example.com"]).start()
+        self._pool = SmtpSessionPool(self._sink.host, self._sink.port, starttls=False, max_size=4)
+    
+    def tearDown(self):
+        self._pool.close()
+        self._sink.stop()
+    
+    def _get_messages(self, count):
+        return (SesMessage("from@example.com", ["to-%s@example.com" % i], "Subject: %s\r\n\r\nbody" % i) 
+                    for i in range(count))
+    
+    def test_send(self):
+        '''Test case for making sure every recipient gets a result and sessions are shared by the sender threads.'''
+        
+        sender = SesBulkSender(self._pool, max_rate=1000, max_concurrency=4)
+        
+        results = list(sender.send(self._get_messages(50)))
+        
+        self.assertEqual(50, len(results))
+        self.assertTrue(all(results))
+        self.assertEqual(set("to-%s@example.com" % i for i in range(50)), set(result.recipient for result in results))
+        self.assertEqual(50, len(self._sink.messages))
+        self.assertLessEqual(self._sink.connections, 4)
+    
+    def test_refused_recipients(self):
+        '''Test case for making sure refused recipients are reported one by one.'''
+        
+        sender = SesBulkSender(self._pool, max_rate=1000)
+        
+        messages = [SesMessage("from@example.com", ["to@example.com", "bad@example.com"], "body"),
+                    SesMessage("from@example.com", ["bad@example.com"], "body")]
+        
+        results = sorted(sender.send(messages), key=lambda result: (len(result.message.to_addrs), result.recipient))
+        
+        self.assertEqual([("bad@example.com", 550), ("bad@example.com", 550), ("to@example.com", None)],
+                         [(result.recipient, result.error_code) for result in results])
+        self.assertEqual([False, False, True], [bool(result) for result in results])
+        self.assertEqual("Mailbox unavailable", results[0].error_msg)
+    
+    def test_throttled_retried(self):
+        '''Test case for making sure throttled emails are sent again after a backoff delay.'''
+        
+        fake_time = Mock(time=time.time, sleep=Mock())
+        sender = SesBulkSender(self._pool, max_rate=1000, max_attempts=3, base_delay=0.5, time=fake_time)
+        
+        self._sink.throttled = 1
+        
+        results = list(sender.send(self._get_messages(1)))
+        
+        self.assertTrue(results[0])
+        self.assertEqual([0.5], [call[0][0] for call in fake_time.sleep.call_args_list])
+        
+        self._sink.throttled = 3
+        
+        results = list(sender.send(self._get_messages(1)))
+        
+        self.assertEqual(454, results[0].error_code)
+        self.assertIn("Throttling", results[0].error_msg)
+    
+    def test_permanent_failure(self):
+        '''Test case for making sure permanent failures are reported for every recipient without retries.'''
+        
+        pool = Mock(sendmail=Mock(side_effect=SMTPDataError(554, b"Message rejected")))
+        sender = SesBulkSender(pool, max_rate=1000)
+        
+        results = list(sender.send([SesMessage("from@example.com", ["a@example.com", "b@example.com"], "body")]))
+        
+        self.assertEqual([554, 554], [result.error_code for result in results])
+        self.assertEqual(1, pool.sendmail.call_count)
+    
+    def test_unexpected_errors(self):
+        '''Test case for making sure any error sending an email fails its recipients only.'''
+        
+        def sendmail(from_addr, to_addrs, msg):
+            if to_addrs == ["closed@example.com"]:
+                raise ValueError("The pool is closed.")
+            
+            msg.encode("ascii")
+            
+            return {}
+        
+        sender = SesBulkSender(Mock(sendmail=sendmail), max_rate=1000)
+        
+        messages = [SesMessage("from@example.com", ["closed@example.com"], "body"),
+                    SesMessage("from@example.com", ["a@example.com", "b@example.com"], "bödy"),
+                    SesMessage("from@example.com", ["ok@example.com"], "body")]
+        
+        results = sorted(sender.send(messages), key=lambda result: result.recipient)
+        
+        self.assertEqual(["a@example.com", "b@example.com", "closed@example.com", "ok@example.com"], 
+                         [result.recipient for result in results])
+        self.assertEqual([False, False, False, True], [bool(result) for result in results])
+        self.assertEqual("The pool is closed.", results[2].error_msg)
+        self.assertIn("ascii", results[0].error_msg)
+    
+    def test_rate_limited(self):
+        '''Test case for making sure the sender stays under the maximum send rate.'''
+        
+        sender = SesBulkSender(self._pool, max_rate=100, max_concurrency=4)
+        
+        started = time.time()
+        
+        results = list(sender.send(self._get_messages(130)))
+        
+        self.assertEqual(130, len(results))
+        self.assertGreaterEqual(time.time() - started, 0.25)
+    
+    def test_max_concurrency(self):
+        '''Test case for making sure no more than max_concurrency emails are sent at once and messages are read lazily.'''
+        
+        lock = threading.Lock()
+        concurrency = {"current": 0, "max": 0}
+        
+        def sendmail(from_addr, to_addrs, msg):
+            with lock:
+                concurrency["current"] += 1
+                concurrency["max"] = max(concurrency["max"], concurrency["current"])
+            
+            time.sleep(0.01)
+            
+            with lock:
+                concurrency["current"] -= 1
+            
+            return {}
+        
+        sender = SesBulkSender(Mock(sendmail=sendmail), max_rate=10000, max_concurrency=3)
+        
+        messages = self._get_messages(1000)
+        results = sender.send(messages)
+        
+        self.assertTrue(next(results))
+        
+        results.close()
+        
+        self.assertGreater(len(list(messages)), 990)
+        self.assertLessEqual(concurrency["max"], 3)
+        self.assertGreater(concurrency["max"], 1)
+    
+    def test_provider_send_bulk(self):
+        '''Test case for making sure the provider builds emails and sends them in bulk.'''
+        
+        provider = AwsSmtpProvider(pool=self._pool)
+        
+        messages = [provider.create_message("from@example.com", ["to-%s@example.com" % i], "Hello", "<b>Hi</b>") 
+                        for i in range(10)]
+        
+        results = list(provider.send_bulk(messages, max_rate=1000))
+        
+        self.assertEqual(10, len(results))
+        self.assertTrue(all(results))
+        self.assertEqual(10, len(self._sink.messages))
+    
+    def test_provider_shared_rate_limiter(self):
+        '''Test case for making sure the bulk sends of a provider share one rate limiter.'''
+        
+        provider = AwsSmtpProvider(pool=self._pool)
+        
+        with patch("aws.ses.ses_smtp.SesBulkSender") as sender_cls:
+            provider.send_bulk([], max_rate=1000)
+            provider.send_bulk([], max_rate=1000)
+            provider.send_bulk([], max_rate=14)
+        
+        rate_limiters = [call[1]["rate_limiter"] for call in sender_cls.call_args_list]
+        
+        self.assertIs(rate_limiters[0], rate_limiters[1])
+        self.assertEqual([1000, 1000, 14], [rate_limiter.max_rate for rate_limiter in rate_limiters])
\ No newline at end of file
@@ -0,0 +1,212 @@
+'''
+Copyright 2013 Cosnita Radu Viorel
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated 
+documentation files (the "Software"), to deal in the Software without restriction, including without limitation 
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, 
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE 
+WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR 
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, 
+ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+.. codeauthor:: Radu Viorel Cosnita <radu.cosnita@gmail.com>
+
+.. py:module:: aws.ses.tests.ses_smtp
+
+Module used to provide the test suite for the ses smtp sender.
+'''
+from aws.ses.ses_smtp import AwsSmtpProvider, SmtpSessionPool
+from aws.ses.tests.smtp_sink import SmtpSink, create_ssl_contexts
+from email import message_from_bytes
+from smtplib import SMTPAuthenticationError, SMTPServerDisconnected
+import os
+import tempfile
+import threading
+import unittest
+
+class SmtpSessionPoolTests(unittest.TestCase):
+    '''Class used to provide all test cases for the smtp session pool.'''
+    
+    def setUp(self):
+        self._sink = SmtpSink(credentials=("user", "secret"), rejected=["bad@example.com"]).start()
+    
+    def tearDown(self):
+        self._sink.stop()
+    
+    def _get_pool(self, **kwargs):
+        pool = SmtpSessionPool(self._sink.host, self._sink.port, "user", "secret", starttls=False, **kwargs)
+        
+        self.addCleanup(pool.close)
+        
+        return pool
+    
+    def test_sessions_reused(self):
+        '''Test case for making sure emails are sent over a single logged in session.'''
+        
+        pool = self._get_pool()
+        
+        for i in range(5):
+            self.assertEqual({}, pool.sendmail("from@example.com", ["to@example.com"], "Subject: %s\r\n\r\nbody" % i))
+        
+        self.assertEqual(5, len(self._sink.messages))
+        self.assertEqual(1, self._sink.connections)
+        self.assertEqual(1, self._sink.commands.count("AUTH"))
+    
+    def test_sessions_recycled(self):
+        '''Test case for making sure sessions are replaced after max_messages emails.'''
+        
+        pool = self._get_pool(max_messages=2)
+        
+        for i in range(5):
+            pool.sendmail("from@example.com", ["to@example.com"], "body")
+        
+        self.assertEqual(3, self._sink.connections)
+        self.assertEqual(2, self._sink.commands.count("QUIT"))
+    
+    def test_dropped_session_checked(self):
+        '''Test case for making sure sessions idle for more than noop_interval are checked with NOOP and replaced when
+        the server dropped them.'''
+        
+        pool = self._get_pool(noop_interval=0)
+        
+        pool.sendmail("from@example.com", ["to@example.com"], "body")
+        
+        self._sink.drop_connections()
+        
+        pool.sendmail("from@example.com", ["to@example.com"], "body")
+        
+        self.assertEqual(2, len(self._sink.messages))
+        self.assertEqual(2, self._sink.connections)
+    
+    def test_dropped_session_resent(self):
+        '''Test case for making sure an email sent over a reused session which turns out to be disconnected is sent again
+        using a new session.'''
+        
+        pool = self._get_pool(noop_interval=60)
+        
+        pool.sendmail("from@example.com", ["to@example.com"], "body")
+        
+        self._sink.drop_connections()
+        
+        pool.sendmail("from@example.com", ["to@example.com"], "body")
+        
+        self.assertEqual(2, len(self._sink.messages))
+        self.assertEqual(2, self._sink.connections)
+        self.assertNotIn("NOOP", self._sink.commands)
+    
+    def test_dropped_after_data_not_resent(self):
+        '''Test case for making sure an email whose DATA was sent is not sent again when the session drops.'''
+        
+        pool = self._get_pool(noop_interval=60)
+        
+        pool.sendmail("from@example.com", ["to@example.com"], "body")
+        
+        self._sink.dropped_after_data = 1
+        
+        self.assertRaises(SMTPServerDisconnected, pool.sendmail, "from@example.com", ["to@example.com"], "body")
+        self.assertEqual(2, len(self._sink.messages))
+        self.assertEqual(1, self._sink.connections)
+    
+    def test_refused_recipient_keeps_session(self):
+        '''Test case for making sure refused recipients are reported without closing the session.'''
+        
+        pool = self._get_pool()
+        
+        refused = pool.sendmail("from@example.com", ["to@example.com", "bad@example.com"], "body")
+        
+        self.assertEqual(["bad@example.com"], list(refused))
+        
+        pool.sendmail("from@example.com", ["to@example.com"], "body")
+        
+        self.assertEqual(1, self._sink.connections)
+    
+    def test_display_name_addresses(self):
+        '''Test case for making sure addresses with display names are sent as plain addresses in the envelope.'''
+        
+        pool = self._get_pool()
+        
+        pool.sendmail("News <news@example.com>", ["Jane Doe <jane@example.com>", "bob@example.com"], "body")
+        
+        self.assertEqual([("news@example.com", ["jane@example.com", "bob@example.com"])], 
+                         [message[:2] for message in self._sink.messages])
+    
+    def test_login_failure(self):
+        '''Test case for making sure login failures are raised and do not leak pool slots.'''
+        
+        pool = SmtpSessionPool(self._sink.host, self._sink.port, "user", "wrong", starttls=False, max_size=1)
+        
+        for i in range(2):
+            self.assertRaises(SMTPAuthenticationError, pool.sendmail, "from@example.com", ["to@example.com"], "body")
+    
+    def test_max_size(self):
+        '''Test case for making sure concurrent senders never open more than max_size sessions.'''
+        
+        pool = self._get_pool(max_size=2)
+        
+        def send():
+            for i in range(10):
+                pool.sendmail("from@example.com", ["to@example.com"], "body")
+        
+        threads = [threading.Thread(target=send) for i in range(4)]
+        
+        for thread in threads:
+            thread.start()
+        
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(40, len(self._sink.messages))
+        self.assertLessEqual(self._sink.connections, 2)
+    
+    def test_starttls(self):
+        '''Test case for making sure sessions are upgraded to tls before logging in.'''
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            ssl_contexts = create_ssl_contexts(tmp_dir)
+        
+        if not ssl_contexts:
+            self.skipTest("openssl is not available.")
+        
+        sink = SmtpSink(credentials=("user", "secret"), ssl_context=ssl_contexts[0]).start()
+        self.addCleanup(sink.stop)
+        
+        pool = SmtpSessionPool(sink.host, sink.port, "user", "secret", ssl_context=ssl_contexts[1])
+        self.addCleanup(pool.close)
+        
+        pool.sendmail("from@example.com", ["to@example.com"], "body")
+        
+        self.assertEqual(["EHLO", "STARTTLS", "EHLO", "AUTH", "MAIL", "RCPT", "DATA"], sink.commands)
+
+class AwsSmtpProviderTests(unittest.TestCase):
+    '''Class used to provide all test cases for the aws smtp provider.'''
+    
+    def setUp(self):
+        self._sink = SmtpSink().start()
+        self._provider = AwsSmtpProvider(self._sink.host, self._sink.port, None, None, starttls=False)
+    
+    def tearDown(self):
+        self._provider.close()
+        self._sink.stop()
+    
+    def test_send_mail(self):
+        '''Test case for making sure html emails and emails with attachments are sent.'''
+        
+        with tempfile.NamedTemporaryFile(suffix=".bin", delete=False) as attachment:
+            attachment.write(bytes(range(256)))
+        
+        self.addCleanup(os.unlink, attachment.name)
+        
+        self._provider.send_mail("from@example.com", ["to@example.com"], "Html", "<h1>Hello</h1>")
+        self._provider.send_mail("from@example.com", ["to@example.com"], "Files", "Hello", [attachment.name])
+        
+        html_msg, raw_msg = [message_from_bytes(message[2]) for message in self._sink.messages]
+        
+        self.assertEqual("Html", html_msg["Subject"])
+        self.assertEqual("<h1>Hello</h1>", html_msg.get_payload()[0].get_payload())
+        self.assertEqual(bytes(range(256)), raw_msg.get_payload()[1].get_payload(decode=True))
+        self.assertEqual(os.path.basename(attachment.name), raw_msg.get_payload()[1].get_filename())
+        self.assertEqual(1, self._sink.connections)
\ No newline at end of file
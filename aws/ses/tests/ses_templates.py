@@ -0,0 +1,145 @@
+'''
+Copyright 2013 Cosnita Radu Viorel
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated 
+documentation files (the "Software"), to deal in the Software without restriction, including without limitation 
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, 
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE 
+WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR 
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, 
+ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+.. codeauthor:: Radu Viorel Cosnita <radu.cosnita@gmail.com>
+
+.. py:module:: aws.ses.tests.ses_templates
+
+Module used to provide the test suite for the precompiled email templates.
+'''
+from aws.ses.ses_attachments import SesAttachmentCache
+from aws.ses.ses_smtp import AwsSmtpProvider
+from aws.ses.ses_templates import SesMessageTemplate, compile_text, substitute
+from aws.ses.tests.smtp_sink import SmtpSink
+from email import message_from_bytes, message_from_string
+from email.header import decode_header, make_header
+from email.utils import getaddresses
+import os
+import tempfile
+import unittest
+
+class CompileTextTests(unittest.TestCase):
+    '''Class used to provide all test cases for the template text compilation.'''
+    
+    def test_compile_text(self):
+        '''Test case for making sure placeholders are split from literal text and escapes are kept.'''
+        
+        self.assertEqual(["Dear ", "name", ", you owe $", "amount", "."], compile_text("Dear $name, you owe $$${amount}."))
+        self.assertEqual(["No placeholders"], compile_text("No placeholders"))
+        self.assertRaises(ValueError, compile_text, "Invalid $ placeholder")
+    
+    def test_substitute(self):
+        '''Test case for making sure placeholders are replaced and missing values are reported.'''
+        
+        segments = compile_text("Dear $name, you owe ${amount}$$.")
+        
+        self.assertEqual("Dear Radu, you owe 10$.", substitute(segments, {"name": "Radu", "amount": 10}))
+        self.assertRaises(KeyError, substitute, segments, {"name": "Radu"})
+
+class SesMessageTemplateTests(unittest.TestCase):
+    '''Class used to provide all test cases for the precompiled email templates.'''
+    
+    def test_render_html(self):
+        '''Test case for making sure html emails get the recipient headers and substitution values.'''
+        
+        template = SesMessageTemplate("from@example.com", "Hello $name", html="<p>Dear $name ăîș</p>")
+        
+        msg = message_from_string(template.render(["to@example.com"], {"name": "Radu"}))
+        
+        self.assertEqual("from@example.com", msg["From"])
+        self.assertEqual("to@example.com", msg["To"])
+        self.assertEqual("Hello Radu", msg["Subject"])
+        self.assertIsNotNone(msg["Date"])
+        self.assertEqual("text/html", msg.get_content_type())
+        self.assertEqual("<p>Dear Radu ăîș</p>", msg.get_payload(decode=True).decode("utf-8"))
+    
+    def test_render_per_recipient(self):
+        '''Test case for making sure rendering an email does not change the emails of other recipients.'''
+        
+        template = SesMessageTemplate("from@example.com", "Hello $name", text="Dear $name")
+        
+        first = template.render(["a@example.com"], {"name": "Ana"})
+        second = template.render(["b@example.com"], {"name": "Ștefan"})
+        
+        self.assertEqual("Dear Ana", message_from_string(first).get_payload(decode=True).decode())
+        self.assertEqual("Dear Ștefan", message_from_string(second).get_payload(decode=True).decode())
+        self.assertEqual("Hello Ștefan", str(make_header(decode_header(message_from_string(second)["Subject"]))))
+    
+    def test_render_display_names(self):
+        '''Test case for making sure only the display names of the recipients are mime encoded.'''
+        
+        template = SesMessageTemplate("from@example.com", "Hello", text="Hello")
+        
+        msg = message_from_string(template.render(["Ștefan Popa <s@example.com>", "b@example.com"]))
+        
+        self.assertIn("<s@example.com>", msg["To"])
+        self.assertEqual([("Ștefan Popa", "s@example.com"), ("", "b@example.com")],
+                         [(str(make_header(decode_header(name))), addr) for name, addr in getaddresses([msg["To"]])])
+    
+    def test_render_header_injection(self):
+        '''Test case for making sure header values with line breaks are rejected.'''
+        
+        template = SesMessageTemplate("from@example.com", "Hello $name", text="Dear $name")
+        
+        self.assertRaises(ValueError, template.render, ["to@example.com"], {"name": "Ana\r\nBcc: x@example.com"})
+        self.assertRaises(ValueError, template.render, ["to@example.com\nBcc: x@example.com"], {"name": "Ana"})
+        self.assertRaises(ValueError, SesMessageTemplate, "from@example.com\r\nBcc: x@example.com", "Hello", text="a")
+    
+    def test_render_alternative_attachments(self):
+        '''Test case for making sure emails with text, html and attachments have the expected mime structure.'''
+        
+        with tempfile.NamedTemporaryFile(suffix=".bin", delete=False) as attachment:
+            attachment.write(os.urandom(2000))
+        
+        self.addCleanup(os.unlink, attachment.name)
+        
+        template = SesMessageTemplate("from@example.com", "Report", html="<b>$name</b>", text="$name",
+                                      files=[attachment.name], attachment_cache=SesAttachmentCache())
+        
+        msg = message_from_string(template.render(["to@example.com"], {"name": "Radu"}))
+        
+        self.assertEqual(["multipart/mixed", "multipart/alternative", "text/plain", "text/html", 
+                          "application/octet-stream"], [part.get_content_type() for part in msg.walk()])
+        
+        alternative, file_part = msg.get_payload()
+        
+        self.assertEqual([b"Radu", b"<b>Radu</b>"], [part.get_payload(decode=True) for part in alternative.get_payload()])
+        
+        with open(attachment.name, "rb") as f:
+            self.assertEqual(f.read(), file_part.get_payload(decode=True))
+    
+    def test_no_body(self):
+        '''Test case for making sure a template needs at least one body.'''
+        
+        self.assertRaises(ValueError, SesMessageTemplate, "from@example.com", "Subject")
+    
+    def test_provider_bulk(self):
+        '''Test case for making sure template emails are sent in bulk by the provider.'''
+        
+        sink = SmtpSink().start()
+        self.addCleanup(sink.stop)
+        
+        provider = AwsSmtpProvider(sink.host, sink.port, None, None, starttls=False)
+        self.addCleanup(provider.close)
+        
+        template = provider.create_template("from@example.com", "Hello $name", html="<p>Dear $name</p>")
+        
+        messages = (template.create_message(["to-%s@example.com" % i], {"name": "user %s" % i}) for i in range(20))
+        
+        self.assertTrue(all(provider.send_bulk(messages, max_rate=1000)))
+        
+        bodies = sorted(message_from_bytes(message[2]).get_payload(decode=True) for message in sink.messages)
+        
+        self.assertEqual(sorted(b"<p>Dear user %s</p>" % str(i).encode() for i in range(20)), bodies)
\ No newline at end of file
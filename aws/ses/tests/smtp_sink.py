@@ -0,0 +1,295 @@
+'''
+Copyright 2013 Cosnita Radu Viorel
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated 
+documentation files (the "Software"), to deal in the Software without restriction, including without limitation 
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, 
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE 
+WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR 
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, 
+ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+.. codeauthor:: Radu Viorel Cosnita <radu.cosnita@gmail.com>
+
+.. py:module:: aws.ses.tests.smtp_sink
+
+Module used to provide a local smtp server which records the messages it receives. The ses test suites send emails to
+it instead of amazon smtp interface.
+'''
+import base64
+import os
+import shutil
+import socket
+import socketserver
+import ssl
+import subprocess
+import threading
+
+def create_ssl_contexts(tmp_dir):
+    '''Method used to create a self signed certificate for localhost using openssl command line tool.
+    
+    :param tmp_dir: The folder where the certificate and its key are written.
+    :type tmp_dir: string
+    :returns: A tuple (server ssl context, client ssl context trusting the certificate) or None when openssl is not
+              available.'''
+    
+    if not shutil.which("openssl"):
+        return None
+    
+    cert_file = os.path.join(tmp_dir, "sink.crt")
+    key_file = os.path.join(tmp_dir, "sink.key")
+    
+    subprocess.check_call(["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1", "-subj", 
+                           "/CN=localhost", "-addext", "subjectAltName=IP:127.0.0.1", "-keyout", key_file, 
+                           "-out", cert_file], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    
+    server_context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    server_context.load_cert_chain(cert_file, key_file)
+    
+    return server_context, ssl.create_default_context(cafile=cert_file)
+
+class SmtpSinkHandler(socketserver.StreamRequestHandler):
+    '''Class used to serve a single smtp connection of the sink. Commands are read line by line so pipelined commands
+    are answered in order.'''
+    
+    def _write(self, line):
+        self.wfile.write(("%s\r\n" % line).encode())
+        self.wfile.flush()
+    
+    def _read(self):
+        line = self.rfile.readline()
+        
+        if not line:
+            raise ConnectionAbortedError()
+        
+        return line.decode().rstrip("\r\n")
+    
+    def _get_address(self, arg):
+        return arg[arg.find("<") + 1 : arg.find(">")]
+    
+    def _authenticate(self, arg):
+        mechanism, _, initial = arg.partition(" ")
+        
+        if mechanism.upper() == "PLAIN":
+            if not initial:
+                self._write("334 ")
+                initial = self._read()
+            
+            _, username, password = base64.b64decode(initial).decode().split("\0")
+        elif mechanism.upper() == "LOGIN":
+            self._write("334 VXNlcm5hbWU6")
+            username = base64.b64decode(self._read()).decode()
+            self._write("334 UGFzc3dvcmQ6")
+            password = base64.b64decode(self._read()).decode()
+        else:
+            return self._write("504 Unrecognized authentication type")
+        
+        if (username, password) != self.server.sink.credentials:
+            return self._write("535 Authentication credentials invalid")
+        
+        self.authenticated = True
+        self._write("235 Authentication successful")
+    
+    def _read_data(self):
+        lines = []
+        
+        while True:
+            line = self.rfile.readline()
+            
+            if not line or line == b".\r\n":
+                break
+            
+            lines.append(line[1:] if line.startswith(b".") else line)
+        
+        return b"".join(lines)
+    
+    def handle(self):
+        sink = self.server.sink
+        sock = self.request
+        
+        sink._on_connect(sock)
+        
+        self.tls = False
+        self.authenticated = False
+        
+        mail_from = None
+        rcpt_tos = []
+        
+        try:
+            self._write("220 sink ESMTP")
+            
+            while True:
+                line = self._read()
+                verb, _, arg = line.partition(" ")
+                verb = verb.upper()
+                
+                with sink._lock:
+                    sink.commands.append(verb)
+                
+                if verb == "EHLO":
+                    extensions = ["sink", "PIPELINING", "8BITMIME", "AUTH PLAIN LOGIN"]
+                    
+                    if sink.ssl_context and not self.tls:
+                        extensions.append("STARTTLS")
+                    
+                    for extension in extensions[:-1]:
+                        self._write("250-%s" % extension)
+                    
+                    self._write("250 %s" % extensions[-1])
+                elif verb == "HELO":
+                    self._write("250 sink")
+                elif verb == "STARTTLS" and sink.ssl_context and not self.tls:
+                    self._write("220 Ready to start TLS")
+                    
+                    self.request = sink.ssl_context.wrap_socket(self.request, server_side=True)
+                    self.rfile = self.request.makefile("rb")
+                    self.wfile = self.request.makefile("wb")
+                    self.tls = True
+                elif verb == "AUTH":
+                    self._authenticate(arg)
+                elif verb in ("MAIL", "RCPT", "DATA") and sink.credentials and not self.authenticated:
+                    self._write("530 Authentication required")
+                elif verb == "MAIL" and sink._throttle():
+                    self._write("454 Throttling failure: Maximum sending rate exceeded.")
+                elif verb == "MAIL":
+                    mail_from = self._get_address(arg)
+                    rcpt_tos = []
+                    
+                    self._write("250 OK")
+                elif verb == "RCPT":
+                    address = self._get_address(arg)
+                    
+                    if address in sink.rejected:
+                        self._write("550 Mailbox unavailable")
+                    else:
+                        rcpt_tos.append(address)
+                        self._write("250 OK")
+                elif verb == "DATA":
+                    if not rcpt_tos:
+                        self._write("554 No valid recipients")
+                        continue
+                    
+                    self._write("354 End data with <CR><LF>.<CR><LF>")
+                    
+                    data = self._read_data()
+                    
+                    with sink._lock:
+                        sink.messages.append((mail_from, rcpt_tos, data))
+                        
+                        dropped = sink.dropped_after_data > 0
+                        sink.dropped_after_data -= dropped
+                    
+                    if dropped:
+                        # the message is accepted but the connection drops before the reply reaches the client.
+                        break
+                    
+                    self._write("250 OK queued")
+                    
+                    mail_from = None
+                    rcpt_tos = []
+                elif verb == "RSET":
+                    mail_from = None
+                    rcpt_tos = []
+                    
+                    self._write("250 OK")
+                elif verb == "NOOP":
+                    self._write("250 OK")
+                elif verb == "QUIT":
+                    self._write("221 Bye")
+                    break
+                else:
+                    self._write("500 Command not recognized")
+        except (OSError, ValueError):
+            pass
+        finally:
+            sink._on_disconnect(sock)
+
+class SmtpSink(object):
+    '''Class used to provide a threaded smtp server listening on a random local port. It supports EHLO, PIPELINING,
+    STARTTLS (when an ssl context is given), AUTH PLAIN / LOGIN and records every accepted message as a tuple
+    (mail from, recipients, data).'''
+    
+    def __init__(self, credentials=None, ssl_context=None, rejected=()):
+        '''
+        :param credentials: A tuple (username, password) required by AUTH. When None no authentication is required.
+        :type credentials: tuple
+        :param ssl_context: The server ssl context used by STARTTLS. When None STARTTLS is not advertised.
+        :type ssl_context: :py:class:`ssl.SSLContext`
+        :param rejected: The recipient addresses refused by RCPT.
+        :type rejected: iterable of string
+        '''
+        
+        self.credentials = credentials
+        self.ssl_context = ssl_context
+        self.rejected = set(rejected)
+        self.throttled = 0
+        self.dropped_after_data = 0
+        
+        self.messages = []
+        self.commands = []
+        self.connections = 0
+        
+        self._lock = threading.Lock()
+        self._sockets = set()
+        
+        self._server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), SmtpSinkHandler)
+        self._server.daemon_threads = True
+        self._server.sink = self
+        
+        self._thread = threading.Thread(target=self._server.serve_forever, args=(0.05,), daemon=True)
+    
+    @property
+    def host(self):
+        return self._server.server_address[0]
+    
+    @property
+    def port(self):
+        return self._server.server_address[1]
+    
+    def start(self):
+        self._thread.start()
+        
+        return self
+    
+    def _throttle(self):
+        '''Method used to check if the current MAIL command must be refused with a throttling error. Tests set throttled
+        to the number of MAIL commands to refuse.'''
+        
+        with self._lock:
+            if not self.throttled:
+                return False
+            
+            self.throttled -= 1
+            
+            return True
+    
+    def _on_connect(self, sock):
+        with self._lock:
+            self.connections += 1
+            self._sockets.add(sock)
+    
+    def _on_disconnect(self, sock):
+        with self._lock:
+            self._sockets.discard(sock)
+    
+    def drop_connections(self):
+        '''Method used to close every open connection from the server side, like a server dropping idle clients.'''
+        
+        with self._lock:
+            sockets = list(self._sockets)
+        
+        for sock in sockets:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+    
+    def stop(self):
+        self.drop_connections()
+        
+        self._server.shutdown()
+        self._server.server_close()
\ No newline at end of file
@@ -0,0 +1,118 @@
+'''
+Copyright 2013 Cosnita Radu Viorel
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated 
+documentation files (the "Software"), to deal in the Software without restriction, including without limitation 
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, 
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE 
+WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR 
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, 
+ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+.. codeauthor:: Radu Viorel Cosnita <radu.cosnita@gmail.com>
+
+.. py:module:: aws.sqs.sqs_acknowledger
+
+Module used to provide a buffered acknowledger which coalesces the deletes of processed messages into
+DeleteMessageBatch requests.
+'''
+from aws.core.aws_retry import AwsRetryPolicy
+from aws.sqs.sqs_batcher import SqsBatcher
+from aws.sqs.sqs_domain import QueueBatchError
+from collections import deque
+import threading
+
+class SqsAcknowledger(SqsBatcher):
+    '''Class used to acknowledge (delete) processed messages in batches. Handlers from any number of threads call
+    :py:meth:`ack` which only buffers the message; receipt handles are deleted per queue using DeleteMessageBatch
+    requests of up to 10 entries once a buffer is full or its linger deadline passes. Entries failing because of aws
+    (SenderFault false) are buffered again up to max_retries times, after the backoff delay of the retry policy; the
+    other failures are kept in :py:attr:`errors`.
+    
+    .. code-block:: python
+    
+        acknowledger = SqsAcknowledger(SqsClient("eu-west-1"))
+        
+        for message in sqs_client.get_messages(queue_url):
+            # process message in here.
+            acknowledger.ack(message)
+        
+        acknowledger.close()
+    '''
+    
+    def __init__(self, sqs_client, linger=0.1, max_retries=3, max_buffered=10000, max_workers=2, max_errors=1000, 
+                 retry_policy=None):
+        '''
+        :param sqs_client: The sqs client used to delete the messages.
+        :type sqs_client: :py:class:`aws.sqs.sqs_client.SqsClient`
+        :param linger: The maximum number of seconds an ack waits in the buffer for other acks.
+        :type linger: float
+        :param max_retries: The number of times a retryable failed delete is buffered again.
+        :type max_retries: int
+        :param max_buffered: The maximum number of acks buffered or in flight before ack blocks.
+        :type max_buffered: int
+        :param max_workers: The number of threads deleting batches concurrently.
+        :type max_workers: int
+        :param max_errors: The number of latest errors kept.
+        :type max_errors: int
+        :param retry_policy: The policy whose backoff delays retryable failed deletes. When None the default policy is
+                             used.
+        :type retry_policy: :py:class:`aws.core.aws_retry.AwsRetryPolicy`
+        '''
+        
+        super().__init__(linger, max_buffered=max_buffered, max_workers=max_workers, name="sqs-acknowledger")
+        
+        self._sqs_client = sqs_client
+        self._max_retries = max_retries
+        self._retry_policy = retry_policy or AwsRetryPolicy()
+        self._stats_lock = threading.Lock()
+        
+        self.deleted = 0
+        self.failed = 0
+        self.retried = 0
+        self.errors = deque(maxlen=max_errors)
+    
+    def ack(self, message, block=True, timeout=None):
+        '''Method used to acknowledge a processed message. The message is deleted from its queue_url in the background.
+        The call blocks only if max_buffered acks are already waiting.
+        
+        :param message: A received message.
+        :type message: :py:class:`aws.sqs.sqs_domain.QueueMessage`
+        :raises: queue.Full if there is no room in the buffer.'''
+        
+        self._add(message.queue_url, (message, 0), 0, block, timeout)
+    
+    def _send_batch(self, queue_url, entries):
+        '''Method used to delete a batch of messages and to buffer again the retryable failures once their backoff delay
+        passes.'''
+        
+        attempts = {id(message): attempt for message, attempt in entries}
+        
+        try:
+            result = self._sqs_client.delete_messages_batch(queue_url, [entry[0] for entry in entries])
+        except Exception as ex:
+            errors = [QueueBatchError(message, getattr(ex, "error_code", None), str(ex), False) 
+                        for message, attempt in entries]
+        else:
+            errors = result.failed
+        
+        retries = [(error.message, attempts[id(error.message)] + 1) for error in errors 
+                        if not error.sender_fault and attempts[id(error.message)] < self._max_retries]
+        
+        with self._stats_lock:
+            self.deleted += len(entries) - len(errors)
+            self.retried += len(retries)
+            self.failed += len(errors) - len(retries)
+            
+            self.errors.extend(error for error in errors if error.sender_fault or 
+                                                            attempts[id(error.message)] >= self._max_retries)
+        
+        for attempt in set(attempt for message, attempt in retries):
+            self._requeue(queue_url, [retry for retry in retries if retry[1] == attempt], 
+                          self._retry_policy.get_delay(attempt - 1))
+        
+        return len(retries)
\ No newline at end of file
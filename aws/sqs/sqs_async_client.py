@@ -0,0 +1,301 @@
+'''
+Copyright 2013 Cosnita Radu Viorel
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated 
+documentation files (the "Software"), to deal in the Software without restriction, including without limitation 
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, 
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE 
+WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR 
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, 
+ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+.. codeauthor:: Radu Viorel Cosnita <radu.cosnita@gmail.com>
+
+.. py:module:: aws.sqs.sqs_async_client
+
+Module used to provide the asyncio client for amazon Simple Queue Service api.
+'''
+from aws.core.aws_async_http import AsyncAwsHttpClient
+from aws.core.aws_exceptions import AwsGenericException
+from aws.sqs.sqs_client import SqsBaseClient
+from aws.sqs.sqs_domain import QueueBatchResult
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+class AsyncSqsClient(SqsBaseClient):
+    '''Class used to provide the asyncio OOP client for SQS service. Every request method is a coroutine so a single event
+    loop can keep thousands of receives in flight.
+    
+    .. code-block:: python
+    
+        import asyncio
+        
+        async def poll(sqs_client, queue_url):
+            while True:
+                for message in await sqs_client.get_messages(queue_url):
+                    # process message in here.
+        
+        sqs_client = AsyncSqsClient("eu-west-1")
+        queue_url = await sqs_client.get_queue_url("test-queue")
+        
+        await asyncio.gather(*[poll(sqs_client, queue_url) for i in range(1000)])
+    '''
+    
+    def __init__(self, region, http_client=AsyncAwsHttpClient, retry_policy=None, presign_expires=300, 
+                 queue_url_cache=None):
+        super().__init__(region, retry_policy, presign_expires, queue_url_cache)
+        
+        self._http_client = http_client()
+        self._queue_url_lookups = {}
+    
+    async def _execute(self, endpoint, params, method="GET", presign=False):
+        '''Coroutine used to sign and send a request to sqs. Retryable failures are retried according to the client retry
+        policy and every attempt is signed again. Idempotent reads can pass presign=True so that identical requests reuse
+        a presigned url. Writes (POST requests) are not sent again after network errors because sqs might have processed
+        them already.'''
+        
+        return await self._retry_policy.call_async(self._send_request, endpoint, params, method, presign, 
+                                                   idempotent=method != "POST")
+    
+    async def _send_request(self, endpoint, params, method, presign=False):
+        '''Coroutine used to sign and send a single request attempt to sqs.'''
+        
+        body = None
+        
+        if method == "POST":
+            url, headers, body = self._sign_form(endpoint, params, method)
+        else:
+            sign = self._presign if presign else self._sign
+            
+            url, headers = sign(endpoint, params, method)
+        
+        try:
+            return await self._http_client.do_request(url, headers, params["Action"], method, body)
+        except AwsGenericException as ex:
+            self._on_request_error(endpoint, ex, presign)
+            
+            raise
+    
+    async def get_queue_url(self, queue_name):
+        '''Coroutine used to obtain the queue url for a given queue name. Queue urls are cached by the client queue url
+        cache and concurrent lookups of the same queue name wait for a single GetQueueUrl request.'''
+        
+        key = self._get_queue_url_key(queue_name)
+        
+        queue_url = self._queue_urls.get(key)
+        
+        if queue_url is not None:
+            return queue_url
+        
+        lookup = self._queue_url_lookups.get(key)
+        
+        if lookup is None:
+            lookup = self._queue_url_lookups[key] = asyncio.ensure_future(self._load_queue_url(key, queue_name))
+        
+        # a cancelled caller must not cancel the lookup other callers are waiting for.
+        return await asyncio.shield(lookup)
+    
+    async def _load_queue_url(self, key, queue_name):
+        '''Coroutine used to send the GetQueueUrl request shared by all concurrent lookups of a queue name.'''
+        
+        try:
+            content = await self._execute("/", self._get_queue_url_params(queue_name), presign=True)
+            
+            queue_url = self._cast_queue_url(content)
+            
+            self._queue_urls.put(key, queue_url)
+            
+            return queue_url
+        finally:
+            del self._queue_url_lookups[key]
+    
+    async def create_message(self, message):
+        '''Coroutine used to create a new message into a specified queue.
+        
+        :param message: The JSON message we want to push to the queue.
+        :type message: :py:class:`aws.sqs.sqs_domain.QueueMessage`
+        :returns: The newly created message id appended to the original message.'''
+        
+        content = await self._execute(message.queue_url, self._create_message_params(message), "POST")
+        
+        message.msg_id = content["MessageId"]
+    
+    async def create_messages(self, queue_url, messages):
+        '''Coroutine used to create any number of messages into a specified queue using SendMessageBatch requests.
+        Messages are split into batches of at most 10 entries and 256 KB which are sent concurrently.
+        
+        :param queue_url: The queue url where we want to push the messages.
+        :type queue_url: string
+        :param messages: The messages we want to push to the queue.
+        :type messages: iterable of :py:class:`aws.sqs.sqs_domain.QueueMessage`
+        :returns: The batch result. Created messages get their message id set.
+        :rtype: :py:class:`aws.sqs.sqs_domain.QueueBatchResult`'''
+        
+        result = QueueBatchResult()
+        buckets = list(self._get_message_batches(messages, result))
+        
+        contents = await asyncio.gather(*[self._execute(queue_url, self._create_messages_params(bucket), "POST") 
+                                          for bucket in buckets], return_exceptions=True)
+        
+        for bucket, content in zip(buckets, contents):
+            if isinstance(content, BaseException):
+                self._fail_bucket([entry[0] for entry in bucket], content, result)
+            else:
+                self._cast_created_messages(bucket, content, result)
+        
+        return result
+    
+    async def get_messages(self, queue_url, max_messages=10, wait_time_seconds=None, visibility_timeout=None):
+        '''Coroutine used to retrieve a number of messages from a given queue.
+        
+        :param queue_url: The queue url from where we want to retrieve messages.
+        :type queue_url: string
+        :param max_messages: The maximum number of messages we want to retrieve from the queue. It mustn't be larger than 10.
+        :type max_messages: int
+        :param wait_time_seconds: The number of seconds (at most 20) sqs waits for a message before returning an empty
+                                  response (long polling). When None the queue default is used.
+        :type wait_time_seconds: int
+        :param visibility_timeout: The number of seconds the received messages are hidden from other receives. When None
+                                   the queue default is used.
+        :type visibility_timeout: int
+        :returns: A list of messages from the queue.'''
+        
+        params = self._get_messages_params(max_messages, wait_time_seconds, visibility_timeout)
+        
+        content = await self._execute(queue_url, params, presign=True)
+        
+        return self._cast_messages(queue_url, content)
+    
+    def iter_messages(self, queue_url, max_messages=10, wait_time_seconds=20, visibility_timeout=None, max_inflight=1):
+        '''Method used to obtain an endless asynchronous iterator of the messages from a given queue. Up to max_inflight
+        receives are kept in flight while the caller processes the messages already received. Messages are yielded in
+        the order their receives complete. A receive which failed with a transient error is logged and sent again after
+        the retry policy backoff delay; other errors (e.g a non existent queue) are raised by the iterator.
+        
+        .. code-block:: python
+        
+            async for message in sqs_client.iter_messages(queue_url, max_inflight=4):
+                # process message in here.
+        
+        :returns: An asynchronous generator of :py:class:`aws.sqs.sqs_domain.QueueMessage`.'''
+        
+        if max_inflight < 1:
+            raise ValueError("max_inflight must be at least 1.")
+        
+        return self._iter_messages(queue_url, max_messages, wait_time_seconds, visibility_timeout, max_inflight)
+    
+    async def _iter_messages(self, queue_url, max_messages, wait_time_seconds, visibility_timeout, max_inflight):
+        '''Method used to provide the asynchronous generator of :py:meth:`iter_messages`.'''
+        
+        async def get_messages(delay):
+            if delay:
+                await asyncio.sleep(delay)
+            
+            return await self.get_messages(queue_url, max_messages, wait_time_seconds, visibility_timeout)
+        
+        def receive(delay=0):
+            return asyncio.ensure_future(get_messages(delay))
+        
+        receives = set()
+        failures = 0
+        
+        try:
+            while True:
+                while len(receives) < max_inflight:
+                    receives.add(receive())
+                
+                done, receives = await asyncio.wait(receives, return_when=asyncio.FIRST_COMPLETED)
+                
+                for completed in done:
+                    try:
+                        messages = completed.result()
+                    except Exception as ex:
+                        if not self._retry_policy.is_retryable(ex):
+                            raise
+                        
+                        logger.warning("Receive from queue %s failed.", queue_url, exc_info=True)
+                        
+                        receives.add(receive(self._retry_policy.get_delay(failures)))
+                        failures += 1
+                        continue
+                    
+                    failures = 0
+                    
+                    # start the next receive before handing the messages to the caller.
+                    receives.add(receive())
+                    
+                    for message in messages:
+                        yield message
+        finally:
+            for pending in receives:
+                pending.cancel()
+    
+    def _cast_bucket_results(self, buckets, contents, result):
+        '''Method used to add the outcome of concurrent batch requests to result. A bucket whose request raised an
+        exception fails as a whole.'''
+        
+        for bucket, content in zip(buckets, contents):
+            if isinstance(content, BaseException):
+                self._fail_bucket(bucket, content, result)
+            else:
+                self._cast_batch_result(bucket, content, result)
+    
+    async def change_visibility(self, message, visibility_timeout):
+        '''Coroutine used to change the visibility timeout of a received message.'''
+        
+        await self._execute(message.queue_url, self._change_visibility_params(message, visibility_timeout), "POST")
+    
+    async def change_visibility_batch(self, queue_url, messages, visibility_timeout):
+        '''Coroutine used to change the visibility timeout of any number of received messages using
+        ChangeMessageVisibilityBatch requests of at most 10 entries which are sent concurrently.
+        
+        :returns: The batch result holding the changed messages and the reason each other message was not changed.
+        :rtype: :py:class:`aws.sqs.sqs_domain.QueueBatchResult`'''
+        
+        result = QueueBatchResult()
+        buckets = list(self._get_entry_batches(messages))
+        
+        contents = await asyncio.gather(*[self._execute(queue_url, 
+                                                        self._change_visibility_batch_params(bucket, visibility_timeout), 
+                                                        "POST") 
+                                          for bucket in buckets], return_exceptions=True)
+        
+        self._cast_bucket_results(buckets, contents, result)
+        
+        return result
+    
+    async def delete_messages(self, queue_url, messages):
+        '''Coroutine used to delete a given set of messages from a given queue. It returns a list of message ids that were
+        deleted.'''
+        
+        messages = list(messages)
+        
+        return self._get_deleted_ids(messages, await self.delete_messages_batch(queue_url, messages))
+    
+    async def delete_messages_batch(self, queue_url, messages):
+        '''Coroutine used to delete any number of messages from a given queue using DeleteMessageBatch requests of at
+        most 10 entries which are sent concurrently.
+        
+        :returns: The batch result holding the deleted messages and the reason each other message was not deleted.
+        :rtype: :py:class:`aws.sqs.sqs_domain.QueueBatchResult`'''
+        
+        result = QueueBatchResult()
+        buckets = list(self._get_entry_batches(messages))
+        
+        contents = await asyncio.gather(*[self._execute(queue_url, self._delete_messages_params(bucket), "POST") 
+                                          for bucket in buckets], return_exceptions=True)
+        
+        self._cast_bucket_results(buckets, contents, result)
+        
+        return result
+    
+    def close(self):
+        '''Method used to close all idle connections of this client.'''
+        
+        self._http_client.close()
\ No newline at end of file
@@ -0,0 +1,223 @@
+'''
+Copyright 2013 Cosnita Radu Viorel
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated 
+documentation files (the "Software"), to deal in the Software without restriction, including without limitation 
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, 
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE 
+WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR 
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, 
+ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+.. codeauthor:: Radu Viorel Cosnita <radu.cosnita@gmail.com>
+
+.. py:module:: aws.sqs.sqs_batcher
+
+Module used to provide the buffering machinery shared by the components which coalesce single sqs operations into
+batch requests.
+'''
+from aws.sqs.sqs_client import SqsBaseClient
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import concurrent.futures
+import heapq
+import itertools
+import queue
+import threading
+import time
+
+class SqsBatcher(object):
+    '''Class used to hold entries in a buffer per queue and send each buffer as a batch request as soon as it holds
+    BATCH_MAX_ENTRIES entries, reaches the bytes threshold or its linger deadline passes. Batches are sent by a pool of
+    background threads. Once max_buffered entries are buffered or in flight, adding entries blocks until some of them are
+    sent. Subclasses implement :py:meth:`_send_batch`.'''
+    
+    def __init__(self, linger=0.05, batch_max_size=SqsBaseClient.BATCH_MAX_SIZE, max_buffered=10000, max_workers=4, 
+                 name="sqs-batcher"):
+        '''
+        :param linger: The maximum number of seconds an entry waits in the buffer for other entries.
+        :type linger: float
+        :param batch_max_size: The number of bytes a buffer is sent at.
+        :type batch_max_size: int
+        :param max_buffered: The maximum number of entries buffered or in flight before adding entries blocks.
+        :type max_buffered: int
+        :param max_workers: The number of threads sending batches concurrently.
+        :type max_workers: int
+        :param name: The name of the background thread.
+        :type name: string
+        '''
+        
+        self._linger = linger
+        self._batch_max_size = min(batch_max_size, SqsBaseClient.BATCH_MAX_SIZE)
+        
+        self._buffers = OrderedDict()
+        self._delayed = []
+        self._delayed_seq = itertools.count()
+        self._inflight = set()
+        self._closed = False
+        
+        self._cond = threading.Condition()
+        self._slots = threading.BoundedSemaphore(max_buffered)
+        self._executor = ThreadPoolExecutor(max_workers)
+        
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+    
+    def flush(self):
+        '''Method used to send all buffered entries right away and wait until every sent batch completes. Entries added
+        again to the buffers while sending (e.g retries) are sent as well, once their retry delay passes.'''
+        
+        while True:
+            with self._cond:
+                self._buffer_delayed(time.time())
+                
+                for queue_url in list(self._buffers):
+                    self._dispatch(queue_url)
+                
+                inflight = list(self._inflight)
+                
+                if not inflight:
+                    if not self._delayed:
+                        return
+                    
+                    self._cond.wait(self._delayed[0][0] - time.time())
+                    continue
+            
+            concurrent.futures.wait(inflight)
+    
+    def close(self):
+        '''Method used to send all buffered entries and stop the background threads. Entries can not be added once close
+        was called.'''
+        
+        with self._cond:
+            self._closed = True
+            
+            self._cond.notify_all()
+        
+        self.flush()
+        
+        self._thread.join()
+        self._executor.shutdown()
+    
+    def _add(self, queue_url, entry, size=0, block=True, timeout=None):
+        '''Method used to add an entry to the buffer of a queue.
+        
+        :raises: queue.Full if there is no room in the buffer.'''
+        
+        if not self._slots.acquire(block, timeout):
+            raise queue.Full("%s buffer is full." % self.__class__.__name__)
+        
+        with self._cond:
+            if self._closed:
+                self._slots.release()
+                
+                raise ValueError("%s is closed." % self.__class__.__name__)
+            
+            self._buffer(queue_url, entry, size)
+    
+    def _buffer(self, queue_url, entry, size):
+        '''Method used to add an entry which already holds a slot to the buffer of a queue. The lock must be held by the
+        caller.'''
+        
+        buffer = self._buffers.get(queue_url)
+        
+        if buffer is not None and buffer[1] + size > self._batch_max_size:
+            self._dispatch(queue_url)
+            
+            buffer = None
+        
+        if buffer is None:
+            buffer = self._buffers[queue_url] = [[], 0, time.time() + self._linger]
+            
+            self._cond.notify_all()
+        
+        buffer[0].append(entry)
+        buffer[1] += size
+        
+        if len(buffer[0]) == SqsBaseClient.BATCH_MAX_ENTRIES or buffer[1] >= self._batch_max_size:
+            self._dispatch(queue_url)
+    
+    def _requeue(self, queue_url, entries, delay=0):
+        '''Method used to add entries of a batch being sent back to the buffer of their queue once delay seconds pass.
+        They keep their slots.'''
+        
+        with self._cond:
+            if not delay:
+                for entry in entries:
+                    self._buffer(queue_url, entry, 0)
+                
+                return
+            
+            ready_at = time.time() + delay
+            
+            for entry in entries:
+                heapq.heappush(self._delayed, (ready_at, next(self._delayed_seq), queue_url, entry))
+            
+            self._cond.notify_all()
+    
+    def _buffer_delayed(self, now):
+        '''Method used to buffer the requeued entries whose delay passed. The lock must be held by the caller.'''
+        
+        while self._delayed and self._delayed[0][0] <= now:
+            ready_at, seq, queue_url, entry = heapq.heappop(self._delayed)
+            
+            self._buffer(queue_url, entry, 0)
+    
+    def _dispatch(self, queue_url):
+        '''Method used to hand the buffer of a queue to the sending threads. The lock must be held by the caller.'''
+        
+        entries = self._buffers.pop(queue_url)[0]
+        
+        sending = self._executor.submit(self._execute_batch, queue_url, entries)
+        
+        self._inflight.add(sending)
+        sending.add_done_callback(self._on_batch_done)
+    
+    def _on_batch_done(self, sending):
+        '''Method used to forget a batch once it was sent.'''
+        
+        with self._cond:
+            self._inflight.discard(sending)
+    
+    def _execute_batch(self, queue_url, entries):
+        '''Method used to send a batch and to give back the slots of the entries which are not requeued.'''
+        
+        requeued = 0
+        
+        try:
+            requeued = self._send_batch(queue_url, entries) or 0
+        finally:
+            for i in range(len(entries) - requeued):
+                self._slots.release()
+    
+    def _send_batch(self, queue_url, entries):
+        '''Method used to send a batch of entries.
+        
+        :returns: The number of entries added back to the buffers using :py:meth:`_requeue`.'''
+        
+        raise NotImplementedError()
+    
+    def _run(self):
+        '''Method used by the background thread to send the buffers whose linger deadline passed.'''
+        
+        with self._cond:
+            while not self._closed:
+                now = time.time()
+                
+                self._buffer_delayed(now)
+                
+                timeout = self._delayed[0][0] - now if self._delayed else None
+                
+                # buffers are ordered by creation so their deadlines are ordered too.
+                for queue_url, buffer in list(self._buffers.items()):
+                    if buffer[2] > now:
+                        timeout = buffer[2] - now if timeout is None else min(timeout, buffer[2] - now)
+                        break
+                    
+                    self._dispatch(queue_url)
+                
+                self._cond.wait(timeout)
\ No newline at end of file
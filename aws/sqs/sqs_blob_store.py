@@ -0,0 +1,103 @@
+'''
+Copyright 2013 Cosnita Radu Viorel
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated 
+documentation files (the "Software"), to deal in the Software without restriction, including without limitation 
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, 
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE 
+WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR 
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, 
+ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+.. codeauthor:: Radu Viorel Cosnita <radu.cosnita@gmail.com>
+
+.. py:module:: aws.sqs.sqs_blob_store
+
+Module used to provide the blob stores where the extended sqs client offloads message bodies which are too large for sqs.
+'''
+import os
+import tempfile
+import uuid
+
+class SqsBlobStore(object):
+    '''Class used to describe a blob store able to hold message bodies which are too large for sqs. Keys are generated by
+    the store when a blob is added.'''
+    
+    def put(self, data):
+        '''Method used to add a new blob to the store.
+        
+        :param data: The blob content.
+        :type data: bytes
+        :returns: The key of the new blob.
+        :rtype: string'''
+        
+        raise NotImplementedError()
+    
+    def get(self, key):
+        '''Method used to obtain the content of a blob. It raises KeyError if the blob does not exist.
+        
+        :rtype: bytes'''
+        
+        raise NotImplementedError()
+    
+    def delete(self, key):
+        '''Method used to remove a blob from the store. Removing a blob which does not exist is not an error because the
+        same message might be deleted more than once.'''
+        
+        raise NotImplementedError()
+
+class FileSystemBlobStore(SqsBlobStore):
+    '''Class used to provide a blob store which keeps every blob in a file of a local (or mounted network) folder. Blobs
+    are written to a temporary file first and then renamed so readers never observe partially written blobs.'''
+    
+    def __init__(self, root_dir):
+        '''
+        :param root_dir: The folder where blobs are stored. It is created if it does not exist.
+        :type root_dir: string
+        '''
+        
+        self._root_dir = root_dir
+        
+        os.makedirs(root_dir, exist_ok=True)
+    
+    def _get_path(self, key):
+        '''Method used to obtain the file path of a blob.'''
+        
+        if not key or os.sep in key or key.startswith("."):
+            raise KeyError(key)
+        
+        return os.path.join(self._root_dir, key)
+    
+    def put(self, data):
+        key = uuid.uuid4().hex
+        
+        fd, tmp_path = tempfile.mkstemp(dir=self._root_dir, prefix=".")
+        
+        try:
+            with os.fdopen(fd, "wb") as blob_file:
+                blob_file.write(data)
+            
+            os.replace(tmp_path, self._get_path(key))
+        except Exception:
+            os.unlink(tmp_path)
+            
+            raise
+        
+        return key
+    
+    def get(self, key):
+        try:
+            with open(self._get_path(key), "rb") as blob_file:
+                return blob_file.read()
+        except FileNotFoundError:
+            raise KeyError(key)
+    
+    def delete(self, key):
+        try:
+            os.unlink(self._get_path(key))
+        except FileNotFoundError:
+            pass
\ No newline at end of file
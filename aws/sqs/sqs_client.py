@@ -20,23 +20,69 @@ ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEAL
 Module used to provide the client for amazon Simple Queue Service api.
 '''
 from aws.core import aws_config
+from aws.core.aws_cache import AwsTtlCache
+from aws.core.aws_exceptions import AwsGenericException
 from aws.core.aws_http import AwsHttpClient
-from aws.core.request_signer import AWSRequestSignerV4
-from aws.sqs.sqs_domain import QueueMessage
+from aws.core.aws_retry import AwsRetryPolicy
+from aws.core.request_signer import AWSRequestSignerV4, FORM_CONTENT_TYPE
+from aws.sqs.sqs_domain import QueueBatchError, QueueBatchResult, QueueMessage, QueueMessageCodecs
+from aws.sqs.sqs_exceptions import AwsSqsInternalError, AwsSqsNonExistentQueue
+from concurrent.futures import ThreadPoolExecutor
+import concurrent.futures
 import httplib2
+import logging
+import time
 
-class SqsClient(object):
-    '''Class used to provide the OOP client for SQS service.'''
+logger = logging.getLogger(__name__)
+
+class SqsBaseClient(object):
+    '''Class used to provide the request building blocks shared by the blocking and the asyncio SQS clients. It knows how
+    to build the parameters of each SQS action and how to cast the responses but it never executes http requests.'''
     
     SQS_API_VERSION = "2012-11-05" 
     SQS_SERVICE_NAME = "sqs"
     
-    def __init__(self, region, http_client=AwsHttpClient):
+    PRESIGNED_URLS_MARGIN = 30
+    PRESIGNED_URLS_MAX_SIZE = 256
+    
+    QUEUE_URLS_TTL = 300
+    QUEUE_URLS_MAX_SIZE = 256
+    
+    NON_EXISTENT_QUEUE_CODE = "AWS.SimpleQueueService.NonExistentQueue"
+    
+    RETRYABLE_EXCEPTIONS = (AwsSqsInternalError,)
+    RETRYABLE_ERROR_CODES = frozenset(["AWS.SimpleQueueService.InternalError"])
+    
+    BATCH_MAX_ENTRIES = 10
+    BATCH_MAX_SIZE = 256 * 1024
+    
+    def __init__(self, region, retry_policy=None, presign_expires=300, queue_url_cache=None):
         self._region = region
-        self._sqs_service_host = aws_config.get_service_host(region, SqsClient.SQS_SERVICE_NAME)
+        self._retry_policy = retry_policy or AwsRetryPolicy(retryable_exceptions=SqsBaseClient.RETRYABLE_EXCEPTIONS, 
+                                                            retryable_error_codes=SqsBaseClient.RETRYABLE_ERROR_CODES)
+        self._queue_urls = queue_url_cache
+        
+        if queue_url_cache is None:
+            self._queue_urls = AwsTtlCache(SqsBaseClient.QUEUE_URLS_MAX_SIZE, SqsBaseClient.QUEUE_URLS_TTL)
+        
+        if presign_expires and presign_expires <= SqsBaseClient.PRESIGNED_URLS_MARGIN:
+            raise ValueError("presign_expires must be larger than %s seconds." % SqsBaseClient.PRESIGNED_URLS_MARGIN)
+        
+        self._presign_expires = presign_expires
+        self._presigned_urls = AwsTtlCache(SqsBaseClient.PRESIGNED_URLS_MAX_SIZE, 
+                                           max((presign_expires or 0) - SqsBaseClient.PRESIGNED_URLS_MARGIN, 1))
+        
+        self._sqs_service_host = aws_config.get_service_host(region, SqsBaseClient.SQS_SERVICE_NAME)
         self._request_signer = AWSRequestSignerV4(aws_config.AWS_ACCESS_KEY, aws_config.AWS_SECRET_KEY, region, 
-                                                  SqsClient.SQS_SERVICE_NAME)
-        self._http_client = http_client(httplib2.Http)
+                                                  SqsBaseClient.SQS_SERVICE_NAME)
+        self._headers = self._get_generic_headers()
+        self._prepared_request = self._request_signer.prepare_request(self._sqs_service_host, self._get_generic_params(),
+                                                                      self._headers)
+        
+        self._form_headers = dict(self._headers)
+        self._form_headers["Content-Type"] = FORM_CONTENT_TYPE
+        self._form_request = self._request_signer.prepare_request(self._sqs_service_host, self._get_generic_params(),
+                                                                  self._form_headers)
     
     def _get_generic_headers(self):
         '''Method used to return the generic headers for sns http requests.'''
@@ -49,71 +95,213 @@ class SqsClient(object):
     def _get_generic_params(self):
         '''Method used to return the generic parameters for sns requests.'''
         
-        return {"Version": SqsClient.SQS_API_VERSION,
+        return {"Version": SqsBaseClient.SQS_API_VERSION,
                 "SignatureMethod": "AWS4-HMAC-SHA256",
                 "SignatureVersion": "4"} 
     
-    def get_queue_url(self, queue_name):
-        '''Method used to obtain the queue url for a given queue name. If the queue name does not exist None is returned.'''
+    def _sign(self, endpoint, params, method):
+        '''Method used to sign a request. The generic parameters and headers are added by the prepared request of the
+        client so params must contain only the action specific parameters.
+        
+        :returns: A tuple (url, headers) ready to be sent to sqs.'''
+        
+        return self._prepared_request.sign(endpoint, params, method), self._headers
+    
+    def _sign_form(self, endpoint, params, method="POST"):
+        '''Method used to sign a request whose parameters are sent as a form encoded body. Writes use it so that large
+        message bodies are not quoted into the url and the body hash is signed.
+        
+        :returns: A tuple (url, headers, body) ready to be sent to sqs.'''
+        
+        url, body = self._form_request.sign_form(endpoint, params, method)
+        
+        return url, self._form_headers, body
+    
+    def _presign(self, endpoint, params, method):
+        '''Method used to sign an idempotent read request. Identical requests reuse the same presigned url until it gets
+        close to expiring so tight polling loops do not spend cpu on signing. The least recently used urls are evicted
+        once the cache is full. When presigned urls are disabled (presign_expires is 0) this is the same as
+        :py:meth:`_sign`.
+        
+        :returns: A tuple (url, headers) ready to be sent to sqs.'''
         
-        action = "GetQueueUrl"
+        if not self._presign_expires:
+            return self._sign(endpoint, params, method)
         
-        params = self._get_generic_params()
-        params["Action"] = action
-        params["QueueName"] = queue_name
+        key = (endpoint, method, tuple(sorted(params.items())))
+        now = time.time()
         
-        headers = self._get_generic_headers()
+        cached = self._presigned_urls.get(key)
         
-        url = self._request_signer.sign_request(self._sqs_service_host, "/", params, headers, "GET")
+        if cached is not None and now < cached[1]:
+            return cached[0], self._headers
         
-        content = self._http_client.do_request(url, headers, action)
+        url = self._prepared_request.presign(endpoint, params, method, self._presign_expires, time=time)
+        
+        self._presigned_urls.put(key, (url, now + self._presign_expires - SqsBaseClient.PRESIGNED_URLS_MARGIN))
+        
+        return url, self._headers
+    
+    def _on_request_error(self, endpoint, ex, presign):
+        '''Method used to drop the cached data made stale by an aws error: a presigned url rejected by aws (e.g because
+        of clock skew) must not be reused and the url of a queue which does not exist anymore must be looked up again.'''
+        
+        if presign:
+            self._presigned_urls.clear()
+        
+        if isinstance(ex, AwsSqsNonExistentQueue) or ex.error_code == SqsBaseClient.NON_EXISTENT_QUEUE_CODE:
+            self._queue_urls.invalidate_value(endpoint)
+    
+    def _get_queue_url_key(self, queue_name):
+        '''Method used to build the cache key of a queue url. The key contains the sqs host because the cache can be
+        shared by clients of different regions.'''
+        
+        return (self._sqs_service_host, queue_name)
+    
+    def _get_queue_url_params(self, queue_name):
+        '''Method used to build the parameters of a GetQueueUrl request.'''
+        
+        return {"Action": "GetQueueUrl",
+                "QueueName": queue_name}
+    
+    def _cast_queue_url(self, content):
+        '''Method used to extract the queue url (relative to sqs host) from a GetQueueUrl response.'''
         
         return content["QueueUrl"].replace("http://%s" %self._sqs_service_host, "")
     
-    def create_message(self, message):
-        '''Method used to create a new message into a specified queue.
+    def _encode_message(self, message):
+        '''Method used to obtain the body of a message as it is sent to sqs.
         
-        :param message: The JSON message we want to push to the queue.
-        :type message: :py:class:`aws.sqs.sqs_domain.QueueMessage`
-        :returns: The newly created message id appended to the original message.'''
+        :returns: A tuple (codec name, raw body).'''
         
-        action = "SendMessage"
+        return message.encode()
+    
+    def _create_message_params(self, message):
+        '''Method used to build the parameters of a SendMessage request.'''
         
-        params = self._get_generic_params()
-        params["Action"] = action
-        params["MessageBody"] = str(message)
+        codec, body = self._encode_message(message)
         
-        headers = self._get_generic_headers()
+        params = {"Action": "SendMessage",
+                  "MessageBody": body}
         
-        url = self._request_signer.sign_request(self._sqs_service_host, message.queue_url, params, headers, "POST")
+        self._add_codec_params(params, "", codec)
         
-        content = self._http_client.do_request(url, headers, action, "POST")
+        return params
+    
+    def _add_codec_params(self, params, prefix, codec):
+        '''Method used to record the codec of a message body in a message attribute. Bodies encoded with the default
+        codec carry no attribute.
         
-        message.msg_id = content["MessageId"]
+        :returns: The number of bytes the attribute adds to the message size.'''
+        
+        if codec == QueueMessageCodecs.DEFAULT_CODEC:
+            return 0
+        
+        params["%sMessageAttribute.1.Name" % prefix] = QueueMessageCodecs.CODEC_ATTRIBUTE
+        params["%sMessageAttribute.1.Value.DataType" % prefix] = "String"
+        params["%sMessageAttribute.1.Value.StringValue" % prefix] = codec
+        
+        return len(QueueMessageCodecs.CODEC_ATTRIBUTE) + len("String") + len(codec.encode())
     
-    def get_messages(self, queue_url, max_messages=10):
-        '''Method used to retrieve a number of messages from a given queue or None if no more messages are available.
+    def _get_message_batches(self, messages, result):
+        '''Method used to split messages into SendMessageBatch buckets of at most BATCH_MAX_ENTRIES entries and
+        BATCH_MAX_SIZE bytes. Messages which are larger than BATCH_MAX_SIZE on their own can never be sent so they are
+        added to the failed entries of result.
         
-        :param queue_url: The queue url from where we want to retrieve messages.
-        :type queue_url: string
-        :param max_messages: The maximum number of messages we want to retrieve from the queue. It mustn't be larger than 10.
-        :type max_messages: int
-        :returns: A list of messages from the queue.'''
+        :returns: A generator of buckets. Each bucket is a list of (message, body, codec attribute params) tuples.'''
+        
+        bucket = []
+        bucket_size = 0
+        
+        for message in messages:
+            codec, body = self._encode_message(message)
+            attribute_params = {}
+            
+            size = len(body.encode()) + self._add_codec_params(attribute_params, "", codec)
+            
+            if size > SqsBaseClient.BATCH_MAX_SIZE:
+                result.failed.append(QueueBatchError(message, "MessageTooLong", 
+                                                     "Message is larger than %s bytes." % SqsBaseClient.BATCH_MAX_SIZE,
+                                                     True))
+                continue
+            
+            if len(bucket) == SqsBaseClient.BATCH_MAX_ENTRIES or bucket_size + size > SqsBaseClient.BATCH_MAX_SIZE:
+                yield bucket
+                
+                bucket = []
+                bucket_size = 0
+            
+            bucket.append((message, body, attribute_params))
+            bucket_size += size
         
-        action = "ReceiveMessage"
+        if bucket:
+            yield bucket
+    
+    def _create_messages_params(self, bucket):
+        '''Method used to build the parameters of a SendMessageBatch request. The entry id of a message is its position
+        in the bucket.'''
         
-        params = self._get_generic_params()
-        params["Action"] = action
-        params["MaxNumberOfMessages"] = str(max_messages)
+        params = {"Action": "SendMessageBatch"}
         
-        headers = self._get_generic_headers()
+        for i in range(len(bucket)):
+            msg_key = "SendMessageBatchRequestEntry.%s" % (i + 1)
+            
+            params["%s.Id" % msg_key] = str(i)
+            params["%s.MessageBody" % msg_key] = bucket[i][1]
+            
+            for key, value in bucket[i][2].items():
+                params["%s.%s" % (msg_key, key)] = value
         
-        url = self._request_signer.sign_request(self._sqs_service_host, queue_url, params, headers, "GET")
+        return params
+    
+    def _cast_created_messages(self, bucket, content, result):
+        '''Method used to set the message id of the messages created by a SendMessageBatch request and to add the failed
+        entries to result. Entries are added in the order of the bucket.'''
         
-        result = []
+        def by_position(entries):
+            return sorted(entries or [], key=lambda entry: int(entry["Id"]))
         
-        content = self._http_client.do_request(url, headers, action)
+        for entry in by_position(content.get("Successful")):
+            message = bucket[int(entry["Id"])][0]
+            message.msg_id = entry["MessageId"]
             
+            result.successful.append(message)
+        
+        for entry in by_position(content.get("Failed")):
+            result.failed.append(QueueBatchError(bucket[int(entry["Id"])][0], entry.get("Code"), entry.get("Message"),
+                                                 entry.get("SenderFault", False)))
+    
+    def _fail_bucket(self, messages, ex, result):
+        '''Method used to add all messages of a bucket to the failed entries of result when the whole batch request
+        failed. Errors which are not aws errors (e.g connection errors) are reported as receiver faults.'''
+        
+        error_code = getattr(ex, "error_code", type(ex).__name__)
+        error_msg = getattr(ex, "error_msg", str(ex))
+        sender_fault = getattr(ex, "error_type", None) == "Sender"
+        
+        for message in messages:
+            result.failed.append(QueueBatchError(message, error_code, error_msg, sender_fault))
+    
+    def _get_messages_params(self, max_messages, wait_time_seconds=None, visibility_timeout=None):
+        '''Method used to build the parameters of a ReceiveMessage request.'''
+        
+        params = {"Action": "ReceiveMessage",
+                  "MaxNumberOfMessages": str(max_messages),
+                  "MessageAttributeName.1": QueueMessageCodecs.CODEC_ATTRIBUTE}
+        
+        if wait_time_seconds is not None:
+            params["WaitTimeSeconds"] = str(wait_time_seconds)
+        
+        if visibility_timeout is not None:
+            params["VisibilityTimeout"] = str(visibility_timeout)
+        
+        return params
+    
+    def _cast_messages(self, queue_url, content):
+        '''Method used to cast the messages from a ReceiveMessage response to strong type queue messages.'''
+        
+        result = []
+        
         messages = content["messages"]            
         
         for message in messages:                
@@ -123,14 +311,20 @@ class SqsClient(object):
             result.append(msg)
                 
         return result
+    
+    def _get_entry_batches(self, messages):
+        '''Method used to split messages into buckets of at most BATCH_MAX_ENTRIES entries for the batch requests which
+        reference received messages (DeleteMessageBatch, ChangeMessageVisibilityBatch).'''
         
-    def delete_messages(self, queue_url, messages):
-        '''Method used to delete a given set of messages from a given queue. It returns a list of message ids that were deleted.'''
+        messages = list(messages)
         
-        action = "DeleteMessageBatch"
+        for i in range(0, len(messages), SqsBaseClient.BATCH_MAX_ENTRIES):
+            yield messages[i : i + SqsBaseClient.BATCH_MAX_ENTRIES]
+    
+    def _delete_messages_params(self, messages):
+        '''Method used to build the parameters of a DeleteMessageBatch request.'''
         
-        params = self._get_generic_params()
-        params["Action"] = action
+        params = {"Action": "DeleteMessageBatch"}
         
         for i in range(len(messages)):
             message = messages[i]
@@ -138,18 +332,290 @@ class SqsClient(object):
             
             params["%s.Id" % msg_key] = str(i+1)
             params["%s.ReceiptHandle" % msg_key] = message.receipt_handle
+        
+        return params
+    
+    def _cast_batch_result(self, bucket, content, result):
+        '''Method used to add the successful and the failed messages of a DeleteMessageBatch or a
+        ChangeMessageVisibilityBatch response to result. Entry ids are the positions (starting from 1) in the bucket.'''
+        
+        for entry in content.get("Successful") or []:
+            result.successful.append(bucket[int(entry["Id"]) - 1])
+        
+        for entry in content.get("Failed") or []:
+            result.failed.append(QueueBatchError(bucket[int(entry["Id"]) - 1], entry.get("Code"), entry.get("Message"),
+                                                 entry.get("SenderFault", False)))
+    
+    def _change_visibility_params(self, message, visibility_timeout):
+        '''Method used to build the parameters of a ChangeMessageVisibility request.'''
+        
+        return {"Action": "ChangeMessageVisibility",
+                "ReceiptHandle": message.receipt_handle,
+                "VisibilityTimeout": str(visibility_timeout)}
+    
+    def _change_visibility_batch_params(self, messages, visibility_timeout):
+        '''Method used to build the parameters of a ChangeMessageVisibilityBatch request.'''
+        
+        params = {"Action": "ChangeMessageVisibilityBatch"}
+        
+        for i in range(len(messages)):
+            msg_key = "ChangeMessageVisibilityBatchRequestEntry.%s" % (i + 1)
+            
+            params["%s.Id" % msg_key] = str(i + 1)
+            params["%s.ReceiptHandle" % msg_key] = messages[i].receipt_handle
+            params["%s.VisibilityTimeout" % msg_key] = str(visibility_timeout)
+        
+        return params
+    
+    def _get_deleted_ids(self, messages, result):
+        '''Method used to obtain the positions (starting from 1) of the deleted messages.'''
+        
+        deleted = set(id(message) for message in result.successful)
+        
+        return [str(i + 1) for i in range(len(messages)) if id(messages[i]) in deleted]
+
+class SqsClient(SqsBaseClient):
+    '''Class used to provide the OOP client for SQS service. Requests failing with transient errors (throttling,
+    internal errors, network errors) are retried according to the given :py:class:`aws.core.aws_retry.AwsRetryPolicy`.'''
+    
+    def __init__(self, region, http_client=AwsHttpClient, retry_policy=None, presign_expires=300, queue_url_cache=None):
+        super().__init__(region, retry_policy, presign_expires, queue_url_cache)
+        
+        self._http_client = http_client(httplib2.Http)
+    
+    def _execute(self, endpoint, params, method="GET", presign=False):
+        '''Method used to sign and send a request to sqs. Retryable failures are retried according to the client retry
+        policy and every attempt is signed again. Idempotent reads can pass presign=True so that identical requests reuse
+        a presigned url. Writes (POST requests) are not sent again after network errors because sqs might have processed
+        them already.'''
+        
+        return self._retry_policy.call(self._send_request, endpoint, params, method, presign, 
+                                       idempotent=method != "POST")
+    
+    def _send_request(self, endpoint, params, method, presign=False):
+        '''Method used to sign and send a single request attempt to sqs.'''
+        
+        body = None
+        
+        if method == "POST":
+            url, headers, body = self._sign_form(endpoint, params, method)
+        else:
+            sign = self._presign if presign else self._sign
+            
+            url, headers = sign(endpoint, params, method)
+        
+        try:
+            return self._http_client.do_request(url, headers, params["Action"], method, body)
+        except AwsGenericException as ex:
+            self._on_request_error(endpoint, ex, presign)
+            
+            raise
+    
+    def get_queue_url(self, queue_name):
+        '''Method used to obtain the queue url for a given queue name. Queue urls are cached by the client queue url cache
+        and concurrent lookups of the same queue name wait for a single GetQueueUrl request. The cached url is dropped
+        as soon as a request to it fails because the queue does not exist.'''
+        
+        def load_queue_url():
+            content = self._execute("/", self._get_queue_url_params(queue_name), presign=True)
             
-        headers = self._get_generic_headers()
+            return self._cast_queue_url(content)
         
-        url = self._request_signer.sign_request(self._sqs_service_host, queue_url, params, headers, "DELETE")
+        return self._queue_urls.get_or_load(self._get_queue_url_key(queue_name), load_queue_url)
+    
+    def create_message(self, message):
+        '''Method used to create a new message into a specified queue.
         
-        deleted_messages = []
+        :param message: The JSON message we want to push to the queue.
+        :type message: :py:class:`aws.sqs.sqs_domain.QueueMessage`
+        :returns: The newly created message id appended to the original message.'''
         
-        content = self._http_client.do_request(url, headers, action, "DELETE")
+        content = self._execute(message.queue_url, self._create_message_params(message), "POST")
         
-        content = content["Successful"]
+        message.msg_id = content["MessageId"]
+    
+    def create_messages(self, queue_url, messages):
+        '''Method used to create any number of messages into a specified queue using SendMessageBatch requests. Messages
+        are split into batches of at most 10 entries and 256 KB.
         
-        for entry in content:
-            deleted_messages.append(entry["Id"])
+        :param queue_url: The queue url where we want to push the messages.
+        :type queue_url: string
+        :param messages: The messages we want to push to the queue.
+        :type messages: iterable of :py:class:`aws.sqs.sqs_domain.QueueMessage`
+        :returns: The batch result. Created messages get their message id set.
+        :rtype: :py:class:`aws.sqs.sqs_domain.QueueBatchResult`'''
+        
+        result = QueueBatchResult()
+        
+        for bucket in self._get_message_batches(messages, result):
+            try:
+                content = self._execute(queue_url, self._create_messages_params(bucket), "POST")
+            except Exception as ex:
+                self._fail_bucket([entry[0] for entry in bucket], ex, result)
+                continue
             
-        return deleted_messages
\ No newline at end of file
+            self._cast_created_messages(bucket, content, result)
+        
+        return result
+    
+    def get_messages(self, queue_url, max_messages=10, wait_time_seconds=None, visibility_timeout=None):
+        '''Method used to retrieve a number of messages from a given queue or None if no more messages are available.
+        
+        :param queue_url: The queue url from where we want to retrieve messages.
+        :type queue_url: string
+        :param max_messages: The maximum number of messages we want to retrieve from the queue. It mustn't be larger than 10.
+        :type max_messages: int
+        :param wait_time_seconds: The number of seconds (at most 20) sqs waits for a message before returning an empty
+                                  response (long polling). When None the queue default is used.
+        :type wait_time_seconds: int
+        :param visibility_timeout: The number of seconds the received messages are hidden from other receives. When None
+                                   the queue default is used.
+        :type visibility_timeout: int
+        :returns: A list of messages from the queue.'''
+        
+        params = self._get_messages_params(max_messages, wait_time_seconds, visibility_timeout)
+        
+        content = self._execute(queue_url, params, presign=True)
+        
+        return self._cast_messages(queue_url, content)
+    
+    def iter_messages(self, queue_url, max_messages=10, wait_time_seconds=20, visibility_timeout=None, max_inflight=1):
+        '''Method used to obtain an endless generator of the messages from a given queue. Up to max_inflight receives are
+        kept in flight by background threads while the caller processes the messages already received, so processing and
+        network I/O overlap. Messages are yielded in the order their receives complete. A receive which failed with a
+        transient error is logged and sent again after the retry policy backoff delay; other errors (e.g a non existent
+        queue) are raised by the generator. Messages which were received but not yielded when the generator is closed
+        become visible again after their visibility timeout.
+        
+        :param queue_url: The queue url from where we want to retrieve messages.
+        :type queue_url: string
+        :param max_messages: The maximum number of messages retrieved by each receive.
+        :type max_messages: int
+        :param wait_time_seconds: The long polling wait time of each receive.
+        :type wait_time_seconds: int
+        :param visibility_timeout: The visibility timeout of received messages. When None the queue default is used.
+        :type visibility_timeout: int
+        :param max_inflight: The maximum number of receives in flight.
+        :type max_inflight: int
+        :returns: A generator of :py:class:`aws.sqs.sqs_domain.QueueMessage`.'''
+        
+        if max_inflight < 1:
+            raise ValueError("max_inflight must be at least 1.")
+        
+        return self._iter_messages(queue_url, max_messages, wait_time_seconds, visibility_timeout, max_inflight)
+    
+    def _iter_messages(self, queue_url, max_messages, wait_time_seconds, visibility_timeout, max_inflight):
+        '''Method used to provide the generator of :py:meth:`iter_messages`.'''
+        
+        def get_messages(delay):
+            if delay:
+                time.sleep(delay)
+            
+            return self.get_messages(queue_url, max_messages, wait_time_seconds, visibility_timeout)
+        
+        executor = ThreadPoolExecutor(max_inflight)
+        receives = set()
+        failures = 0
+        
+        try:
+            while True:
+                while len(receives) < max_inflight:
+                    receives.add(executor.submit(get_messages, 0))
+                
+                done, receives = concurrent.futures.wait(receives, return_when=concurrent.futures.FIRST_COMPLETED)
+                
+                for receive in done:
+                    try:
+                        messages = receive.result()
+                    except Exception as ex:
+                        if not self._retry_policy.is_retryable(ex):
+                            raise
+                        
+                        logger.warning("Receive from queue %s failed.", queue_url, exc_info=True)
+                        
+                        receives.add(executor.submit(get_messages, self._retry_policy.get_delay(failures)))
+                        failures += 1
+                        continue
+                    
+                    failures = 0
+                    
+                    # start the next receive before handing the messages to the caller.
+                    receives.add(executor.submit(get_messages, 0))
+                    
+                    for message in messages:
+                        yield message
+        finally:
+            for receive in receives:
+                receive.cancel()
+            
+            executor.shutdown(wait=False)
+    
+    def change_visibility(self, message, visibility_timeout):
+        '''Method used to change the visibility timeout of a received message.
+        
+        :param message: The received message.
+        :type message: :py:class:`aws.sqs.sqs_domain.QueueMessage`
+        :param visibility_timeout: The number of seconds (counted from now) the message stays hidden from other receives.
+        :type visibility_timeout: int'''
+        
+        self._execute(message.queue_url, self._change_visibility_params(message, visibility_timeout), "POST")
+    
+    def change_visibility_batch(self, queue_url, messages, visibility_timeout):
+        '''Method used to change the visibility timeout of any number of received messages using
+        ChangeMessageVisibilityBatch requests of at most 10 entries.
+        
+        :param queue_url: The queue url the messages were received from.
+        :type queue_url: string
+        :param messages: The received messages.
+        :type messages: iterable of :py:class:`aws.sqs.sqs_domain.QueueMessage`
+        :param visibility_timeout: The number of seconds (counted from now) the messages stay hidden from other receives.
+        :type visibility_timeout: int
+        :returns: The batch result holding the changed messages and the reason each other message was not changed.
+        :rtype: :py:class:`aws.sqs.sqs_domain.QueueBatchResult`'''
+        
+        result = QueueBatchResult()
+        
+        for bucket in self._get_entry_batches(messages):
+            try:
+                content = self._execute(queue_url, self._change_visibility_batch_params(bucket, visibility_timeout), 
+                                        "POST")
+            except Exception as ex:
+                self._fail_bucket(bucket, ex, result)
+                continue
+            
+            self._cast_batch_result(bucket, content, result)
+        
+        return result
+    
+    def delete_messages(self, queue_url, messages):
+        '''Method used to delete a given set of messages from a given queue. It returns a list of message ids that were deleted.
+        Any number of messages can be deleted; use :py:meth:`delete_messages_batch` to find out why some of them were
+        not deleted.'''
+        
+        messages = list(messages)
+        
+        return self._get_deleted_ids(messages, self.delete_messages_batch(queue_url, messages))
+    
+    def delete_messages_batch(self, queue_url, messages):
+        '''Method used to delete any number of messages from a given queue using DeleteMessageBatch requests of at most
+        10 entries.
+        
+        :param queue_url: The queue url from where we want to delete messages.
+        :type queue_url: string
+        :param messages: The received messages we want to delete.
+        :type messages: iterable of :py:class:`aws.sqs.sqs_domain.QueueMessage`
+        :returns: The batch result holding the deleted messages and the reason each other message was not deleted.
+        :rtype: :py:class:`aws.sqs.sqs_domain.QueueBatchResult`'''
+        
+        result = QueueBatchResult()
+        
+        for bucket in self._get_entry_batches(messages):
+            try:
+                content = self._execute(queue_url, self._delete_messages_params(bucket), "POST")
+            except Exception as ex:
+                self._fail_bucket(bucket, ex, result)
+                continue
+            
+            self._cast_batch_result(bucket, content, result)
+        
+        return result
\ No newline at end of file
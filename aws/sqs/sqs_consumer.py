@@ -0,0 +1,266 @@
+'''
+Copyright 2013 Cosnita Radu Viorel
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated 
+documentation files (the "Software"), to deal in the Software without restriction, including without limitation 
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, 
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE 
+WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR 
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, 
+ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+.. codeauthor:: Radu Viorel Cosnita <radu.cosnita@gmail.com>
+
+.. py:module:: aws.sqs.sqs_consumer
+
+Module used to provide a multi threaded sqs consumer: receiver threads prefetch messages which are processed by worker
+threads and acknowledged in batches.
+'''
+from aws.sqs.sqs_acknowledger import SqsAcknowledger
+from aws.sqs.sqs_poller import SqsAdaptivePoller
+import logging
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+class SqsConsumer(object):
+    '''Class used to consume a queue using receiver threads which feed a bounded prefetch buffer drained by worker
+    threads. Each message is passed to the handler and acknowledged (deleted in batches) once the handler returns;
+    messages whose handler raises an exception are not acknowledged so sqs delivers them again after their visibility
+    timeout. Receivers stop receiving while prefetch messages are buffered or being processed.
+    
+    .. code-block:: python
+    
+        def handler(message):
+            # process message in here.
+        
+        consumer = SqsConsumer(SqsClient("eu-west-1"), queue_url, handler, receivers=2, workers=16)
+        consumer.start()
+        
+        ...
+        
+        consumer.stop()
+    '''
+    
+    RECEIVE_ERROR_DELAY = 1
+    
+    def __init__(self, sqs_client, queue_url, handler, receivers=2, workers=8, prefetch=100, max_messages=10, 
+                 visibility_timeout=None, acknowledger=None, heartbeat=None, time=time):
+        '''
+        :param sqs_client: The sqs client used to receive messages.
+        :type sqs_client: :py:class:`aws.sqs.sqs_client.SqsClient`
+        :param queue_url: The queue url from where we want to consume messages.
+        :type queue_url: string
+        :param handler: A callable which receives a :py:class:`aws.sqs.sqs_domain.QueueMessage`.
+        :type handler: callable
+        :param receivers: The number of threads receiving messages.
+        :type receivers: int
+        :param workers: The number of threads running the handler.
+        :type workers: int
+        :param prefetch: The maximum number of messages buffered or being processed.
+        :type prefetch: int
+        :param max_messages: The maximum number of messages retrieved by each receive.
+        :type max_messages: int
+        :param visibility_timeout: The visibility timeout of received messages. When None the queue default is used.
+        :type visibility_timeout: int
+        :param acknowledger: The acknowledger used to delete processed messages. When None the consumer creates its own.
+        :type acknowledger: :py:class:`aws.sqs.sqs_acknowledger.SqsAcknowledger`
+        :param heartbeat: The heartbeat used to extend the visibility timeout of messages while they are prefetched or
+                          processed. Its visibility timeout is used for receives when visibility_timeout is None.
+        :type heartbeat: :py:class:`aws.sqs.sqs_heartbeat.SqsHeartbeat`
+        '''
+        
+        if prefetch < 1:
+            raise ValueError("prefetch must be at least 1.")
+        
+        self._sqs_client = sqs_client
+        self._queue_url = queue_url
+        self._handler = handler
+        self._receivers = receivers
+        self._workers = workers
+        self._max_messages = max_messages
+        self._visibility_timeout = visibility_timeout
+        self._heartbeat = heartbeat
+        self._time = time
+        
+        if heartbeat is not None and visibility_timeout is None:
+            self._visibility_timeout = heartbeat.visibility_timeout
+        
+        self._own_acknowledger = acknowledger is None
+        self._acknowledger = acknowledger or SqsAcknowledger(sqs_client)
+        
+        self._slots = threading.Semaphore(prefetch)
+        self._prefetched = queue.Queue()
+        self._stopping = threading.Event()
+        self._threads = []
+        self._stats_lock = threading.Lock()
+        
+        self._started = None
+        self.received = 0
+        self.processed = 0
+        self.handler_errors = 0
+        self.receive_errors = 0
+    
+    def start(self):
+        '''Method used to start the receiver and the worker threads.'''
+        
+        if self._threads:
+            raise ValueError("The consumer is already started.")
+        
+        self._started = self._time.time()
+        self._stopping.clear()
+        
+        for i in range(self._receivers):
+            self._threads.append(threading.Thread(target=self._receive, name="sqs-receiver-%s" % i, daemon=True))
+        
+        for i in range(self._workers):
+            self._threads.append(threading.Thread(target=self._work, name="sqs-worker-%s" % i, daemon=True))
+        
+        for thread in self._threads:
+            thread.start()
+    
+    def stop(self):
+        '''Method used to stop the consumer. Receivers finish their current receive, the prefetched messages are processed
+        and all acknowledgements are sent before the method returns.'''
+        
+        self._stop_threads()
+        self._close_acknowledger()
+    
+    def _stop_threads(self):
+        '''Method used to stop the receivers and to wait for the workers to drain the prefetch buffer.'''
+        
+        self._stopping.set()
+        
+        receivers, workers = self._threads[:self._receivers], self._threads[self._receivers:]
+        
+        for thread in receivers:
+            thread.join()
+        
+        for thread in workers:
+            self._prefetched.put(None)
+        
+        for thread in workers:
+            thread.join()
+        
+        self._threads = []
+    
+    def _close_acknowledger(self):
+        '''Method used to send all pending acknowledgements.'''
+        
+        if self._own_acknowledger:
+            self._acknowledger.close()
+        else:
+            self._acknowledger.flush()
+    
+    def get_stats(self):
+        '''Method used to obtain the consumer statistics.
+        
+        :returns: A dictionary with the received, processed and failed messages counts, the number of prefetched
+                  messages waiting for a worker, the number of deleted messages and the processed messages per second.'''
+        
+        elapsed = self._time.time() - self._started if self._started else 0
+        
+        return {"received": self.received,
+                "processed": self.processed,
+                "handler_errors": self.handler_errors,
+                "receive_errors": self.receive_errors,
+                "prefetched": self._prefetched.qsize(),
+                "deleted": self._acknowledger.deleted,
+                "throughput": self.processed / elapsed if elapsed > 0 else 0.0}
+    
+    def _acquire_slots(self):
+        '''Method used to wait for room in the prefetch buffer. It takes as many slots as possible, up to max_messages.
+        
+        :returns: The number of slots taken or 0 if the consumer is stopping.'''
+        
+        while not self._slots.acquire(timeout=0.1):
+            if self._stopping.is_set():
+                return 0
+        
+        slots = 1
+        
+        while slots < self._max_messages and self._slots.acquire(blocking=False):
+            slots += 1
+        
+        return slots
+    
+    def _release_slots(self, count):
+        '''Method used to give back prefetch slots which were not used.'''
+        
+        for i in range(count):
+            self._slots.release()
+    
+    def _receive(self):
+        '''Method used by the receiver threads to fill the prefetch buffer.'''
+        
+        poller = SqsAdaptivePoller(self._sqs_client, self._queue_url, self._max_messages, self._visibility_timeout)
+        
+        while not self._stopping.is_set():
+            slots = self._acquire_slots()
+            
+            if not slots:
+                return
+            
+            try:
+                messages = poller.poll(slots)
+            except Exception:
+                logger.warning("Receive from queue %s failed.", self._queue_url, exc_info=True)
+                
+                self._release_slots(slots)
+                
+                with self._stats_lock:
+                    self.receive_errors += 1
+                
+                self._stopping.wait(SqsConsumer.RECEIVE_ERROR_DELAY)
+                continue
+            
+            self._release_slots(slots - len(messages))
+            
+            if self._heartbeat is not None:
+                for message in messages:
+                    self._heartbeat.track(message)
+            
+            with self._stats_lock:
+                self.received += len(messages)
+            
+            for message in messages:
+                self._prefetched.put(message)
+    
+    def _untrack(self, message):
+        '''Method used to stop extending the visibility timeout of a processed message.'''
+        
+        if self._heartbeat is not None:
+            self._heartbeat.untrack(message)
+    
+    def _work(self):
+        '''Method used by the worker threads to process and acknowledge the prefetched messages.'''
+        
+        while True:
+            message = self._prefetched.get()
+            
+            if message is None:
+                return
+            
+            try:
+                self._handler(message)
+            except Exception:
+                logger.warning("Handler failed for message %s.", message.msg_id, exc_info=True)
+                
+                self._untrack(message)
+                
+                with self._stats_lock:
+                    self.handler_errors += 1
+            else:
+                self._untrack(message)
+                self._acknowledger.ack(message)
+                
+                with self._stats_lock:
+                    self.processed += 1
+            finally:
+                self._slots.release()
\ No newline at end of file
@@ -19,24 +19,402 @@ ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEAL
 
 Module that provides the SQS domain objects.
 '''
+import base64
 import json
+import lzma
+import struct
+import zlib
+
+class QueueMessageCodec(object):
+    '''This is the base class for the codecs used to encode message bodies to the text sent to sqs and back.'''
+    
+    name = None
+    
+    def encode(self, body):
+        '''Method used to encode a message body.
+        
+        :returns: A tuple (codec name, encoded body). The codec name is recorded in a message attribute so it must be the
+                  name of the codec able to decode the body (e.g a compressing codec reports its inner codec for bodies
+                  which were not compressed).'''
+        
+        raise NotImplementedError()
+    
+    def decode(self, raw_body):
+        '''Method used to decode an encoded message body.'''
+        
+        raise NotImplementedError()
+
+class JsonCodec(QueueMessageCodec):
+    '''Codec used to encode bodies using the default json module settings. It is the codec of messages without codec
+    attribute.'''
+    
+    name = "json"
+    
+    def encode(self, body):
+        return self.name, json.dumps(body)
+    
+    def decode(self, raw_body):
+        return json.loads(raw_body)
+
+class CompactJsonCodec(JsonCodec):
+    '''Codec used to encode bodies as json without whitespace and without escaping non ascii characters.'''
+    
+    name = "json-compact"
+    
+    def __init__(self):
+        self._encoder = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False)
+    
+    def encode(self, body):
+        return self.name, self._encoder.encode(body)
+
+class BinaryCodec(QueueMessageCodec):
+    '''Codec used to pack bodies in a type-length-value binary format sent as base64 text. Besides the json types it
+    supports bytes values.'''
+    
+    name = "binary"
+    
+    _INT64_MIN = -2 ** 63
+    _INT64_MAX = 2 ** 63 - 1
+    
+    def encode(self, body):
+        buffer = bytearray()
+        
+        self._pack(body, buffer)
+        
+        return self.name, base64.b64encode(buffer).decode()
+    
+    def _pack(self, value, buffer):
+        '''Method used to append the binary form of a value to buffer.'''
+        
+        if value is None:
+            buffer += b"N"
+        elif value is True:
+            buffer += b"T"
+        elif value is False:
+            buffer += b"F"
+        elif isinstance(value, int):
+            if BinaryCodec._INT64_MIN <= value <= BinaryCodec._INT64_MAX:
+                buffer += struct.pack(">cq", b"i", value)
+            else:
+                self._pack_bytes(b"I", str(value).encode(), buffer)
+        elif isinstance(value, float):
+            buffer += struct.pack(">cd", b"d", value)
+        elif isinstance(value, str):
+            self._pack_bytes(b"s", value.encode(), buffer)
+        elif isinstance(value, (bytes, bytearray, memoryview)):
+            self._pack_bytes(b"b", bytes(value), buffer)
+        elif isinstance(value, (list, tuple)):
+            buffer += struct.pack(">cI", b"l", len(value))
+            
+            for item in value:
+                self._pack(item, buffer)
+        elif isinstance(value, dict):
+            buffer += struct.pack(">cI", b"m", len(value))
+            
+            for key, item in value.items():
+                self._pack(key, buffer)
+                self._pack(item, buffer)
+        else:
+            raise TypeError("Type %s can not be packed by binary codec." % type(value))
+    
+    def _pack_bytes(self, tag, value, buffer):
+        buffer += struct.pack(">cI", tag, len(value))
+        buffer += value
+    
+    def decode(self, raw_body):
+        data = memoryview(base64.b64decode(raw_body))
+        
+        value, offset = self._unpack(data, 0)
+        
+        if offset != len(data):
+            raise ValueError("Binary body has %s trailing bytes." % (len(data) - offset))
+        
+        return value
+    
+    def _unpack(self, data, offset):
+        '''Method used to read the value starting at offset.
+        
+        :returns: A tuple (value, offset of the next value).'''
+        
+        tag = data[offset : offset + 1].tobytes()
+        offset += 1
+        
+        if tag == b"N":
+            return None, offset
+        
+        if tag == b"T":
+            return True, offset
+        
+        if tag == b"F":
+            return False, offset
+        
+        if tag == b"i":
+            return struct.unpack_from(">q", data, offset)[0], offset + 8
+        
+        if tag == b"d":
+            return struct.unpack_from(">d", data, offset)[0], offset + 8
+        
+        length = struct.unpack_from(">I", data, offset)[0]
+        offset += 4
+        
+        if tag in (b"s", b"b", b"I"):
+            value = data[offset : offset + length].tobytes()
+            
+            if len(value) != length:
+                raise ValueError("Binary body is truncated.")
+            
+            if tag == b"s":
+                value = value.decode()
+            elif tag == b"I":
+                value = int(value)
+            
+            return value, offset + length
+        
+        if tag == b"l":
+            value = []
+            
+            for i in range(length):
+                item, offset = self._unpack(data, offset)
+                value.append(item)
+            
+            return value, offset
+        
+        if tag == b"m":
+            value = {}
+            
+            for i in range(length):
+                key, offset = self._unpack(data, offset)
+                value[key], offset = self._unpack(data, offset)
+            
+            return value, offset
+        
+        raise ValueError("Unknown binary tag %s." % tag)
+
+class CompressedCodec(QueueMessageCodec):
+    '''Codec used to compress the bodies encoded by an inner codec once they are larger than a threshold. Compressed
+    bodies are sent as base64 text; smaller bodies are sent as encoded by the inner codec and report its name.'''
+    
+    def __init__(self, name, compressor, inner_codec, threshold=1024):
+        '''
+        :param name: The codec name.
+        :type name: string
+        :param compressor: A module (or object) providing compress and decompress functions (e.g zlib, lzma).
+        :param inner_codec: The codec used to encode bodies before compressing them.
+        :type inner_codec: :py:class:`QueueMessageCodec`
+        :param threshold: The size in bytes from which encoded bodies are compressed.
+        :type threshold: int
+        '''
+        
+        self.name = name
+        self._compressor = compressor
+        self._inner_codec = inner_codec
+        self._threshold = threshold
+    
+    def encode(self, body):
+        inner_name, raw_body = self._inner_codec.encode(body)
+        
+        if len(raw_body) < self._threshold:
+            return inner_name, raw_body
+        
+        return self.name, base64.b64encode(self._compressor.compress(raw_body.encode())).decode()
+    
+    def decode(self, raw_body):
+        return self._inner_codec.decode(self._compressor.decompress(base64.b64decode(raw_body)).decode())
+
+class QueueMessageCodecs(object):
+    '''This class provides the registry of the codecs available for message bodies. The codec used for a message is
+    recorded in its CODEC_ATTRIBUTE message attribute so consumers decode bodies automatically. Below you can find an
+    example of how a new codec is added:
+    
+    .. code-block:: python
+    
+        from aws.sqs.sqs_domain import CompressedCodec, BinaryCodec, QueueMessageCodecs
+        
+        QueueMessageCodecs.add_codec(CompressedCodec("zlib-binary", zlib, BinaryCodec()))
+        
+        message = QueueMessage(body={"a": 1}, queue_url=queue_url, codec="zlib-binary")
+    '''
+    
+    DEFAULT_CODEC = "json"
+    CODEC_ATTRIBUTE = "codec"
+    
+    _CODECS = {}
+    
+    @staticmethod
+    def add_codec(codec):
+        '''Method used to register a codec under its name.
+        
+        :param codec: The codec instance.
+        :type codec: :py:class:`QueueMessageCodec`
+        '''
+        
+        existing_codec = QueueMessageCodecs._CODECS.get(codec.name)
+        
+        if existing_codec is not None:
+            raise ValueError("Codec %s is already registered as %s." % (codec.name, existing_codec))
+        
+        QueueMessageCodecs._CODECS[codec.name] = codec
+    
+    @staticmethod
+    def get_codec(name=None):
+        '''Method used to obtain a registered codec. When name is None the default codec is returned.
+        
+        :raises: ValueError if no codec is registered under the given name.'''
+        
+        codec = QueueMessageCodecs._CODECS.get(name or QueueMessageCodecs.DEFAULT_CODEC)
+        
+        if codec is None:
+            raise ValueError("Codec %s is not registered." % name)
+        
+        return codec
+
+QueueMessageCodecs.add_codec(JsonCodec())
+QueueMessageCodecs.add_codec(CompactJsonCodec())
+QueueMessageCodecs.add_codec(BinaryCodec())
+QueueMessageCodecs.add_codec(CompressedCodec("zlib", zlib, CompactJsonCodec()))
+QueueMessageCodecs.add_codec(CompressedCodec("lzma", lzma, CompactJsonCodec()))
 
 class QueueMessage(object):
-    '''This object is used to define how a queue message looks like. It is used in communication with AWS SQS service.'''
+    '''This object is used to define how a queue message looks like. It is used in communication with AWS SQS service.
+    
+    Messages received from sqs keep the raw body: it is decoded only when :py:attr:`body` is first read and it is sent
+    again as is (e.g by routers and archivers) as long as the body was never read. Once the body is read it might be
+    changed in place so it is encoded again when the message is sent.'''
+    
+    __slots__ = ("msg_id", "receipt_handle", "queue_url", "codec", "blob_key", "_body", "_raw_body")
+    
+    _NOT_DECODED = object()
     
-    def __init__(self, msg_id=None, receipt_handle=None, body=None, queue_url=None):
+    def __init__(self, msg_id=None, receipt_handle=None, body=None, queue_url=None, raw_body=None, codec=None):
+        '''
+        :param codec: The name of the codec used to encode the body. When None the body is encoded as json.
+        :type codec: string
+        '''
+        
         self.msg_id = msg_id
         self.receipt_handle = receipt_handle       
-        self.body = body
         self.queue_url = queue_url
+        self.codec = codec
+        self.blob_key = None
+        
+        self._body = body
+        self._raw_body = None
+        
+        if raw_body is not None:
+            self._body = QueueMessage._NOT_DECODED
+            self._raw_body = raw_body
+    
+    @property
+    def body(self):
+        '''Property used to obtain the decoded body of the message.'''
+        
+        if self._body is QueueMessage._NOT_DECODED:
+            self._body = QueueMessageCodecs.get_codec(self.codec).decode(self._raw_body)
+        
+        self._raw_body = None
+        
+        return self._body
+    
+    @body.setter
+    def body(self, value):
+        self._body = value
+        self._raw_body = None
+    
+    @property
+    def raw_body(self):
+        '''Property used to obtain the body of the message as it is sent to sqs.'''
+        
+        return self.encode()[1]
+    
+    def encode(self):
+        '''Method used to encode the body of the message using its codec.
+        
+        :returns: A tuple (codec name, raw body) where codec name is the name of the codec able to decode raw body.'''
+        
+        if self._raw_body is not None:
+            return self.codec or QueueMessageCodecs.DEFAULT_CODEC, self._raw_body
+        
+        return QueueMessageCodecs.get_codec(self.codec).encode(self._body)
     
     @staticmethod
     def cast_aws_message(message):
-        '''Method used to cast an aws message from the api to a strong type queue message.'''
+        '''Method used to cast an aws message from the api to a strong type queue message. The body is not decoded.'''
+        
+        codec = (message.get("MessageAttributes") or {}).get(QueueMessageCodecs.CODEC_ATTRIBUTE)
         
         return QueueMessage(msg_id = message["MessageId"],
                             receipt_handle = message["ReceiptHandle"],
-                            body = json.loads(message["Body"]))
+                            raw_body = message["Body"],
+                            codec = codec["StringValue"] if codec else None)
             
     def __str__(self):
-        return json.dumps(self.body)
\ No newline at end of file
+        raw_body = self.raw_body
+        
+        return raw_body if isinstance(raw_body, str) else raw_body.decode()
+
+class BlobQueueMessage(QueueMessage):
+    '''This object is used to describe a received message whose body was offloaded to a blob store because it was too
+    large for sqs. The body is fetched from the blob store only when it is first read or the message is sent again.'''
+    
+    __slots__ = ("_blob_store",)
+    
+    def __init__(self, msg_id, receipt_handle, queue_url, blob_key, blob_store, codec=None):
+        '''
+        :param blob_key: The key of the blob holding the raw body of the message.
+        :type blob_key: string
+        :param blob_store: The blob store holding the raw body of the message.
+        :type blob_store: :py:class:`aws.sqs.sqs_blob_store.SqsBlobStore`
+        '''
+        
+        super().__init__(msg_id=msg_id, receipt_handle=receipt_handle, queue_url=queue_url, codec=codec)
+        
+        self.blob_key = blob_key
+        
+        self._blob_store = blob_store
+        self._body = QueueMessage._NOT_DECODED
+    
+    def _fetch(self):
+        '''Method used to fetch the raw body of the message from the blob store unless it was already fetched.'''
+        
+        if self._body is QueueMessage._NOT_DECODED and self._raw_body is None:
+            self._raw_body = self._blob_store.get(self.blob_key).decode()
+    
+    @property
+    def body(self):
+        '''Property used to obtain the decoded body of the message.'''
+        
+        self._fetch()
+        
+        return QueueMessage.body.fget(self)
+    
+    @body.setter
+    def body(self, value):
+        QueueMessage.body.fset(self, value)
+    
+    def encode(self):
+        self._fetch()
+        
+        return super().encode()
+
+class QueueBatchError(object):
+    '''This object is used to describe why an entry of a batch request failed.'''
+    
+    def __init__(self, message, error_code, error_msg, sender_fault):
+        self.message = message
+        self.error_code = error_code
+        self.error_msg = error_msg
+        self.sender_fault = sender_fault
+    
+    def __repr__(self):
+        return "QueueBatchError(%s, %s, sender_fault=%s)" % (self.error_code, self.error_msg, self.sender_fault)
+
+class QueueBatchResult(object):
+    '''This object is used to hold the outcome of a batch request: the messages processed successfully and a
+    :py:class:`QueueBatchError` for each failed message.'''
+    
+    def __init__(self, successful=None, failed=None):
+        self.successful = successful if successful is not None else []
+        self.failed = failed if failed is not None else []
+    
+    def __bool__(self):
+        return not self.failed
\ No newline at end of file
@@ -0,0 +1,149 @@
+'''
+Copyright 2013 Cosnita Radu Viorel
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated 
+documentation files (the "Software"), to deal in the Software without restriction, including without limitation 
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, 
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE 
+WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR 
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, 
+ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+.. codeauthor:: Radu Viorel Cosnita <radu.cosnita@gmail.com>
+
+.. py:module:: aws.sqs.sqs_extended_client
+
+Module used to provide an sqs client which offloads message bodies that are too large for sqs to a blob store.
+'''
+from aws.core.aws_http import AwsHttpClient
+from aws.sqs.sqs_client import SqsBaseClient, SqsClient
+from aws.sqs.sqs_domain import BlobQueueMessage
+import json
+import threading
+
+class SqsExtendedClient(SqsClient):
+    '''Class used to provide an sqs client which can send messages of any size. Bodies larger than the offload threshold
+    are written to a blob store and only a small pointer is sent to sqs (using the "blob" codec). Received pointers
+    are cast to :py:class:`aws.sqs.sqs_domain.BlobQueueMessage` so the body is fetched lazily when it is first read and
+    the blob is removed once the message is deleted. Blobs of messages which could not be sent are removed as well.
+    
+    Sending a received offloaded message again (e.g. a router forwarding it) uploads a new blob for the copy so
+    deleting the original message never removes the blob of the forwarded one.
+    
+    Every consumer of an offloading queue must use an extended client configured with the same blob store.'''
+    
+    BLOB_CODEC = "blob"
+    
+    def __init__(self, region, blob_store, offload_threshold=SqsBaseClient.BATCH_MAX_SIZE, http_client=AwsHttpClient, 
+                 retry_policy=None, presign_expires=300, queue_url_cache=None):
+        '''
+        :param blob_store: The blob store where large message bodies are offloaded.
+        :type blob_store: :py:class:`aws.sqs.sqs_blob_store.SqsBlobStore`
+        :param offload_threshold: The size in bytes (body and message attributes) above which a message body is offloaded.
+        :type offload_threshold: int
+        '''
+        
+        super().__init__(region, http_client, retry_policy, presign_expires, queue_url_cache)
+        
+        self._blob_store = blob_store
+        self._offload_threshold = offload_threshold
+        
+        self._local = threading.local()
+    
+    def _encode_message(self, message):
+        '''Method used to obtain the body of a message as it is sent to sqs. Bodies above the offload threshold are added
+        to the blob store and replaced by a pointer. The upload is tracked until sqs accepts the message so that its blob
+        is removed if the message is not sent. The blob key of a received message is never changed.'''
+        
+        codec, body = message.encode()
+        data = body.encode()
+        
+        if len(data) + self._add_codec_params({}, "", codec) <= self._offload_threshold:
+            return codec, body
+        
+        blob_key = self._blob_store.put(data)
+        
+        self._local.uploads.append((message, blob_key))
+        
+        return SqsExtendedClient.BLOB_CODEC, json.dumps({"key": blob_key, "codec": codec, "size": len(data)})
+    
+    def _cast_messages(self, queue_url, content):
+        '''Method used to cast the messages from a ReceiveMessage response. Pointers to offloaded bodies become
+        :py:class:`aws.sqs.sqs_domain.BlobQueueMessage` instances.'''
+        
+        result = []
+        
+        for message in super()._cast_messages(queue_url, content):
+            if message.codec == SqsExtendedClient.BLOB_CODEC:
+                pointer = json.loads(message.raw_body)
+                
+                message = BlobQueueMessage(message.msg_id, message.receipt_handle, queue_url, pointer["key"],
+                                           self._blob_store, pointer["codec"])
+            
+            result.append(message)
+        
+        return result
+    
+    def _discard_blobs(self, messages):
+        '''Method used to remove the blobs of the given messages from the blob store.'''
+        
+        for message in messages:
+            if message.blob_key:
+                self._blob_store.delete(message.blob_key)
+                
+                message.blob_key = None
+    
+    def _keep_uploads(self, messages):
+        '''Method used to stop tracking the uploads of the given messages because sqs accepted them.'''
+        
+        uploads = self._local.uploads
+        
+        for message in messages:
+            for i in range(len(uploads)):
+                if uploads[i][0] is message:
+                    del uploads[i]
+                    break
+    
+    def _discard_uploads(self):
+        '''Method used to remove the blobs uploaded for messages which were not sent.'''
+        
+        for message, blob_key in self._local.uploads:
+            self._blob_store.delete(blob_key)
+        
+        self._local.uploads = []
+    
+    def _cast_created_messages(self, bucket, content, result):
+        sent = len(result.successful)
+        
+        super()._cast_created_messages(bucket, content, result)
+        
+        self._keep_uploads(result.successful[sent:])
+    
+    def create_message(self, message):
+        self._local.uploads = []
+        
+        try:
+            super().create_message(message)
+            
+            self._keep_uploads([message])
+        finally:
+            self._discard_uploads()
+    
+    def create_messages(self, queue_url, messages):
+        self._local.uploads = []
+        
+        try:
+            return super().create_messages(queue_url, messages)
+        finally:
+            self._discard_uploads()
+    
+    def delete_messages_batch(self, queue_url, messages):
+        result = super().delete_messages_batch(queue_url, messages)
+        
+        self._discard_blobs(result.successful)
+        
+        return result
\ No newline at end of file
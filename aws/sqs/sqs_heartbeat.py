@@ -0,0 +1,183 @@
+'''
+Copyright 2013 Cosnita Radu Viorel
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated 
+documentation files (the "Software"), to deal in the Software without restriction, including without limitation 
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, 
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE 
+WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR 
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, 
+ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+.. codeauthor:: Radu Viorel Cosnita <radu.cosnita@gmail.com>
+
+.. py:module:: aws.sqs.sqs_heartbeat
+
+Module used to provide automatic visibility timeout extension (heartbeating) for messages which are still being
+processed.
+'''
+from collections import deque
+import threading
+import time
+
+class SqsHeartbeat(object):
+    '''Class used to keep in flight messages hidden from other receivers while they are processed. Tracked messages are
+    extended by visibility_timeout seconds, using ChangeMessageVisibilityBatch requests of up to 10 entries per queue,
+    once less than margin seconds are left from their current visibility timeout. Messages stop being extended as soon as
+    they are untracked (e.g when they are acknowledged) or when an extension fails.
+    
+    .. code-block:: python
+    
+        heartbeat = SqsHeartbeat(sqs_client, visibility_timeout=30)
+        
+        for message in sqs_client.get_messages(queue_url, visibility_timeout=30):
+            heartbeat.track(message)
+            
+            # long running processing in here.
+            
+            heartbeat.untrack(message)
+            acknowledger.ack(message)
+        
+        heartbeat.close()
+    '''
+    
+    def __init__(self, sqs_client, visibility_timeout=30, margin=None, max_errors=1000, time=time):
+        '''
+        :param sqs_client: The sqs client used to change the visibility of the messages.
+        :type sqs_client: :py:class:`aws.sqs.sqs_client.SqsClient`
+        :param visibility_timeout: The visibility timeout of tracked messages when they are tracked and the number of
+                                   seconds each extension adds.
+        :type visibility_timeout: int
+        :param margin: The number of seconds before a message becomes visible it is extended at. When None a half of the
+                       visibility timeout is used.
+        :type margin: float
+        :param max_errors: The number of latest extension errors kept.
+        :type max_errors: int
+        '''
+        
+        self._sqs_client = sqs_client
+        self._visibility_timeout = visibility_timeout
+        self._margin = margin if margin is not None else visibility_timeout / 2
+        self._time = time
+        
+        if not 0 < self._margin < visibility_timeout:
+            raise ValueError("margin must be larger than 0 and smaller than visibility_timeout.")
+        
+        self._tracked = {}
+        self._closed = False
+        self._cond = threading.Condition()
+        
+        self.extended = 0
+        self.errors = deque(maxlen=max_errors)
+        
+        self._thread = threading.Thread(target=self._run, name="sqs-heartbeat", daemon=True)
+        self._thread.start()
+    
+    @property
+    def visibility_timeout(self):
+        '''Property used to obtain the visibility timeout set by each extension.'''
+        
+        return self._visibility_timeout
+    
+    def __len__(self):
+        return len(self._tracked)
+    
+    def track(self, message, received=None):
+        '''Method used to start extending the visibility timeout of a message.
+        
+        :param message: A message received with visibility_timeout.
+        :type message: :py:class:`aws.sqs.sqs_domain.QueueMessage`
+        :param received: The moment (time.time()) the message was received at. When None it is now.
+        :type received: float'''
+        
+        expires = (received if received is not None else self._time.time()) + self._visibility_timeout
+        
+        with self._cond:
+            self._tracked[message.receipt_handle] = [message, expires]
+            
+            self._cond.notify()
+    
+    def untrack(self, message):
+        '''Method used to stop extending the visibility timeout of a message.'''
+        
+        with self._cond:
+            self._tracked.pop(message.receipt_handle, None)
+    
+    def close(self):
+        '''Method used to stop extending all messages and stop the background thread.'''
+        
+        with self._cond:
+            self._closed = True
+            self._tracked.clear()
+            
+            self._cond.notify()
+        
+        self._thread.join()
+    
+    def _get_due(self, now):
+        '''Method used to obtain the messages which must be extended now grouped by queue and the number of seconds until
+        the next message must be extended. The lock must be held by the caller.'''
+        
+        due = {}
+        timeout = None
+        
+        for message, expires in self._tracked.values():
+            wait = expires - self._margin - now
+            
+            if wait <= 0:
+                due.setdefault(message.queue_url, []).append(message)
+            elif timeout is None or wait < timeout:
+                timeout = wait
+        
+        return due, timeout
+    
+    def _extend(self, queue_url, messages):
+        '''Method used to extend the visibility timeout of messages from the same queue.'''
+        
+        now = self._time.time()
+        
+        try:
+            result = self._sqs_client.change_visibility_batch(queue_url, messages, self._visibility_timeout)
+        except Exception as ex:
+            failed = [(message, ex) for message in messages]
+            successful = []
+        else:
+            failed = [(error.message, error) for error in result.failed]
+            successful = result.successful
+        
+        with self._cond:
+            for message in successful:
+                entry = self._tracked.get(message.receipt_handle)
+                
+                if entry is not None:
+                    entry[1] = now + self._visibility_timeout
+            
+            # a message which could not be extended will become visible so it is not tracked anymore.
+            for message, error in failed:
+                self._tracked.pop(message.receipt_handle, None)
+            
+            self.extended += len(successful)
+            self.errors.extend(failed)
+    
+    def _run(self):
+        '''Method used by the background thread to extend the messages which are about to become visible.'''
+        
+        with self._cond:
+            while not self._closed:
+                due, timeout = self._get_due(self._time.time())
+                
+                if not due:
+                    self._cond.wait(timeout)
+                    continue
+                
+                self._cond.release()
+                
+                try:
+                    for queue_url, messages in due.items():
+                        self._extend(queue_url, messages)
+                finally:
+                    self._cond.acquire()
\ No newline at end of file
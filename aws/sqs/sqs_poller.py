@@ -0,0 +1,153 @@
+'''
+Copyright 2013 Cosnita Radu Viorel
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated 
+documentation files (the "Software"), to deal in the Software without restriction, including without limitation 
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, 
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE 
+WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR 
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, 
+ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+.. codeauthor:: Radu Viorel Cosnita <radu.cosnita@gmail.com>
+
+.. py:module:: aws.sqs.sqs_poller
+
+Module used to provide adaptive receive loops for sqs queues. They switch between short and long polling based on how
+often receives come back empty.
+'''
+class SqsAdaptivePollerBase(object):
+    '''Class used to provide the polling strategy shared by the blocking and the asyncio pollers. It keeps an
+    exponentially weighted rate of empty receives. While the queue is busy short polls are sent so messages are fetched
+    as fast as they arrive; once most receives come back empty the poller switches to long polls so an idle queue costs
+    one request every max_wait_time seconds instead of one request per loop iteration. Two thresholds are used so the
+    poller does not flip between modes on every receive.'''
+    
+    def __init__(self, sqs_client, queue_url, max_messages=10, visibility_timeout=None, max_wait_time=20, 
+                 long_poll_threshold=0.5, short_poll_threshold=0.2, smoothing=0.3):
+        '''
+        :param sqs_client: The sqs client used to receive messages.
+        :param queue_url: The queue url from where we want to retrieve messages.
+        :type queue_url: string
+        :param max_messages: The maximum number of messages retrieved by each receive. It mustn't be larger than 10.
+        :type max_messages: int
+        :param visibility_timeout: The visibility timeout of received messages. When None the queue default is used.
+        :type visibility_timeout: int
+        :param max_wait_time: The WaitTimeSeconds (at most 20) of long polls.
+        :type max_wait_time: int
+        :param long_poll_threshold: The empty receives rate above which long polls are sent.
+        :type long_poll_threshold: float
+        :param short_poll_threshold: The empty receives rate below which short polls are sent again.
+        :type short_poll_threshold: float
+        :param smoothing: The weight of the latest receive in the empty receives rate.
+        :type smoothing: float
+        '''
+        
+        if not 0 <= short_poll_threshold <= long_poll_threshold <= 1:
+            raise ValueError("Poll thresholds must satisfy 0 <= short_poll_threshold <= long_poll_threshold <= 1.")
+        
+        self._sqs_client = sqs_client
+        self._queue_url = queue_url
+        self._max_messages = max_messages
+        self._visibility_timeout = visibility_timeout
+        self._max_wait_time = max_wait_time
+        self._long_poll_threshold = long_poll_threshold
+        self._short_poll_threshold = short_poll_threshold
+        self._smoothing = smoothing
+        
+        self._empty_rate = 1.0
+        self._wait_time = max_wait_time
+        
+        self.receives = 0
+        self.empty_receives = 0
+    
+    @property
+    def empty_rate(self):
+        '''Property used to obtain the weighted rate of empty receives.'''
+        
+        return self._empty_rate
+    
+    @property
+    def wait_time(self):
+        '''Property used to obtain the WaitTimeSeconds of the next receive.'''
+        
+        return self._wait_time
+    
+    def _on_receive(self, messages):
+        '''Method used to update the empty receives rate and the polling mode after a receive.'''
+        
+        empty = not messages
+        
+        self.receives += 1
+        self.empty_receives += empty
+        
+        self._empty_rate += self._smoothing * (empty - self._empty_rate)
+        
+        if self._empty_rate >= self._long_poll_threshold:
+            self._wait_time = self._max_wait_time
+        elif self._empty_rate < self._short_poll_threshold:
+            self._wait_time = 0
+        
+        return messages
+
+class SqsAdaptivePoller(SqsAdaptivePollerBase):
+    '''Class used to provide an adaptive receive loop on top of :py:class:`aws.sqs.sqs_client.SqsClient`.
+    
+    .. code-block:: python
+    
+        poller = SqsAdaptivePoller(sqs_client, queue_url)
+        
+        for message in poller:
+            # process message in here.
+    '''
+    
+    def poll(self, max_messages=None):
+        '''Method used to receive the next batch of messages using the current polling mode.
+        
+        :param max_messages: The maximum number of messages retrieved by this receive. When None the poller max_messages
+                             is used.
+        :type max_messages: int
+        :returns: A list of messages from the queue.'''
+        
+        messages = self._sqs_client.get_messages(self._queue_url, max_messages or self._max_messages, self._wait_time, 
+                                                 self._visibility_timeout)
+        
+        return self._on_receive(messages)
+    
+    def __iter__(self):
+        while True:
+            for message in self.poll():
+                yield message
+
+class AsyncSqsAdaptivePoller(SqsAdaptivePollerBase):
+    '''Class used to provide an adaptive receive loop on top of :py:class:`aws.sqs.sqs_async_client.AsyncSqsClient`.
+    
+    .. code-block:: python
+    
+        poller = AsyncSqsAdaptivePoller(sqs_client, queue_url)
+        
+        async for message in poller:
+            # process message in here.
+    '''
+    
+    async def poll(self, max_messages=None):
+        '''Coroutine used to receive the next batch of messages using the current polling mode.
+        
+        :param max_messages: The maximum number of messages retrieved by this receive. When None the poller max_messages
+                             is used.
+        :type max_messages: int
+        :returns: A list of messages from the queue.'''
+        
+        messages = await self._sqs_client.get_messages(self._queue_url, max_messages or self._max_messages, 
+                                                       self._wait_time, self._visibility_timeout)
+        
+        return self._on_receive(messages)
+    
+    async def __aiter__(self):
+        while True:
+            for message in await self.poll():
+                yield message
\ No newline at end of file
@@ -0,0 +1,385 @@
+'''
+Copyright 2013 Cosnita Radu Viorel
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated 
+documentation files (the "Software"), to deal in the Software without restriction, including without limitation 
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, 
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE 
+WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR 
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, 
+ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+.. codeauthor:: Radu Viorel Cosnita <radu.cosnita@gmail.com>
+
+.. py:module:: aws.sqs.sqs_process_consumer
+
+Module used to provide an sqs consumer which runs cpu bound handlers in a pool of processes. Message bodies are handed
+to the processes through shared memory ring buffers.
+'''
+from aws.sqs.sqs_consumer import SqsConsumer
+from aws.sqs.sqs_domain import QueueMessageCodecs
+from collections import deque
+import ctypes
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+class SharedMemoryRing(object):
+    '''Class used to provide a ring buffer allocated in shared memory. It is written by a single producer (the parent
+    process) and read by a single consumer process which handles the records in the order they were written, so a record
+    is released only after all the records written before it. Allocation state lives in the writer only; the reader
+    receives the offset and the length of each record.'''
+    
+    def __init__(self, size, mp_context=multiprocessing):
+        '''
+        :param size: The size in bytes of the ring.
+        :type size: int
+        '''
+        
+        self.size = size
+        self.buffer = mp_context.RawArray(ctypes.c_char, size)
+        
+        self._view = memoryview(self.buffer).cast("B")
+        self._records = deque()
+        self._head = 0
+    
+    def __len__(self):
+        return len(self._records)
+    
+    def write(self, data):
+        '''Method used to copy data into the ring.
+        
+        :param data: The record content.
+        :type data: bytes
+        :returns: The offset of the record or None if the ring does not have enough contiguous free space.'''
+        
+        length = len(data)
+        
+        # every record takes at least one byte so a full ring is never mistaken for an empty one.
+        offset = self._allocate(max(length, 1))
+        
+        if offset is None:
+            return None
+        
+        self._view[offset : offset + length] = data
+        self._records.append(offset)
+        self._head = offset + max(length, 1)
+        
+        return offset
+    
+    def _allocate(self, length):
+        '''Method used to find the offset of length contiguous free bytes.'''
+        
+        if not self._records:
+            return 0 if length <= self.size else None
+        
+        tail = self._records[0]
+        
+        if self._head > tail:
+            if self.size - self._head >= length:
+                return self._head
+            
+            return 0 if length <= tail else None
+        
+        if tail - self._head >= length:
+            return self._head
+        
+        return None
+    
+    def release(self):
+        '''Method used to release the oldest record of the ring.'''
+        
+        self._records.popleft()
+        
+        if not self._records:
+            self._head = 0
+
+def _run_process_worker(worker_idx, buffer, tasks, results, handler):
+    '''Method used as the entry point of the worker processes. It reads the encoded bodies referenced by the tasks from the
+    shared ring, decodes them with the codec named by the task, runs the handler on them and reports the outcome of each
+    task.'''
+    
+    view = memoryview(buffer).cast("B")
+    
+    while True:
+        task = tasks.get()
+        
+        if task is None:
+            return
+        
+        seq, offset, length, inline_body, codec = task
+        
+        body = inline_body if offset is None else bytes(view[offset : offset + length])
+        
+        try:
+            handler(QueueMessageCodecs.get_codec(codec).decode(body.decode()))
+        except Exception:
+            logger.warning("Handler failed in worker process %s.", worker_idx, exc_info=True)
+            
+            results.put((worker_idx, seq, offset is not None, False))
+        else:
+            results.put((worker_idx, seq, offset is not None, True))
+
+class SqsProcessConsumer(SqsConsumer):
+    '''Class used to consume a queue using a pool of processes for cpu bound handlers. Messages are received in the parent
+    process and their bodies are copied into a shared memory ring per worker process; only the (offset, length) of each
+    body travels through the task pipe. The outcome of each message comes back to the parent which acknowledges
+    successful messages using its batched acknowledger.
+    
+    The handler receives the decoded message body (the same value thread consumer handlers find in message.body) and
+    must be picklable (e.g a module level function). Bodies travel encoded and are decoded in the worker process using
+    the codec of the message.
+    
+    .. code-block:: python
+    
+        def handler(document):
+            # process document in here.
+        
+        consumer = SqsProcessConsumer(SqsClient("eu-west-1"), queue_url, handler, processes=8)
+        consumer.start()
+        
+        ...
+        
+        consumer.stop()
+    
+    Messages handed to a worker process which dies are counted as handler errors and sqs delivers them again after
+    their visibility timeout. Worker processes are checked every :py:attr:`WORKER_CHECK_INTERVAL` seconds and the ones
+    which died are replaced while the consumer runs.
+    '''
+    
+    WORKER_CHECK_INTERVAL = 0.5
+    PROCESS_JOIN_TIMEOUT = 10
+    
+    def __init__(self, sqs_client, queue_url, handler, processes=None, ring_size=4 * 1024 * 1024, receivers=2, 
+                 prefetch=200, max_messages=10, visibility_timeout=None, acknowledger=None, heartbeat=None, 
+                 mp_context=None):
+        '''
+        :param processes: The number of worker processes. When None the number of cpus is used.
+        :type processes: int
+        :param ring_size: The size in bytes of the shared memory ring of each worker process. Bodies larger than the ring
+                          are sent through the task pipe.
+        :type ring_size: int
+        :param mp_context: The multiprocessing context used to start the worker processes.
+        
+        The other parameters are the ones of :py:class:`aws.sqs.sqs_consumer.SqsConsumer`.
+        '''
+        
+        super().__init__(sqs_client, queue_url, handler, receivers, 1, prefetch, max_messages, visibility_timeout, 
+                         acknowledger, heartbeat)
+        
+        self._processes_count = processes or os.cpu_count() or 1
+        self._ring_size = ring_size
+        self._mp_context = mp_context or multiprocessing.get_context()
+        
+        self._rings = []
+        self._tasks = []
+        self._processes = []
+        self._results = None
+        self._results_thread = None
+        
+        self._pending = {}
+        self._seq = 0
+        self._next_worker = 0
+        self._cond = threading.Condition()
+    
+    def start(self):
+        '''Method used to start the worker processes, the receiver threads and the dispatcher thread.'''
+        
+        self._results = self._mp_context.Queue()
+        
+        for worker_idx in range(self._processes_count):
+            ring, tasks, process = self._start_worker(worker_idx)
+            
+            self._rings.append(ring)
+            self._tasks.append(tasks)
+            self._processes.append(process)
+        
+        self._results_thread = threading.Thread(target=self._collect_results, name="sqs-results", daemon=True)
+        self._results_thread.start()
+        
+        super().start()
+    
+    def _start_worker(self, worker_idx):
+        '''Method used to start a worker process with a new ring and a new task queue.
+        
+        :returns: A tuple (ring, tasks, process).'''
+        
+        ring = SharedMemoryRing(self._ring_size, self._mp_context)
+        tasks = self._mp_context.SimpleQueue()
+        
+        process = self._mp_context.Process(target=_run_process_worker, name="sqs-process-%s" % worker_idx,
+                                           args=(worker_idx, ring.buffer, tasks, self._results, self._handler),
+                                           daemon=True)
+        process.start()
+        
+        return ring, tasks, process
+    
+    def stop(self):
+        '''Method used to stop the consumer. Receivers finish their current receive, the prefetched messages are processed
+        by the worker processes and all acknowledgements are sent before the method returns. The messages of worker
+        processes which died are failed instead of being waited for and worker processes which do not exit within
+        :py:attr:`PROCESS_JOIN_TIMEOUT` seconds are terminated.'''
+        
+        self._stop_threads()
+        
+        with self._cond:
+            while not self._cond.wait_for(lambda: not self._pending, SqsProcessConsumer.WORKER_CHECK_INTERVAL):
+                self._fail_dead_workers()
+        
+        for tasks, process in zip(self._tasks, self._processes):
+            if process.is_alive():
+                tasks.put(None)
+        
+        for process in self._processes:
+            process.join(SqsProcessConsumer.PROCESS_JOIN_TIMEOUT)
+            
+            if process.is_alive():
+                process.terminate()
+                process.join()
+        
+        self._results.put(None)
+        self._results_thread.join()
+        self._results.close()
+        
+        self._rings, self._tasks, self._processes = [], [], []
+        
+        self._close_acknowledger()
+    
+    def _work(self):
+        '''Method used by the dispatcher thread to copy the prefetched message bodies into the rings of the worker
+        processes.'''
+        
+        while True:
+            message = self._prefetched.get()
+            
+            if message is None:
+                return
+            
+            codec, raw_body = message.encode()
+            
+            self._dispatch(message, raw_body.encode(), codec)
+    
+    def _dispatch(self, message, body, codec):
+        '''Method used to hand an encoded message body to the first worker process (round robin) whose ring has room for
+        it. The codec name travels with the task so the worker can decode the body.'''
+        
+        inline = len(body) > self._ring_size
+        
+        with self._cond:
+            while True:
+                for i in range(len(self._rings)):
+                    worker_idx = (self._next_worker + i) % len(self._rings)
+                    
+                    if self._processes[worker_idx].exitcode is not None:
+                        continue
+                    
+                    offset = None if inline else self._rings[worker_idx].write(body)
+                    
+                    if inline or offset is not None:
+                        break
+                else:
+                    self._cond.wait(SqsProcessConsumer.WORKER_CHECK_INTERVAL)
+                    continue
+                
+                break
+            
+            self._next_worker = worker_idx + 1
+            self._seq += 1
+            self._pending[self._seq] = (worker_idx, message)
+            
+            task = (self._seq, offset, len(body), body if inline else None, codec)
+            tasks = self._tasks[worker_idx]
+        
+        tasks.put(task)
+    
+    def _collect_results(self):
+        '''Method used by the results thread to release the ring records of handled messages and acknowledge the
+        successful ones. It also checks the worker processes periodically so the messages of a worker process which died
+        do not hold their prefetch slots until the consumer is stopped.'''
+        
+        next_check = time.time() + SqsProcessConsumer.WORKER_CHECK_INTERVAL
+        
+        while True:
+            try:
+                result = self._results.get(timeout=SqsProcessConsumer.WORKER_CHECK_INTERVAL)
+            except queue.Empty:
+                result = ()
+            
+            if time.time() >= next_check:
+                next_check = time.time() + SqsProcessConsumer.WORKER_CHECK_INTERVAL
+                
+                with self._cond:
+                    self._fail_dead_workers(respawn=not self._stopping.is_set())
+            
+            if result is None:
+                return
+            
+            if not result:
+                continue
+            
+            worker_idx, seq, in_ring, success = result
+            
+            with self._cond:
+                if seq not in self._pending:
+                    # the task was already failed because its worker process died.
+                    continue
+                
+                if in_ring:
+                    self._rings[worker_idx].release()
+                
+                message = self._pending.pop(seq)[1]
+                
+                self._cond.notify_all()
+            
+            self._complete(message, success)
+    
+    def _fail_dead_workers(self, respawn=False):
+        '''Method used to fail the pending messages of the worker processes which are not alive anymore. It must be called
+        holding the condition lock.
+        
+        :param respawn: A flag telling if the worker processes which died are replaced by new ones.
+        :type respawn: bool'''
+        
+        dead_workers = set(worker_idx for worker_idx in range(len(self._processes)) 
+                               if self._processes[worker_idx].exitcode is not None)
+        
+        orphaned = [seq for seq, (worker_idx, message) in self._pending.items() if worker_idx in dead_workers]
+        
+        for seq in orphaned:
+            self._complete(self._pending.pop(seq)[1], False)
+        
+        if respawn:
+            for worker_idx in dead_workers:
+                logger.warning("Worker process %s exited with code %s; starting a new one.", worker_idx, 
+                               self._processes[worker_idx].exitcode)
+                
+                self._rings[worker_idx], self._tasks[worker_idx], self._processes[worker_idx] = \
+                    self._start_worker(worker_idx)
+        
+        if orphaned or respawn and dead_workers:
+            self._cond.notify_all()
+    
+    def _complete(self, message, success):
+        '''Method used to acknowledge a handled message when it was successful and to update the statistics.'''
+        
+        self._untrack(message)
+        
+        if success:
+            self._acknowledger.ack(message)
+        
+        with self._stats_lock:
+            if success:
+                self.processed += 1
+            else:
+                self.handler_errors += 1
+        
+        self._slots.release()
\ No newline at end of file
@@ -0,0 +1,107 @@
+'''
+Copyright 2013 Cosnita Radu Viorel
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated 
+documentation files (the "Software"), to deal in the Software without restriction, including without limitation 
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, 
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE 
+WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR 
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, 
+ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+.. codeauthor:: Radu Viorel Cosnita <radu.cosnita@gmail.com>
+
+.. py:module:: aws.sqs.sqs_producer
+
+Module used to provide a buffered sqs producer which coalesces messages sent one at a time into SendMessageBatch
+requests.
+'''
+from aws.core.aws_exceptions import AwsGenericException
+from aws.sqs.sqs_batcher import SqsBatcher
+from aws.sqs.sqs_client import SqsBaseClient
+from concurrent.futures import Future
+
+class SqsProducer(SqsBatcher):
+    '''Class used to provide a buffered producer on top of :py:class:`aws.sqs.sqs_client.SqsClient`. Messages are held
+    in a buffer per queue which is sent as a SendMessageBatch request as soon as it holds 10 messages, reaches the bytes
+    threshold or its linger deadline passes (similar to linger.ms of Kafka producers). Batches are sent by background
+    threads and each sent message gets a future resolved to its message id. Once max_buffered messages are waiting to be
+    sent, :py:meth:`send` blocks until some of them are sent.
+    
+    .. code-block:: python
+    
+        producer = SqsProducer(SqsClient("eu-west-1"), linger=0.05)
+        
+        futures = [producer.send(QueueMessage(body={"index": i}, queue_url=queue_url)) for i in range(1000)]
+        
+        msg_ids = [future.result() for future in futures]
+        
+        producer.close()
+    '''
+    
+    def __init__(self, sqs_client, linger=0.05, batch_max_size=SqsBaseClient.BATCH_MAX_SIZE, max_buffered=10000, 
+                 max_workers=4):
+        '''
+        :param sqs_client: The sqs client used to send the batches.
+        :type sqs_client: :py:class:`aws.sqs.sqs_client.SqsClient`
+        :param linger: The maximum number of seconds a message waits in the buffer for other messages.
+        :type linger: float
+        :param batch_max_size: The number of bytes a buffer is sent at.
+        :type batch_max_size: int
+        :param max_buffered: The maximum number of messages buffered or in flight before send blocks.
+        :type max_buffered: int
+        :param max_workers: The number of threads sending batches concurrently.
+        :type max_workers: int
+        '''
+        
+        super().__init__(linger, batch_max_size, max_buffered, max_workers, name="sqs-producer")
+        
+        self._sqs_client = sqs_client
+    
+    def send(self, message, block=True, timeout=None):
+        '''Method used to buffer a message for sending. The message queue_url decides the queue it is sent to.
+        
+        :param message: The message we want to push to the queue.
+        :type message: :py:class:`aws.sqs.sqs_domain.QueueMessage`
+        :param block: Flag indicating if the call waits for room in the buffer when it is full.
+        :type block: bool
+        :param timeout: The maximum number of seconds to wait for room in the buffer.
+        :type timeout: float
+        :returns: A future resolved to the message id once the message is created.
+        :rtype: :py:class:`concurrent.futures.Future`
+        :raises: queue.Full if there is no room in the buffer.'''
+        
+        future = Future()
+        
+        self._add(message.queue_url, (message, future), len(str(message).encode()), block, timeout)
+        
+        return future
+    
+    def _send_batch(self, queue_url, entries):
+        '''Method used to send a batch and resolve the futures of its messages.'''
+        
+        try:
+            result = self._sqs_client.create_messages(queue_url, [entry[0] for entry in entries])
+        except Exception as ex:
+            for message, future in entries:
+                future.set_exception(ex)
+            
+            return
+        
+        errors = {id(error.message): error for error in result.failed}
+        
+        for message, future in entries:
+            error = errors.get(id(message))
+            
+            if error is None:
+                future.set_result(message.msg_id)
+                continue
+            
+            future.set_exception(AwsGenericException(http_status=None, 
+                                                     error_type="Sender" if error.sender_fault else "Receiver",
+                                                     error_code=error.error_code, error_msg=error.error_msg,
+                                                     request_id=None))
\ No newline at end of file
@@ -0,0 +1,62 @@
+'''
+Copyright 2013 Cosnita Radu Viorel
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated 
+documentation files (the "Software"), to deal in the Software without restriction, including without limitation 
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, 
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE 
+WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR 
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, 
+ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+.. codeauthor:: Radu Viorel Cosnita <radu.cosnita@gmail.com>
+
+.. py:module:: aws.sqs.tests.bench_sqs_codecs
+
+Module used to provide a micro benchmark comparing the encode time, decode time and encoded size of the registered
+message body codecs.
+
+.. code-block:: bash
+
+    python -m aws.sqs.tests.bench_sqs_codecs
+'''
+from aws.sqs.sqs_domain import QueueMessageCodecs
+import timeit
+
+CODECS = ["json", "json-compact", "binary", "zlib", "lzma"]
+
+def get_scenarios():
+    '''Method used to obtain the bodies encoded by the benchmark.'''
+    
+    order = {"id": 123456, "customer": "Test Customer é", "paid": True, "total": 1234.56,
+             "tags": ["priority", "gift"]}
+    
+    items = [{"sku": "SKU-%06d" % i, "name": "Product name %s" % i, "quantity": i % 7, "price": i * 1.25, 
+              "attributes": {"color": "blue", "size": "M"}} for i in range(500)]
+    
+    return [("small (order)", order),
+            ("large (500 items)", {"order": order, "items": items})]
+
+def run(number=200):
+    '''Method used to run the benchmark and print the encode / decode time and the encoded size of each codec.'''
+    
+    print("%-20s %-14s %12s %12s %10s" % ("body", "codec", "encode", "decode", "size"))
+    
+    for name, body in get_scenarios():
+        for codec_name in CODECS:
+            codec = QueueMessageCodecs.get_codec(codec_name)
+            used_codec_name, raw_body = codec.encode(body)
+            used_codec = QueueMessageCodecs.get_codec(used_codec_name)
+            
+            encode_time = min(timeit.repeat(lambda: codec.encode(body), number=number, repeat=3)) / number
+            decode_time = min(timeit.repeat(lambda: used_codec.decode(raw_body), number=number, repeat=3)) / number
+            
+            print("%-20s %-14s %9.1f us %9.1f us %10d" % (name, codec_name, encode_time * 1e6, decode_time * 1e6,
+                                                          len(raw_body.encode())))
+
+if __name__ == "__main__":
+    run()
\ No newline at end of file
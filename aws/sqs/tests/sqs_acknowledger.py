@@ -0,0 +1,134 @@
+'''
+Copyright 2013 Cosnita Radu Viorel
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated 
+documentation files (the "Software"), to deal in the Software without restriction, including without limitation 
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, 
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE 
+WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR 
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, 
+ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+.. codeauthor:: Radu Viorel Cosnita <radu.cosnita@gmail.com>
+
+.. py:module:: aws.sqs.tests.sqs_acknowledger
+
+Module used to provide the test suite for the buffered sqs acknowledger.
+'''
+from aws.sqs.sqs_acknowledger import SqsAcknowledger
+from aws.sqs.sqs_domain import QueueBatchError, QueueBatchResult, QueueMessage
+from mock import Mock
+import threading
+import time
+import unittest
+
+class FakeSqsClient(object):
+    '''Sqs client stand-in which records deleted batches and fails the receipt handles it is told to.'''
+    
+    def __init__(self, failures=None):
+        self.batches = []
+        self.times = []
+        self.failures = failures or {}
+        self._lock = threading.Lock()
+    
+    def delete_messages_batch(self, queue_url, messages):
+        result = QueueBatchResult()
+        
+        with self._lock:
+            self.batches.append((queue_url, [message.receipt_handle for message in messages]))
+            self.times.append(time.time())
+            
+            for message in messages:
+                failures = self.failures.get(message.receipt_handle)
+                
+                if failures:
+                    result.failed.append(QueueBatchError(message, failures[0][0], "Failed.", failures[0][1]))
+                    
+                    self.failures[message.receipt_handle] = failures[1:]
+                    continue
+                
+                result.successful.append(message)
+        
+        return result
+
+class SqsAcknowledgerTests(unittest.TestCase):
+    '''Class used to provide all test cases for the buffered sqs acknowledger.'''
+    
+    def _get_message(self, i, queue_url="/123/q"):
+        return QueueMessage(msg_id="msg-%s" % i, receipt_handle="handle-%s" % i, queue_url=queue_url)
+    
+    def test_coalesce_acks(self):
+        '''Test case for making sure acks from many threads are coalesced into batches of at most 10 per queue.'''
+        
+        sqs_client = FakeSqsClient()
+        acknowledger = SqsAcknowledger(sqs_client, linger=0.05)
+        
+        def handler(offset):
+            for i in range(offset, offset + 25):
+                acknowledger.ack(self._get_message(i, "/123/q%s" % (i % 2)))
+        
+        threads = [threading.Thread(target=handler, args=(i * 25, )) for i in range(4)]
+        
+        for thread in threads:
+            thread.start()
+        
+        for thread in threads:
+            thread.join()
+        
+        acknowledger.close()
+        
+        self.assertEqual(100, acknowledger.deleted)
+        self.assertEqual(0, acknowledger.failed)
+        self.assertTrue(all(len(handles) <= 10 for queue_url, handles in sqs_client.batches))
+        self.assertEqual(100, len(set(handle for queue_url, handles in sqs_client.batches for handle in handles)))
+        
+        for queue_url, handles in sqs_client.batches:
+            self.assertTrue(all(int(handle.split("-")[1]) % 2 == int(queue_url[-1]) for handle in handles))
+    
+    def test_retry_failures(self):
+        '''Test case for making sure retryable failures are deleted again and sender faults are reported.'''
+        
+        sqs_client = FakeSqsClient({"handle-1": [("InternalError", False)], 
+                                    "handle-2": [("ReceiptHandleIsInvalid", True)],
+                                    "handle-3": [("InternalError", False)] * 5})
+        acknowledger = SqsAcknowledger(sqs_client, linger=0.01, max_retries=2)
+        
+        for i in range(4):
+            acknowledger.ack(self._get_message(i))
+        
+        acknowledger.close()
+        
+        self.assertEqual(2, acknowledger.deleted)
+        self.assertEqual(3, acknowledger.retried)
+        self.assertEqual(2, acknowledger.failed)
+        self.assertEqual(["ReceiptHandleIsInvalid", "InternalError"], [error.error_code for error in acknowledger.errors])
+        self.assertEqual("handle-3", acknowledger.errors[1].message.receipt_handle)
+    
+    def test_retry_backoff(self):
+        '''Test case for making sure retryable failures are deleted again only after the retry policy backoff delay.'''
+        
+        sqs_client = FakeSqsClient({"handle-1": [("InternalError", False)] * 2})
+        retry_policy = Mock(get_delay=Mock(return_value=0.1))
+        acknowledger = SqsAcknowledger(sqs_client, linger=0.01, retry_policy=retry_policy)
+        
+        acknowledger.ack(self._get_message(1))
+        acknowledger.close()
+        
+        self.assertEqual(1, acknowledger.deleted)
+        self.assertEqual(2, acknowledger.retried)
+        self.assertEqual([0, 1], [call[0][0] for call in retry_policy.get_delay.call_args_list])
+        self.assertEqual(3, len(sqs_client.times))
+        self.assertGreaterEqual(sqs_client.times[1] - sqs_client.times[0], 0.1)
+        self.assertGreaterEqual(sqs_client.times[2] - sqs_client.times[1], 0.1)
+    
+    def test_ack_closed(self):
+        '''Test case for making sure acks are rejected once the acknowledger is closed.'''
+        
+        acknowledger = SqsAcknowledger(FakeSqsClient())
+        acknowledger.close()
+        
+        self.assertRaises(ValueError, acknowledger.ack, self._get_message(1))
\ No newline at end of file
@@ -0,0 +1,250 @@
+'''
+Copyright 2013 Cosnita Radu Viorel
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated 
+documentation files (the "Software"), to deal in the Software without restriction, including without limitation 
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, 
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE 
+WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR 
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, 
+ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+.. codeauthor:: Radu Viorel Cosnita <radu.cosnita@gmail.com>
+
+.. py:module:: aws.sqs.tests.sqs_async_client
+
+Module used to provide the test suite for the asyncio sqs client.
+'''
+from aws.core.aws_exceptions import AwsGenericException
+from aws.core.aws_retry import AwsRetryPolicy
+from aws.sqs.sqs_async_client import AsyncSqsClient
+from aws.sqs.sqs_domain import QueueMessage
+from aws.sqs.sqs_exceptions import AwsSqsNonExistentQueue
+from urllib.parse import parse_qs, urlsplit
+import asyncio
+import json
+import unittest
+
+class FakeAsyncHttpClient(object):
+    '''Asyncio http client stand-in which records every request and answers with canned responses.'''
+    
+    def __init__(self):
+        self.requests = []
+        self.responses = {}
+    
+    async def do_request(self, url, headers, action, method="GET", body=None):
+        await asyncio.sleep(0)
+        
+        self.requests.append((url, headers, action, method, body))
+        
+        response = self.responses[action]
+        
+        if isinstance(response, list):
+            response = response.pop(0)
+        
+        if isinstance(response, Exception):
+            raise response
+        
+        return response
+    
+    def close(self):
+        pass
+
+class AsyncSqsClientTests(unittest.IsolatedAsyncioTestCase):
+    '''Class used to provide all test cases for the asyncio sqs client.'''
+    
+    def setUp(self):
+        self._sqs_client = AsyncSqsClient("eu-west-1", http_client=FakeAsyncHttpClient)
+        self._http_client = self._sqs_client._http_client
+        
+    def _get_params(self, request_idx=-1):
+        url, body = self._http_client.requests[request_idx][0], self._http_client.requests[request_idx][-1]
+        query = urlsplit(url).query
+        
+        if body:
+            query += "&" + body.decode()
+        
+        return {key: value[0] for key, value in parse_qs(query).items()}
+    
+    async def test_network_error_retried_for_reads_only(self):
+        '''Test case for checking that network errors are retried for receives but not for writes which sqs might have
+        processed already.'''
+        
+        self._http_client.responses["ReceiveMessage"] = \
+                [ConnectionResetError(), {"messages": [{"MessageId": "msg-1", "ReceiptHandle": "handle-1", "Body": "1"}]}]
+        self._http_client.responses["SendMessage"] = [ConnectionResetError(), {"MessageId": "msg-2"}]
+        
+        self.assertEqual([1], [message.body for message in await self._sqs_client.get_messages("/123/test-queue")])
+        
+        with self.assertRaises(ConnectionResetError):
+            await self._sqs_client.create_message(QueueMessage(body={"a": 1}, queue_url="/123/test-queue"))
+        
+        self.assertEqual(["ReceiveMessage", "ReceiveMessage", "SendMessage"], 
+                         [request[2] for request in self._http_client.requests])
+    
+    async def test_get_queue_url(self):
+        '''Test case for checking that queue url is obtained relative to sqs host.'''
+        
+        self._http_client.responses["GetQueueUrl"] = \
+                {"QueueUrl": "http://sqs.eu-west-1.amazonaws.com/123/test-queue"}
+        
+        queue_url = await self._sqs_client.get_queue_url("test-queue")
+        
+        self.assertEqual("/123/test-queue", queue_url)
+        self.assertEqual("test-queue", self._get_params()["QueueName"])
+        self.assertIn("X-Amz-Signature", self._get_params())
+        
+    async def test_create_message(self):
+        '''Test case for checking that the message id is appended to the created message.'''
+        
+        self._http_client.responses["SendMessage"] = {"MessageId": "msg-1"}
+        
+        message = QueueMessage(body={"name": "test"}, queue_url="/123/test-queue")
+        
+        await self._sqs_client.create_message(message)
+        
+        self.assertEqual("msg-1", message.msg_id)
+        self.assertEqual({"name": "test"}, json.loads(self._get_params()["MessageBody"]))
+    
+    async def test_get_messages_concurrent(self):
+        '''Test case for checking that many receives can be in flight on the same client.'''
+        
+        self._http_client.responses["ReceiveMessage"] = \
+                {"messages": [{"MessageId": "msg-1", "ReceiptHandle": "handle-1", "Body": json.dumps({"a": 1})}]}
+        
+        results = await asyncio.gather(*[self._sqs_client.get_messages("/123/test-queue", 5) for i in range(1000)])
+        
+        self.assertEqual(1000, len(results))
+        self.assertEqual(1000, len(self._http_client.requests))
+        
+        message = results[0][0]
+        
+        self.assertEqual("msg-1", message.msg_id)
+        self.assertEqual("handle-1", message.receipt_handle)
+        self.assertEqual({"a": 1}, message.body)
+        self.assertEqual("/123/test-queue", message.queue_url)
+        self.assertEqual("5", self._get_params()["MaxNumberOfMessages"])
+        
+    async def test_delete_messages(self):
+        '''Test case for checking that deleted message ids are returned.'''
+        
+        self._http_client.responses["DeleteMessageBatch"] = {"Successful": [{"Id": "1"}, {"Id": "2"}]}
+        
+        messages = [QueueMessage(receipt_handle="handle-%s" % i) for i in range(2)]
+        
+        deleted = await self._sqs_client.delete_messages("/123/test-queue", messages)
+        
+        self.assertEqual(["1", "2"], deleted)
+        self.assertEqual("handle-1", self._get_params()["DeleteMessageBatchRequestEntry.2.ReceiptHandle"])
+    
+    async def test_get_queue_url_single_flight(self):
+        '''Test case for checking that concurrent lookups of a queue url share a single request.'''
+        
+        self._http_client.responses["GetQueueUrl"] = \
+                {"QueueUrl": "http://sqs.eu-west-1.amazonaws.com/123/test-queue"}
+        
+        queue_urls = await asyncio.gather(*[self._sqs_client.get_queue_url("test-queue") for i in range(100)])
+        
+        self.assertEqual(["/123/test-queue"] * 100, queue_urls)
+        self.assertEqual("/123/test-queue", await self._sqs_client.get_queue_url("test-queue"))
+        self.assertEqual(1, len(self._http_client.requests))
+    
+    async def test_create_messages(self):
+        '''Test case for checking that message batches are sent concurrently and every message gets its id.'''
+        
+        self._http_client.responses["SendMessageBatch"] = \
+                {"Successful": [{"Id": str(i), "MessageId": "msg-%s" % i} for i in range(10)]}
+        
+        messages = [QueueMessage(body=i) for i in range(30)]
+        
+        result = await self._sqs_client.create_messages("/123/test-queue", messages)
+        
+        self.assertEqual(30, len(result.successful))
+        self.assertEqual([], result.failed)
+        self.assertEqual(3, len(self._http_client.requests))
+        self.assertEqual(["msg-%s" % (i % 10) for i in range(30)], [message.msg_id for message in messages])
+    
+    async def test_batch_unexpected_errors(self):
+        '''Test case for checking that a concurrent batch request failing with a non aws error only fails the entries of
+        its bucket.'''
+        
+        self._http_client.responses["DeleteMessageBatch"] = \
+                [{"Successful": [{"Id": str(i)} for i in range(1, 11)]}, ValueError("Invalid response.")]
+        self._http_client.responses["ChangeMessageVisibilityBatch"] = [ValueError("Invalid response."), {}]
+        self._http_client.responses["SendMessageBatch"] = \
+                [ValueError("Invalid response."), {"Successful": [{"Id": "0", "MessageId": "msg-1"}]}]
+        
+        messages = [QueueMessage(receipt_handle="handle-%s" % i) for i in range(12)]
+        
+        result = await self._sqs_client.delete_messages_batch("/123/test-queue", messages)
+        
+        self.assertEqual(messages[:10], result.successful)
+        self.assertEqual(messages[10:], [error.message for error in result.failed])
+        self.assertEqual(["ValueError"] * 2, [error.error_code for error in result.failed])
+        
+        result = await self._sqs_client.change_visibility_batch("/123/test-queue", messages, 30)
+        
+        self.assertEqual(messages[:10], [error.message for error in result.failed])
+        
+        messages = [QueueMessage(body="a" * 200 * 1024) for i in range(2)]
+        
+        result = await self._sqs_client.create_messages("/123/test-queue", messages)
+        
+        self.assertEqual(messages[1:], result.successful)
+        self.assertEqual([(messages[0], "ValueError")], 
+                         [(error.message, error.error_code) for error in result.failed])
+    
+    async def test_iter_messages(self):
+        '''Test case for checking that the asynchronous iterator yields the received messages.'''
+        
+        self._http_client.responses["ReceiveMessage"] = \
+                {"messages": [{"MessageId": "msg-1", "ReceiptHandle": "handle-1", "Body": json.dumps({"a": 1})}]}
+        
+        received = []
+        
+        async for message in self._sqs_client.iter_messages("/123/test-queue", max_inflight=3):
+            received.append(message)
+            
+            if len(received) == 10:
+                break
+        
+        self.assertEqual([{"a": 1}] * 10, [message.body for message in received])
+        self.assertLessEqual(len(self._http_client.requests), 10 + 3 + 3)
+    
+    async def test_iter_messages_receive_errors(self):
+        '''Test case for checking that the asynchronous iterator keeps polling after failed receives and validates its
+        arguments eagerly.'''
+        
+        message = {"MessageId": "msg-1", "ReceiptHandle": "handle-1", "Body": "1"}
+        unavailable = AwsGenericException(503, "Receiver", "ServiceUnavailable", "Unavailable", "req-1")
+        
+        self._sqs_client._retry_policy = AwsRetryPolicy(max_attempts=1, base_delay=0, max_delay=0)
+        self._http_client.responses["ReceiveMessage"] = [unavailable, unavailable, {"messages": [message]}] * 3
+        
+        received = []
+        
+        with self.assertLogs("aws.sqs.sqs_async_client", "WARNING") as logs:
+            async for message in self._sqs_client.iter_messages("/123/test-queue", max_inflight=1):
+                received.append(message)
+                
+                if len(received) == 3:
+                    break
+        
+        self.assertEqual([1] * 3, [message.body for message in received])
+        self.assertEqual(6, len(logs.records))
+        self.assertRaises(ValueError, self._sqs_client.iter_messages, "/123/test-queue", max_inflight=0)
+    
+    async def test_iter_messages_non_existent_queue(self):
+        '''Test case for checking that the asynchronous iterator raises errors which can not be retried.'''
+        
+        self._http_client.responses["ReceiveMessage"] = AwsSqsNonExistentQueue("Sender", "No queue", "req-1")
+        
+        with self.assertRaises(AwsSqsNonExistentQueue):
+            async for message in self._sqs_client.iter_messages("/123/test-queue", max_inflight=2):
+                pass
+        
+        self.assertLessEqual(len(self._http_client.requests), 2)
\ No newline at end of file
@@ -0,0 +1,465 @@
+'''
+Copyright 2013 Cosnita Radu Viorel
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated 
+documentation files (the "Software"), to deal in the Software without restriction, including without limitation 
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, 
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE 
+WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR 
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, 
+ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+.. codeauthor:: Radu Viorel Cosnita <radu.cosnita@gmail.com>
+
+.. py:module:: aws.sqs.tests.sqs_client
+
+Module used to provide the test suite for the sqs client.
+'''
+from aws.core.aws_cache import AwsTtlCache
+from aws.core.aws_exceptions import AwsGenericException
+from aws.core.aws_retry import AwsRetryPolicy
+from aws.sqs import sqs_client
+from aws.sqs.sqs_client import SqsClient
+from aws.sqs.sqs_domain import QueueMessage
+from aws.sqs.sqs_exceptions import AwsSqsNonExistentQueue
+import re
+from mock import Mock, patch
+from urllib.parse import parse_qs, urlsplit
+import json
+import time
+import unittest
+
+class FakeHttpClient(object):
+    '''Http client stand-in which records every request and answers with canned responses.'''
+    
+    def __init__(self, http_module):
+        self.requests = []
+        self.responses = {}
+    
+    def do_request(self, url, headers, action, method="GET", body=None):
+        self.requests.append((url, headers, action, method, body))
+        
+        response = self.responses[action]
+        
+        if isinstance(response, list):
+            response = response.pop(0)
+        
+        if isinstance(response, Exception):
+            raise response
+        
+        if callable(response):
+            response = response(url, body)
+        
+        return response
+
+class SqsClientTests(unittest.TestCase):
+    '''Class used to provide all test cases for the sqs client.'''
+    
+    def setUp(self):
+        self._sqs_client = SqsClient("eu-west-1", http_client=FakeHttpClient, 
+                                     retry_policy=AwsRetryPolicy(base_delay=0, max_delay=0))
+        self._http_client = self._sqs_client._http_client
+        
+        self._http_client.responses["ReceiveMessage"] = {"messages": []}
+        
+    def _get_params(self, request_idx=-1):
+        url, body = self._http_client.requests[request_idx][0], self._http_client.requests[request_idx][-1]
+        query = urlsplit(url).query
+        
+        if body:
+            query += "&" + body.decode()
+        
+        return {key: value[0] for key, value in parse_qs(query).items()}
+        
+    def test_get_messages(self):
+        '''Test case for checking that received messages are cast to queue messages.'''
+        
+        self._http_client.responses["ReceiveMessage"] = \
+                {"messages": [{"MessageId": "msg-1", "ReceiptHandle": "handle-1", "Body": json.dumps({"a": 1})}]}
+        
+        messages = self._sqs_client.get_messages("/123/test-queue", 5)
+        
+        self.assertEqual(1, len(messages))
+        self.assertEqual("msg-1", messages[0].msg_id)
+        self.assertEqual({"a": 1}, messages[0].body)
+        self.assertEqual("/123/test-queue", messages[0].queue_url)
+        self.assertEqual("5", self._get_params()["MaxNumberOfMessages"])
+        
+    def test_get_messages_sqs_internal_error_retried(self):
+        '''Test case for checking that the default retry policy of the client retries sqs specific internal errors.'''
+        
+        client = SqsClient("eu-west-1", http_client=FakeHttpClient)
+        client._http_client.responses["ReceiveMessage"] = \
+                [AwsGenericException(400, "Receiver", "AWS.SimpleQueueService.InternalError", "Internal", "req-1"),
+                 {"messages": [{"MessageId": "msg-1", "ReceiptHandle": "handle-1", "Body": "1"}]}]
+        
+        self.assertEqual([1], [message.body for message in client.get_messages("/123/test-queue")])
+        self.assertEqual(2, len(client._http_client.requests))
+    
+    def test_network_error_retried_for_reads_only(self):
+        '''Test case for checking that network errors are retried for receives but not for writes which sqs might have
+        processed already.'''
+        
+        self._http_client.responses["ReceiveMessage"] = \
+                [ConnectionResetError(), {"messages": [{"MessageId": "msg-1", "ReceiptHandle": "handle-1", "Body": "1"}]}]
+        self._http_client.responses["SendMessage"] = [ConnectionResetError(), {"MessageId": "msg-2"}]
+        
+        self.assertEqual([1], [message.body for message in self._sqs_client.get_messages("/123/test-queue")])
+        self.assertRaises(ConnectionResetError, self._sqs_client.create_message, 
+                          QueueMessage(body={"a": 1}, queue_url="/123/test-queue"))
+        self.assertEqual(["ReceiveMessage", "ReceiveMessage", "SendMessage"], 
+                         [request[2] for request in self._http_client.requests])
+    
+    def test_get_messages_long_polling(self):
+        '''Test case for checking that long polling and visibility timeout parameters are sent only when given.'''
+        
+        self._sqs_client.get_messages("/123/test-queue", 10, wait_time_seconds=20, visibility_timeout=60)
+        
+        self.assertEqual("20", self._get_params()["WaitTimeSeconds"])
+        self.assertEqual("60", self._get_params()["VisibilityTimeout"])
+        
+        self._sqs_client.get_messages("/123/test-queue", 10, wait_time_seconds=0)
+        
+        self.assertEqual("0", self._get_params()["WaitTimeSeconds"])
+        self.assertNotIn("VisibilityTimeout", self._get_params())
+    
+    def test_get_messages_presigned_reused(self):
+        '''Test case for checking that identical receives reuse the same presigned url until it gets close to expiring.'''
+        
+        with patch.object(sqs_client, "time") as fake_time:
+            fake_time.time = Mock(return_value=1362984930)
+            fake_time.gmtime = time.gmtime
+            fake_time.strftime = time.strftime
+            
+            for i in range(3):
+                self._sqs_client.get_messages("/123/test-queue")
+            
+            self._sqs_client.get_messages("/123/test-queue", 5)
+            
+            fake_time.time.return_value += 300 - SqsClient.PRESIGNED_URLS_MARGIN
+            
+            self._sqs_client.get_messages("/123/test-queue")
+        
+        urls = [request[0] for request in self._http_client.requests]
+        
+        self.assertEqual(1, len(set(urls[:3])))
+        self.assertNotEqual(urls[0], urls[3])
+        self.assertNotEqual(urls[0], urls[4])
+        self.assertEqual("300", self._get_params(0)["X-Amz-Expires"])
+        
+    def test_get_messages_presigned_disabled(self):
+        '''Test case for checking that presigned urls are not used when presign_expires is 0.'''
+        
+        sqs = SqsClient("eu-west-1", http_client=FakeHttpClient, presign_expires=0)
+        sqs._http_client.responses["ReceiveMessage"] = {"messages": []}
+        
+        sqs.get_messages("/123/test-queue")
+        
+        self.assertNotIn("X-Amz-Expires", sqs._http_client.requests[0][0])
+    
+    def test_get_messages_presigned_evicted(self):
+        '''Test case for checking that the least recently used presigned url is evicted once the cache is full.'''
+        
+        with patch.object(sqs_client.SqsBaseClient, "PRESIGNED_URLS_MAX_SIZE", 2):
+            sqs = SqsClient("eu-west-1", http_client=FakeHttpClient)
+        
+        sqs._http_client.responses["ReceiveMessage"] = {"messages": []}
+        
+        for queue_url in ["/123/queue-1", "/123/queue-2", "/123/queue-1", "/123/queue-3", "/123/queue-1"]:
+            sqs.get_messages(queue_url)
+        
+        urls = [request[0] for request in sqs._http_client.requests]
+        
+        self.assertEqual(2, len(sqs._presigned_urls))
+        self.assertEqual(urls[0], urls[2])
+        self.assertEqual(urls[0], urls[4])
+    
+    def test_create_message_not_presigned(self):
+        '''Test case for checking that writes are never presigned.'''
+        
+        self._http_client.responses["SendMessage"] = {"MessageId": "msg-1"}
+        
+        message = QueueMessage(body={"a": 1}, queue_url="/123/test-queue")
+        
+        self._sqs_client.create_message(message)
+        
+        self.assertEqual("msg-1", message.msg_id)
+        self.assertNotIn("X-Amz-Expires", self._get_params())
+    
+    def test_create_message_form_body(self):
+        '''Test case for checking that writes send their parameters in a signed form body and keep only the
+        authentication parameters in the url.'''
+        
+        self._http_client.responses["SendMessage"] = {"MessageId": "msg-1"}
+        
+        message = QueueMessage(body={"text": "a&b=c " * 1000}, queue_url="/123/test-queue")
+        
+        self._sqs_client.create_message(message)
+        
+        url, headers, action, method, body = self._http_client.requests[-1]
+        form = {key: value[0] for key, value in parse_qs(body.decode()).items()}
+        
+        self.assertEqual("POST", method)
+        self.assertEqual("application/x-www-form-urlencoded; charset=utf-8", headers["Content-Type"])
+        self.assertEqual(str(message), form["MessageBody"])
+        self.assertEqual("SendMessage", form["Action"])
+        self.assertEqual(SqsClient.SQS_API_VERSION, form["Version"])
+        self.assertTrue(all(key.startswith("X-Amz-") for key in parse_qs(urlsplit(url).query)))
+        self.assertLess(len(url), 512)
+    
+    def test_delete_messages_form_body(self):
+        '''Test case for checking that deletes are sent as form encoded posts.'''
+        
+        self._http_client.responses["DeleteMessageBatch"] = {"Successful": [{"Id": "1"}]}
+        
+        message = QueueMessage(receipt_handle="handle-1", queue_url="/123/test-queue")
+        
+        self.assertEqual(["1"], self._sqs_client.delete_messages("/123/test-queue", [message]))
+        
+        url, headers, action, method, body = self._http_client.requests[-1]
+        
+        self.assertEqual("POST", method)
+        self.assertIn(b"DeleteMessageBatchRequestEntry.1.ReceiptHandle=handle-1", body)
+    
+    def test_get_queue_url_cached(self):
+        '''Test case for checking that queue urls are cached and shared by clients using the same cache.'''
+        
+        self._http_client.responses["GetQueueUrl"] = {"QueueUrl": "http://sqs.eu-west-1.amazonaws.com/123/test-queue"}
+        
+        for i in range(3):
+            self.assertEqual("/123/test-queue", self._sqs_client.get_queue_url("test-queue"))
+        
+        self.assertEqual(1, len(self._http_client.requests))
+        
+        queue_url_cache = AwsTtlCache()
+        sqs1 = SqsClient("eu-west-1", http_client=FakeHttpClient, queue_url_cache=queue_url_cache)
+        sqs2 = SqsClient("eu-west-1", http_client=FakeHttpClient, queue_url_cache=queue_url_cache)
+        sqs1._http_client.responses = self._http_client.responses
+        
+        self.assertEqual("/123/test-queue", sqs1.get_queue_url("test-queue"))
+        self.assertEqual("/123/test-queue", sqs2.get_queue_url("test-queue"))
+        self.assertEqual(0, len(sqs2._http_client.requests))
+    
+    def test_get_queue_url_invalidated(self):
+        '''Test case for checking that the cached url of a queue is dropped when the queue does not exist anymore.'''
+        
+        self._http_client.responses["GetQueueUrl"] = \
+                [{"QueueUrl": "http://sqs.eu-west-1.amazonaws.com/123/test-queue"}, 
+                 {"QueueUrl": "http://sqs.eu-west-1.amazonaws.com/456/test-queue"}]
+        self._http_client.responses["ReceiveMessage"] = \
+                AwsGenericException(400, "Sender", "AWS.SimpleQueueService.NonExistentQueue", "No queue.", "req-1")
+        
+        queue_url = self._sqs_client.get_queue_url("test-queue")
+        
+        self.assertRaises(AwsGenericException, self._sqs_client.get_messages, queue_url)
+        
+        self.assertEqual("/456/test-queue", self._sqs_client.get_queue_url("test-queue"))
+    
+    def _send_message_batch(self, url, body, failed_ids=()):
+        '''Method used to answer SendMessageBatch requests like sqs does.'''
+        
+        entry_ids = re.findall(r"SendMessageBatchRequestEntry\.\d+\.Id=(\d+)", body.decode())
+        
+        return {"Successful": [{"Id": entry_id, "MessageId": "msg-%s" % entry_id} 
+                                    for entry_id in entry_ids if entry_id not in failed_ids],
+                "Failed": [{"Id": entry_id, "Code": "InternalError", "Message": "Try again.", "SenderFault": False}
+                                    for entry_id in entry_ids if entry_id in failed_ids]}
+    
+    def test_create_messages_buckets(self):
+        '''Test case for checking that messages are split in batches of at most 10 entries and 256 KB.'''
+        
+        self._http_client.responses["SendMessageBatch"] = self._send_message_batch
+        
+        messages = [QueueMessage(body=i) for i in range(25)]
+        
+        result = self._sqs_client.create_messages("/123/test-queue", messages)
+        
+        self.assertTrue(result)
+        self.assertEqual(messages, result.successful)
+        self.assertEqual(3, len(self._http_client.requests))
+        self.assertEqual(["msg-%s" % (i % 10) for i in range(25)], [message.msg_id for message in messages])
+        
+        self._http_client.requests = []
+        
+        messages = [QueueMessage(body="a" * 100 * 1024) for i in range(5)]
+        
+        result = self._sqs_client.create_messages("/123/test-queue", messages)
+        
+        self.assertEqual(5, len(result.successful))
+        self.assertEqual(3, len(self._http_client.requests))
+        self.assertEqual("SendMessageBatch", self._get_params()["Action"])
+        self.assertEqual(str(messages[4]), self._get_params()["SendMessageBatchRequestEntry.1.MessageBody"])
+    
+    def test_create_messages_failures(self):
+        '''Test case for checking that failed entries, failed requests and oversized messages are reported.'''
+        
+        self._http_client.responses["SendMessageBatch"] = \
+                [lambda url, body: self._send_message_batch(url, body, failed_ids=("1",)),
+                 AwsGenericException(403, "Sender", "AccessDenied", "Access denied.", "req-1")]
+        
+        messages = [QueueMessage(body=i) for i in range(12)] + [QueueMessage(body="a" * 256 * 1024)]
+        
+        result = self._sqs_client.create_messages("/123/test-queue", messages)
+        
+        self.assertFalse(result)
+        self.assertEqual(messages[:1] + messages[2:10], result.successful)
+        self.assertEqual([messages[1], messages[12], messages[10], messages[11]], 
+                         [error.message for error in result.failed])
+        self.assertEqual(["InternalError", "MessageTooLong", "AccessDenied", "AccessDenied"], 
+                         [error.error_code for error in result.failed])
+        self.assertEqual([False, True, True, True], [error.sender_fault for error in result.failed])
+        self.assertIsNone(messages[1].msg_id)
+    
+    def test_delete_messages_batch(self):
+        '''Test case for checking that deletes are chunked by 10 and failed entries are reported.'''
+        
+        def delete_message_batch(url, body):
+            entry_ids = re.findall(r"DeleteMessageBatchRequestEntry\.\d+\.Id=(\d+)", body.decode())
+            
+            return {"Successful": [{"Id": entry_id} for entry_id in entry_ids if entry_id != "3"],
+                    "Failed": [{"Id": "3", "Code": "ReceiptHandleIsInvalid", "Message": "Bad.", "SenderFault": True}]}
+        
+        self._http_client.responses["DeleteMessageBatch"] = delete_message_batch
+        
+        messages = [QueueMessage(receipt_handle="handle-%s" % i) for i in range(25)]
+        
+        result = self._sqs_client.delete_messages_batch("/123/test-queue", messages)
+        
+        self.assertEqual(3, len(self._http_client.requests))
+        self.assertEqual(22, len(result.successful))
+        self.assertEqual([messages[2], messages[12], messages[22]], [error.message for error in result.failed])
+        self.assertTrue(all(error.sender_fault for error in result.failed))
+        
+        deleted = self._sqs_client.delete_messages("/123/test-queue", messages[:5])
+        
+        self.assertEqual(["1", "2", "4", "5"], deleted)
+    
+    def test_change_visibility(self):
+        '''Test case for checking that visibility timeouts are changed for single messages and in batches of 10.'''
+        
+        self._http_client.responses["ChangeMessageVisibility"] = {}
+        self._http_client.responses["ChangeMessageVisibilityBatch"] = lambda url, body: \
+                {"Successful": [{"Id": entry_id} 
+                                    for entry_id in re.findall(r"RequestEntry\.\d+\.Id=(\d+)", body.decode())]}
+        
+        messages = [QueueMessage(receipt_handle="handle-%s" % i, queue_url="/123/test-queue") for i in range(15)]
+        
+        self._sqs_client.change_visibility(messages[0], 60)
+        
+        self.assertEqual("handle-0", self._get_params()["ReceiptHandle"])
+        self.assertEqual("60", self._get_params()["VisibilityTimeout"])
+        
+        result = self._sqs_client.change_visibility_batch("/123/test-queue", messages, 30)
+        
+        self.assertEqual(3, len(self._http_client.requests))
+        self.assertEqual(15, len(result.successful))
+        self.assertEqual("handle-14", self._get_params()["ChangeMessageVisibilityBatchRequestEntry.5.ReceiptHandle"])
+        self.assertEqual("30", self._get_params()["ChangeMessageVisibilityBatchRequestEntry.5.VisibilityTimeout"])
+    
+    def test_batch_unexpected_errors(self):
+        '''Test case for checking that a batch request failing with a non aws error only fails the entries of its bucket.'''
+        
+        def delete_message_batch(url, body):
+            return {"Successful": [{"Id": entry_id} 
+                                       for entry_id in re.findall(r"RequestEntry\.\d+\.Id=(\d+)", body.decode())]}
+        
+        self._http_client.responses["DeleteMessageBatch"] = [ValueError("Invalid response."), delete_message_batch]
+        self._http_client.responses["ChangeMessageVisibilityBatch"] = [delete_message_batch, 
+                                                                       UnicodeDecodeError("utf-8", b"", 0, 1, "bad")]
+        self._http_client.responses["SendMessageBatch"] = [ValueError("Invalid response.")]
+        
+        messages = [QueueMessage(receipt_handle="handle-%s" % i) for i in range(15)]
+        
+        result = self._sqs_client.delete_messages_batch("/123/test-queue", messages)
+        
+        self.assertCountEqual(messages[10:], result.successful)
+        self.assertEqual(messages[:10], [error.message for error in result.failed])
+        self.assertEqual({("ValueError", "Invalid response.", False)}, 
+                         set((error.error_code, error.error_msg, error.sender_fault) for error in result.failed))
+        
+        result = self._sqs_client.change_visibility_batch("/123/test-queue", messages, 30)
+        
+        self.assertCountEqual(messages[:10], result.successful)
+        self.assertEqual(["UnicodeDecodeError"] * 5, [error.error_code for error in result.failed])
+        
+        result = self._sqs_client.create_messages("/123/test-queue", [QueueMessage(body=1)])
+        
+        self.assertEqual(["ValueError"], [error.error_code for error in result.failed])
+    
+    def test_iter_messages(self):
+        '''Test case for checking that iter_messages yields the received messages while the next receives are in flight.'''
+        
+        def receive_message(url, body):
+            time.sleep(0.05)
+            
+            return {"messages": [{"MessageId": "msg-1", "ReceiptHandle": "handle-1", "Body": "1"}] * 2}
+        
+        self._http_client.responses["ReceiveMessage"] = receive_message
+        
+        messages = self._sqs_client.iter_messages("/123/test-queue", wait_time_seconds=5, max_inflight=4)
+        
+        started = time.time()
+        received = [next(messages) for i in range(16)]
+        elapsed = time.time() - started
+        
+        messages.close()
+        
+        self.assertEqual([1] * 16, [message.body for message in received])
+        self.assertLess(elapsed, 0.05 * 8 * 0.75)
+        self.assertLessEqual(len(self._http_client.requests), 8 + 4 + 4)
+        self.assertEqual("5", self._get_params(0)["WaitTimeSeconds"])
+        self.assertRaises(ValueError, self._sqs_client.iter_messages, "/123/test-queue", max_inflight=0)
+    
+    def test_iter_messages_receive_errors(self):
+        '''Test case for checking that iter_messages keeps polling after receives which failed with transient errors.'''
+        
+        message = {"MessageId": "msg-1", "ReceiptHandle": "handle-1", "Body": "1"}
+        unavailable = AwsGenericException(503, "Receiver", "ServiceUnavailable", "Unavailable", "req-1")
+        
+        self._sqs_client._retry_policy = AwsRetryPolicy(max_attempts=1, base_delay=0, max_delay=0)
+        self._http_client.responses["ReceiveMessage"] = [unavailable, unavailable, {"messages": [message]}] * 3
+        
+        with self.assertLogs("aws.sqs.sqs_client", "WARNING") as logs:
+            messages = self._sqs_client.iter_messages("/123/test-queue", max_inflight=1)
+            received = [next(messages) for i in range(3)]
+            
+            messages.close()
+        
+        self.assertEqual([1] * 3, [message.body for message in received])
+        self.assertEqual(6, len(logs.records))
+    
+    def test_iter_messages_non_existent_queue(self):
+        '''Test case for checking that iter_messages raises errors which can not be retried.'''
+        
+        self._http_client.responses["ReceiveMessage"] = AwsSqsNonExistentQueue("Sender", "No queue", "req-1")
+        
+        messages = self._sqs_client.iter_messages("/123/test-queue", max_inflight=2)
+        
+        self.assertRaises(AwsSqsNonExistentQueue, next, messages)
+        self.assertLessEqual(len(self._http_client.requests), 2)
+    
+    def test_create_messages_codec(self):
+        '''Test case for checking that the codec of a message is recorded in a message attribute.'''
+        
+        self._http_client.responses["SendMessage"] = {"MessageId": "msg-1"}
+        self._http_client.responses["SendMessageBatch"] = self._send_message_batch
+        
+        self._sqs_client.create_message(QueueMessage(body={"a": "x" * 4096}, queue_url="/123/test-queue", codec="zlib"))
+        
+        self.assertEqual("codec", self._get_params()["MessageAttribute.1.Name"])
+        self.assertEqual("zlib", self._get_params()["MessageAttribute.1.Value.StringValue"])
+        
+        self._sqs_client.create_messages("/123/test-queue", [QueueMessage(body=1), QueueMessage(body=2, codec="binary")])
+        
+        params = self._get_params()
+        
+        self.assertNotIn("SendMessageBatchRequestEntry.1.MessageAttribute.1.Name", params)
+        self.assertEqual("binary", params["SendMessageBatchRequestEntry.2.MessageAttribute.1.Value.StringValue"])
+        
+        self._sqs_client.get_messages("/123/test-queue")
+        
+        self.assertEqual("codec", self._get_params()["MessageAttributeName.1"])
\ No newline at end of file
@@ -0,0 +1,148 @@
+'''
+Copyright 2013 Cosnita Radu Viorel
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated 
+documentation files (the "Software"), to deal in the Software without restriction, including without limitation 
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, 
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE 
+WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR 
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, 
+ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+.. codeauthor:: Radu Viorel Cosnita <radu.cosnita@gmail.com>
+
+.. py:module:: aws.sqs.tests.sqs_consumer
+
+Module used to provide the test suite for the multi threaded sqs consumer.
+'''
+from aws.sqs.sqs_consumer import SqsConsumer
+from aws.sqs.sqs_domain import QueueBatchResult, QueueMessage
+import threading
+import time
+import unittest
+
+class FakeSqsClient(object):
+    '''Sqs client stand-in which serves a fixed number of messages and records the deleted ones.'''
+    
+    def __init__(self, num_messages):
+        self.pending = [QueueMessage(msg_id="msg-%s" % i, receipt_handle="handle-%s" % i, body=i, queue_url="/123/q")
+                            for i in range(num_messages)]
+        self.deleted = []
+        self.receives = []
+        self._lock = threading.Lock()
+    
+    def get_messages(self, queue_url, max_messages=10, wait_time_seconds=None, visibility_timeout=None):
+        with self._lock:
+            self.receives.append(max_messages)
+            
+            messages, self.pending = self.pending[:max_messages], self.pending[max_messages:]
+        
+        if not messages:
+            time.sleep(0.01)
+        
+        return messages
+    
+    def delete_messages_batch(self, queue_url, messages):
+        with self._lock:
+            self.deleted.extend(message.receipt_handle for message in messages)
+        
+        return QueueBatchResult(successful=list(messages))
+
+class SqsConsumerTests(unittest.TestCase):
+    '''Class used to provide all test cases for the multi threaded sqs consumer.'''
+    
+    def _wait(self, condition):
+        deadline = time.time() + 5
+        
+        while not condition() and time.time() < deadline:
+            time.sleep(0.01)
+    
+    def test_consume(self):
+        '''Test case for making sure every message is processed once and deleted.'''
+        
+        sqs_client = FakeSqsClient(200)
+        processed = []
+        
+        def handler(message):
+            if message.body == 7:
+                raise ValueError("Cannot process message.")
+            
+            processed.append(message.body)
+        
+        consumer = SqsConsumer(sqs_client, "/123/q", handler, receivers=2, workers=4, prefetch=20)
+        
+        with self.assertLogs("aws.sqs.sqs_consumer", "WARNING") as logs:
+            consumer.start()
+            
+            self._wait(lambda: consumer.processed + consumer.handler_errors == 200)
+            
+            consumer.stop()
+        
+        stats = consumer.get_stats()
+        
+        self.assertEqual(1, len(logs.records))
+        self.assertIn("msg-7", logs.output[0])
+        self.assertEqual(sorted(i for i in range(200) if i != 7), sorted(processed))
+        self.assertEqual(199, len(set(sqs_client.deleted)))
+        self.assertNotIn("handle-7", sqs_client.deleted)
+        self.assertEqual(200, stats["received"])
+        self.assertEqual(1, stats["handler_errors"])
+        self.assertEqual(199, stats["deleted"])
+        self.assertEqual(0, stats["prefetched"])
+        self.assertGreater(stats["throughput"], 0)
+    
+    def test_receive_error_logged(self):
+        '''Test case for making sure failed receives are logged and the receivers keep polling.'''
+        
+        sqs_client = FakeSqsClient(10)
+        get_messages = sqs_client.get_messages
+        failures = [ConnectionError("Connection reset.")]
+        
+        def fail_once(*args, **kwargs):
+            if failures:
+                raise failures.pop()
+            
+            return get_messages(*args, **kwargs)
+        
+        sqs_client.get_messages = fail_once
+        
+        consumer = SqsConsumer(sqs_client, "/123/q", lambda message: None, receivers=1, workers=1, prefetch=10)
+        
+        with self.assertLogs("aws.sqs.sqs_consumer", "WARNING") as logs:
+            consumer.start()
+            
+            self._wait(lambda: consumer.processed == 10)
+            
+            consumer.stop()
+        
+        self.assertEqual(1, consumer.receive_errors)
+        self.assertEqual(10, consumer.processed)
+        self.assertIn("/123/q", logs.output[0])
+    
+    def test_prefetch_backpressure(self):
+        '''Test case for making sure receivers stop while the prefetch buffer is full.'''
+        
+        sqs_client = FakeSqsClient(100)
+        gate = threading.Event()
+        
+        consumer = SqsConsumer(sqs_client, "/123/q", lambda message: gate.wait(), receivers=3, workers=2, prefetch=15)
+        consumer.start()
+        
+        self._wait(lambda: consumer.received == 15)
+        time.sleep(0.1)
+        
+        self.assertEqual(15, consumer.received)
+        self.assertEqual(13, consumer.get_stats()["prefetched"])
+        
+        gate.set()
+        
+        self._wait(lambda: consumer.processed == 100)
+        
+        consumer.stop()
+        
+        self.assertEqual(100, consumer.processed)
+        self.assertTrue(all(max_messages <= 10 for max_messages in sqs_client.receives))
\ No newline at end of file
@@ -0,0 +1,129 @@
+'''
+Copyright 2013 Cosnita Radu Viorel
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated 
+documentation files (the "Software"), to deal in the Software without restriction, including without limitation 
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, 
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE 
+WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR 
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, 
+ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+.. codeauthor:: Radu Viorel Cosnita <radu.cosnita@gmail.com>
+
+.. py:module:: aws.sqs.tests.sqs_domain
+
+Module used to provide the test suite for the sqs domain objects.
+'''
+from aws.sqs import sqs_domain
+from aws.sqs.sqs_domain import JsonCodec, QueueMessage, QueueMessageCodecs
+from mock import patch
+import json
+import unittest
+
+class QueueMessageTests(unittest.TestCase):
+    '''Class used to provide all test cases for queue messages.'''
+    
+    def setUp(self):
+        self._aws_message = {"MessageId": "msg-1", "ReceiptHandle": "handle-1", "Body": '{"b":2,  "a":1}'}
+    
+    def test_lazy_body(self):
+        '''Test case for making sure received bodies are decoded only once and only when they are read.'''
+        
+        with patch.object(sqs_domain.json, "loads", side_effect=json.loads) as loads:
+            message = QueueMessage.cast_aws_message(self._aws_message)
+            
+            self.assertEqual(0, loads.call_count)
+            self.assertEqual({"a": 1, "b": 2}, message.body)
+            self.assertEqual({"a": 1, "b": 2}, message.body)
+            self.assertEqual(1, loads.call_count)
+    
+    def test_raw_body_reused(self):
+        '''Test case for making sure a received body which was never read is sent again as is.'''
+        
+        message = QueueMessage.cast_aws_message(self._aws_message)
+        
+        with patch.object(sqs_domain.json, "dumps") as dumps:
+            self.assertEqual('{"b":2,  "a":1}', str(message))
+            self.assertEqual(0, dumps.call_count)
+        
+        message.body["c"] = 3
+        
+        self.assertEqual({"a": 1, "b": 2, "c": 3}, json.loads(str(message)))
+        
+        message.body = [1, 2]
+        
+        self.assertEqual("[1, 2]", str(message))
+        self.assertEqual("[1, 2]", str(QueueMessage(body=[1, 2])))
+        self.assertEqual("[1]", str(QueueMessage(raw_body=b"[1]")))
+    
+    def test_slots(self):
+        '''Test case for making sure queue messages do not carry a __dict__.'''
+        
+        message = QueueMessage(body={"a": 1})
+        
+        self.assertFalse(hasattr(message, "__dict__"))
+        self.assertRaises(AttributeError, setattr, message, "unknown", 1)
+
+class QueueMessageCodecsTests(unittest.TestCase):
+    '''Class used to provide all test cases for the message body codecs.'''
+    
+    def setUp(self):
+        self._body = {"name": "Test \u00e9", "values": [1, -2 ** 40, 2 ** 70, 1.5, None, True, False], "nested": {"a": []}}
+    
+    def test_round_trip(self):
+        '''Test case for making sure every registered codec decodes what it encodes.'''
+        
+        for name in ("json", "json-compact", "binary", "zlib", "lzma"):
+            codec = QueueMessageCodecs.get_codec(name)
+            
+            codec_name, raw_body = codec.encode(self._body)
+            
+            self.assertIsInstance(raw_body, str)
+            self.assertEqual(self._body, QueueMessageCodecs.get_codec(codec_name).decode(raw_body), name)
+    
+    def test_binary_bytes(self):
+        '''Test case for making sure the binary codec supports bytes values and rejects unknown types.'''
+        
+        codec = QueueMessageCodecs.get_codec("binary")
+        
+        self.assertEqual({"data": b"\x00\xff"}, codec.decode(codec.encode({"data": b"\x00\xff"})[1]))
+        self.assertRaises(TypeError, codec.encode, {"data": object()})
+    
+    def test_compression_threshold(self):
+        '''Test case for making sure bodies are compressed only above the threshold and report the codec used.'''
+        
+        codec = QueueMessageCodecs.get_codec("zlib")
+        
+        self.assertEqual(("json-compact", '{"a":1}'), codec.encode({"a": 1}))
+        
+        codec_name, raw_body = codec.encode({"a": "x" * 10000})
+        
+        self.assertEqual("zlib", codec_name)
+        self.assertLess(len(raw_body), 1000)
+    
+    def test_registry(self):
+        '''Test case for making sure codec names are unique and unknown codecs are reported.'''
+        
+        self.assertRaises(ValueError, QueueMessageCodecs.add_codec, JsonCodec())
+        self.assertRaises(ValueError, QueueMessageCodecs.get_codec, "unknown")
+        self.assertEqual("json", QueueMessageCodecs.get_codec().name)
+    
+    def test_message_codec(self):
+        '''Test case for making sure messages are encoded with their codec and received messages are decoded using the
+        codec attribute.'''
+        
+        message = QueueMessage(body=self._body, codec="binary")
+        codec_name, raw_body = message.encode()
+        
+        received = QueueMessage.cast_aws_message({"MessageId": "msg-1", "ReceiptHandle": "handle-1", "Body": raw_body,
+                                                  "MessageAttributes": {"codec": {"StringValue": codec_name,
+                                                                                  "DataType": "String"}}})
+        
+        self.assertEqual("binary", received.codec)
+        self.assertEqual(("binary", raw_body), received.encode())
+        self.assertEqual(self._body, received.body)
\ No newline at end of file
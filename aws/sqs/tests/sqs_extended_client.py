@@ -0,0 +1,212 @@
+'''
+Copyright 2013 Cosnita Radu Viorel
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated 
+documentation files (the "Software"), to deal in the Software without restriction, including without limitation 
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, 
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE 
+WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR 
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, 
+ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+.. codeauthor:: Radu Viorel Cosnita <radu.cosnita@gmail.com>
+
+.. py:module:: aws.sqs.tests.sqs_extended_client
+
+Module used to provide the test suite for the extended sqs client and the file system blob store.
+'''
+from aws.core.aws_exceptions import AwsGenericException
+from aws.core.aws_retry import AwsRetryPolicy
+from aws.sqs.sqs_blob_store import FileSystemBlobStore
+from aws.sqs.sqs_domain import BlobQueueMessage, QueueMessage
+from aws.sqs.sqs_extended_client import SqsExtendedClient
+from aws.sqs.tests.sqs_client import FakeHttpClient
+from mock import patch
+from urllib.parse import parse_qs, urlsplit
+import json
+import os
+import tempfile
+import unittest
+
+class FileSystemBlobStoreTests(unittest.TestCase):
+    '''Class used to provide all test cases for the file system blob store.'''
+    
+    def setUp(self):
+        self._root_dir = tempfile.TemporaryDirectory()
+        self._blob_store = FileSystemBlobStore(os.path.join(self._root_dir.name, "blobs"))
+    
+    def tearDown(self):
+        self._root_dir.cleanup()
+    
+    def test_put_get_delete(self):
+        '''Test case for making sure blobs can be added, read and removed more than once.'''
+        
+        key = self._blob_store.put(b"blob content")
+        
+        self.assertEqual(b"blob content", self._blob_store.get(key))
+        self.assertEqual([key], os.listdir(os.path.join(self._root_dir.name, "blobs")))
+        
+        self._blob_store.delete(key)
+        self._blob_store.delete(key)
+        
+        self.assertRaises(KeyError, self._blob_store.get, key)
+        self.assertRaises(KeyError, self._blob_store.get, "../%s" % key)
+
+class SqsExtendedClientTests(unittest.TestCase):
+    '''Class used to provide all test cases for the extended sqs client.'''
+    
+    def setUp(self):
+        self._root_dir = tempfile.TemporaryDirectory()
+        self._blob_store = FileSystemBlobStore(self._root_dir.name)
+        
+        self._sqs_client = SqsExtendedClient("eu-west-1", self._blob_store, offload_threshold=1024,
+                                             http_client=FakeHttpClient, 
+                                             retry_policy=AwsRetryPolicy(base_delay=0, max_delay=0))
+        self._http_client = self._sqs_client._http_client
+    
+    def tearDown(self):
+        self._root_dir.cleanup()
+    
+    def _get_params(self, request_idx=-1):
+        url, body = self._http_client.requests[request_idx][0], self._http_client.requests[request_idx][-1]
+        
+        return {key: value[0] for key, value in parse_qs(urlsplit(url).query + "&" + body.decode()).items()}
+    
+    def _receive(self, params, prefix=""):
+        '''Method used to answer a ReceiveMessage request with the message sent using the given parameters.'''
+        
+        message = {"MessageId": "msg-1", "ReceiptHandle": "handle-1", "Body": params["%sMessageBody" % prefix]}
+        
+        if "%sMessageAttribute.1.Name" % prefix in params:
+            message["MessageAttributes"] = {"codec": {"StringValue": params["%sMessageAttribute.1.Value.StringValue" %
+                                                                            prefix], "DataType": "String"}}
+        
+        self._http_client.responses["ReceiveMessage"] = {"messages": [message]}
+        
+        return self._sqs_client.get_messages("/123/test-queue")[0]
+    
+    def test_small_message_not_offloaded(self):
+        '''Test case for making sure bodies under the threshold are sent to sqs as is.'''
+        
+        self._http_client.responses["SendMessage"] = {"MessageId": "msg-1"}
+        
+        message = QueueMessage(body={"a": 1}, queue_url="/123/test-queue")
+        
+        self._sqs_client.create_message(message)
+        
+        self.assertEqual('{"a": 1}', self._get_params()["MessageBody"])
+        self.assertEqual([], os.listdir(self._root_dir.name))
+        
+        received = self._receive(self._get_params())
+        
+        self.assertNotIsInstance(received, BlobQueueMessage)
+        self.assertEqual({"a": 1}, received.body)
+    
+    def test_large_message_offloaded(self):
+        '''Test case for making sure large bodies are sent as pointers, fetched lazily and removed on delete.'''
+        
+        self._http_client.responses["SendMessage"] = {"MessageId": "msg-1"}
+        self._http_client.responses["DeleteMessageBatch"] = {"Successful": [{"Id": "1"}]}
+        
+        body = {"a": "x" * 4096}
+        message = QueueMessage(body=body, queue_url="/123/test-queue", codec="binary")
+        
+        self._sqs_client.create_message(message)
+        
+        params = self._get_params()
+        
+        self.assertEqual("blob", params["MessageAttribute.1.Value.StringValue"])
+        self.assertLess(len(params["MessageBody"]), 200)
+        self.assertIsNone(message.blob_key)
+        
+        blob_key = json.loads(params["MessageBody"])["key"]
+        
+        self.assertEqual([blob_key], os.listdir(self._root_dir.name))
+        
+        received = self._receive(params)
+        
+        self.assertIsInstance(received, BlobQueueMessage)
+        self.assertEqual(blob_key, received.blob_key)
+        self.assertEqual("binary", received.codec)
+        
+        with patch.object(self._blob_store, "get", wraps=self._blob_store.get) as get:
+            self.assertEqual(body, received.body)
+            self.assertEqual(body, received.body)
+            
+            self.assertEqual(1, get.call_count)
+        
+        self._sqs_client.delete_messages("/123/test-queue", [received])
+        
+        self.assertEqual([], os.listdir(self._root_dir.name))
+    
+    def test_large_messages_batch(self):
+        '''Test case for making sure batches offload only the large bodies and drop the blobs of failed entries.'''
+        
+        self._http_client.responses["SendMessageBatch"] = \
+                {"Successful": [{"Id": "0", "MessageId": "msg-0"}],
+                 "Failed": [{"Id": "1", "Code": "InternalError", "Message": "Try again.", "SenderFault": False}]}
+        
+        messages = [QueueMessage(body="x" * 2048), QueueMessage(body="y" * 2048), QueueMessage(body=1)]
+        
+        result = self._sqs_client.create_messages("/123/test-queue", messages)
+        
+        self.assertEqual([messages[1]], [error.message for error in result.failed])
+        
+        params = self._get_params()
+        
+        self.assertNotIn("SendMessageBatchRequestEntry.3.MessageAttribute.1.Name", params)
+        self.assertEqual([json.loads(params["SendMessageBatchRequestEntry.1.MessageBody"])["key"]], 
+                         os.listdir(self._root_dir.name))
+        
+        received = self._receive(params, "SendMessageBatchRequestEntry.1.")
+        
+        self.assertEqual("x" * 2048, received.body)
+        self.assertEqual('"%s"' % ("x" * 2048), str(received))
+    
+    def test_failed_send_removes_blob(self):
+        '''Test case for making sure the blob of a message which could not be sent is removed.'''
+        
+        self._http_client.responses["SendMessage"] = AwsGenericException(403, "Sender", "AccessDenied", "Denied.", "r")
+        
+        message = QueueMessage(body="x" * 2048, queue_url="/123/test-queue")
+        
+        self.assertRaises(AwsGenericException, self._sqs_client.create_message, message)
+        self.assertEqual([], os.listdir(self._root_dir.name))
+    
+    def test_failed_upload_removes_blobs(self):
+        '''Test case for making sure blobs uploaded for a batch are removed when the batch can not be sent at all.'''
+        
+        put = self._blob_store.put
+        
+        with patch.object(self._blob_store, "put", side_effect=[put(b"first"), OSError("Disk full.")]):
+            self.assertRaises(OSError, self._sqs_client.create_messages, "/123/test-queue", 
+                              [QueueMessage(body="x" * 2048), QueueMessage(body="y" * 2048)])
+        
+        self.assertEqual([], os.listdir(self._root_dir.name))
+    
+    def test_forward_received_message(self):
+        '''Test case for making sure forwarding a received offloaded message keeps a blob for the forwarded copy after
+        the original message is deleted.'''
+        
+        self._http_client.responses["SendMessage"] = {"MessageId": "msg-1"}
+        self._http_client.responses["DeleteMessageBatch"] = {"Successful": [{"Id": "1"}]}
+        
+        self._sqs_client.create_message(QueueMessage(body="x" * 2048, queue_url="/123/src-queue"))
+        
+        original = self._receive(self._get_params())
+        original.queue_url = "/123/dst-queue"
+        
+        self._sqs_client.create_message(original)
+        
+        forwarded = self._receive(self._get_params())
+        
+        self.assertNotEqual(original.blob_key, forwarded.blob_key)
+        
+        self._sqs_client.delete_messages("/123/src-queue", [original])
+        
+        self.assertEqual([forwarded.blob_key], os.listdir(self._root_dir.name))
+        self.assertEqual("x" * 2048, forwarded.body)
\ No newline at end of file
@@ -0,0 +1,103 @@
+'''
+Copyright 2013 Cosnita Radu Viorel
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated 
+documentation files (the "Software"), to deal in the Software without restriction, including without limitation 
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, 
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE 
+WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR 
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, 
+ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+.. codeauthor:: Radu Viorel Cosnita <radu.cosnita@gmail.com>
+
+.. py:module:: aws.sqs.tests.sqs_heartbeat
+
+Module used to provide the test suite for the visibility timeout heartbeat.
+'''
+from aws.sqs.sqs_domain import QueueBatchError, QueueBatchResult, QueueMessage
+from aws.sqs.sqs_heartbeat import SqsHeartbeat
+import threading
+import time
+import unittest
+
+class FakeSqsClient(object):
+    '''Sqs client stand-in which records the visibility changes and rejects the receipt handles it is told to.'''
+    
+    def __init__(self, invalid_handles=()):
+        self.changes = []
+        self.invalid_handles = invalid_handles
+        self._lock = threading.Lock()
+    
+    def change_visibility_batch(self, queue_url, messages, visibility_timeout):
+        result = QueueBatchResult()
+        
+        with self._lock:
+            self.changes.append((queue_url, [message.receipt_handle for message in messages], visibility_timeout))
+        
+        for message in messages:
+            if message.receipt_handle in self.invalid_handles:
+                result.failed.append(QueueBatchError(message, "ReceiptHandleIsInvalid", "Invalid.", True))
+            else:
+                result.successful.append(message)
+        
+        return result
+
+class SqsHeartbeatTests(unittest.TestCase):
+    '''Class used to provide all test cases for the visibility timeout heartbeat.'''
+    
+    def _get_message(self, i, queue_url="/123/q"):
+        return QueueMessage(msg_id="msg-%s" % i, receipt_handle="handle-%s" % i, queue_url=queue_url)
+    
+    def test_extend_until_untracked(self):
+        '''Test case for making sure tracked messages are extended in batches per queue until they are untracked.'''
+        
+        sqs_client = FakeSqsClient()
+        heartbeat = SqsHeartbeat(sqs_client, visibility_timeout=0.4, margin=0.2)
+        
+        messages = [self._get_message(i, "/123/q%s" % (i % 2)) for i in range(24)]
+        
+        for message in messages:
+            heartbeat.track(message)
+        
+        time.sleep(0.3)
+        
+        self.assertEqual({"/123/q0", "/123/q1"}, set(change[0] for change in sqs_client.changes))
+        self.assertEqual(24, sum(len(change[1]) for change in sqs_client.changes))
+        self.assertEqual(0.4, sqs_client.changes[0][2])
+        
+        for message in messages:
+            heartbeat.untrack(message)
+        
+        changes = len(sqs_client.changes)
+        time.sleep(0.5)
+        
+        self.assertEqual(changes, len(sqs_client.changes))
+        self.assertEqual(0, len(heartbeat))
+        
+        heartbeat.close()
+    
+    def test_failed_extension(self):
+        '''Test case for making sure messages which cannot be extended are not tracked anymore.'''
+        
+        sqs_client = FakeSqsClient(invalid_handles=("handle-1", ))
+        heartbeat = SqsHeartbeat(sqs_client, visibility_timeout=0.2)
+        
+        heartbeat.track(self._get_message(0))
+        heartbeat.track(self._get_message(1))
+        
+        time.sleep(0.35)
+        heartbeat.close()
+        
+        self.assertEqual(["ReceiptHandleIsInvalid"], [error.error_code for message, error in heartbeat.errors])
+        self.assertGreaterEqual(heartbeat.extended, 2)
+        self.assertTrue(all(change[1] == ["handle-0"] for change in sqs_client.changes[1:]))
+    
+    def test_invalid_margin(self):
+        '''Test case for making sure the margin must be smaller than the visibility timeout.'''
+        
+        self.assertRaises(ValueError, SqsHeartbeat, FakeSqsClient(), visibility_timeout=2, margin=2)
\ No newline at end of file
@@ -0,0 +1,106 @@
+'''
+Copyright 2013 Cosnita Radu Viorel
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated 
+documentation files (the "Software"), to deal in the Software without restriction, including without limitation 
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, 
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE 
+WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR 
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, 
+ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+.. codeauthor:: Radu Viorel Cosnita <radu.cosnita@gmail.com>
+
+.. py:module:: aws.sqs.tests.sqs_poller
+
+Module used to provide the test suite for the adaptive sqs pollers.
+'''
+from aws.sqs.sqs_domain import QueueMessage
+from aws.sqs.sqs_poller import AsyncSqsAdaptivePoller, SqsAdaptivePoller
+import unittest
+
+class FakeSqsClient(object):
+    '''Sqs client stand-in which answers receives with a scripted list of batch sizes and records the wait times.'''
+    
+    def __init__(self, batch_sizes):
+        self.batch_sizes = list(batch_sizes)
+        self.wait_times = []
+    
+    def get_messages(self, queue_url, max_messages=10, wait_time_seconds=None, visibility_timeout=None):
+        self.wait_times.append(wait_time_seconds)
+        
+        return [QueueMessage(body=i, queue_url=queue_url) for i in range(self.batch_sizes.pop(0))]
+
+class AsyncFakeSqsClient(FakeSqsClient):
+    '''Asyncio flavour of the fake sqs client.'''
+    
+    async def get_messages(self, queue_url, max_messages=10, wait_time_seconds=None, visibility_timeout=None):
+        return super().get_messages(queue_url, max_messages, wait_time_seconds, visibility_timeout)
+
+class SqsAdaptivePollerTests(unittest.TestCase):
+    '''Class used to provide all test cases for the adaptive sqs poller.'''
+    
+    def test_idle_queue_long_polls(self):
+        '''Test case for making sure an idle queue is always long polled.'''
+        
+        sqs_client = FakeSqsClient([0] * 10)
+        poller = SqsAdaptivePoller(sqs_client, "/123/test-queue")
+        
+        for i in range(10):
+            self.assertEqual([], poller.poll())
+        
+        self.assertEqual([20] * 10, sqs_client.wait_times)
+        self.assertEqual(10, poller.empty_receives)
+    
+    def test_switch_modes(self):
+        '''Test case for making sure a busy queue is short polled and the poller goes back to long polls once receives
+        come back empty.'''
+        
+        sqs_client = FakeSqsClient([10] * 6 + [0] * 3)
+        poller = SqsAdaptivePoller(sqs_client, "/123/test-queue", max_wait_time=10)
+        
+        for i in range(9):
+            poller.poll()
+        
+        self.assertEqual([10] * 5 + [0] * 3 + [10], sqs_client.wait_times)
+        self.assertEqual(9, poller.receives)
+        self.assertEqual(3, poller.empty_receives)
+        self.assertEqual(10, poller.wait_time)
+    
+    def test_iter(self):
+        '''Test case for making sure iterating a poller yields the received messages.'''
+        
+        poller = SqsAdaptivePoller(FakeSqsClient([0, 2, 1]), "/123/test-queue")
+        messages = iter(poller)
+        
+        self.assertEqual([0, 1, 0], [next(messages).body for i in range(3)])
+    
+    def test_invalid_thresholds(self):
+        '''Test case for making sure inconsistent thresholds are rejected.'''
+        
+        self.assertRaises(ValueError, SqsAdaptivePoller, None, "/123/test-queue", long_poll_threshold=0.1, 
+                          short_poll_threshold=0.5)
+
+class AsyncSqsAdaptivePollerTests(unittest.IsolatedAsyncioTestCase):
+    '''Class used to provide all test cases for the asyncio adaptive sqs poller.'''
+    
+    async def test_iter(self):
+        '''Test case for making sure the asyncio poller yields the received messages and adapts its wait time.'''
+        
+        sqs_client = AsyncFakeSqsClient([0] + [10] * 6)
+        poller = AsyncSqsAdaptivePoller(sqs_client, "/123/test-queue")
+        
+        bodies = []
+        
+        async for message in poller:
+            bodies.append(message.body)
+            
+            if len(bodies) == 60:
+                break
+        
+        self.assertEqual(list(range(10)) * 6, bodies)
+        self.assertEqual([20] * 6 + [0], sqs_client.wait_times)
\ No newline at end of file
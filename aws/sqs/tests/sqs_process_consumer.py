@@ -0,0 +1,175 @@
+'''
+Copyright 2013 Cosnita Radu Viorel
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated 
+documentation files (the "Software"), to deal in the Software without restriction, including without limitation 
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, 
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE 
+WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR 
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, 
+ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+.. codeauthor:: Radu Viorel Cosnita <radu.cosnita@gmail.com>
+
+.. py:module:: aws.sqs.tests.sqs_process_consumer
+
+Module used to provide the test suite for the process pool sqs consumer.
+'''
+from aws.sqs.sqs_domain import QueueMessage, QueueMessageCodecs
+from aws.sqs.sqs_process_consumer import SharedMemoryRing, SqsProcessConsumer
+from aws.sqs.tests.sqs_consumer import FakeSqsClient
+import os
+import time
+import unittest
+
+def handle_body(body):
+    '''Handler used by the worker processes. It fails for odd bodies larger than 100.'''
+    
+    if isinstance(body, int) and body > 100 and body % 2:
+        raise ValueError("Cannot process %s." % body)
+
+def handle_document(document):
+    '''Handler used by the worker processes. It fails unless it receives the decoded document.'''
+    
+    if document != {"data": "x" * 4096}:
+        raise ValueError("Unexpected body %r." % (document,))
+
+def handle_or_die(body):
+    '''Handler used by the worker processes. The worker process handling body 5 dies.'''
+    
+    if body == 5:
+        os._exit(1)
+
+class SharedMemoryRingTests(unittest.TestCase):
+    '''Class used to provide all test cases for the shared memory ring.'''
+    
+    def test_write_release(self):
+        '''Test case for making sure records are allocated contiguously, wrap around and are freed in order.'''
+        
+        ring = SharedMemoryRing(10)
+        
+        self.assertEqual(0, ring.write(b"abcd"))
+        self.assertEqual(4, ring.write(b"efgh"))
+        self.assertIsNone(ring.write(b"ijk"))
+        
+        ring.release()
+        
+        self.assertEqual(8, ring.write(b"ij"))
+        self.assertEqual(0, ring.write(b"klm"))
+        self.assertEqual(3, ring.write(b"n"))
+        self.assertIsNone(ring.write(b"o"))
+        self.assertEqual(b"klmnefghij", ring.buffer.raw)
+        
+        ring.release()
+        ring.release()
+        ring.release()
+        ring.release()
+        
+        self.assertEqual(0, len(ring))
+        self.assertEqual(0, ring.write(b""))
+        self.assertIsNone(SharedMemoryRing(10).write(b"a" * 11))
+
+class SqsProcessConsumerTests(unittest.TestCase):
+    '''Class used to provide all test cases for the process pool sqs consumer.'''
+    
+    def test_consume(self):
+        '''Test case for making sure bodies are handled by the worker processes and successful messages are deleted.'''
+        
+        sqs_client = FakeSqsClient(200)
+        sqs_client.pending[150].body = "a" * 2048
+        
+        consumer = SqsProcessConsumer(sqs_client, "/123/q", handle_body, processes=2, ring_size=1024, prefetch=50)
+        consumer.start()
+        
+        deadline = time.time() + 10
+        
+        while consumer.processed + consumer.handler_errors < 200 and time.time() < deadline:
+            time.sleep(0.01)
+        
+        consumer.stop()
+        
+        failed = ["handle-%s" % i for i in range(101, 200, 2)]
+        
+        self.assertEqual(200 - len(failed), consumer.processed)
+        self.assertEqual(len(failed), consumer.handler_errors)
+        self.assertEqual(set("handle-%s" % i for i in range(200)) - set(failed), set(sqs_client.deleted))
+    
+    def test_consume_compressed(self):
+        '''Test case for making sure compressed bodies are decoded with their codec before reaching the handler.'''
+        
+        codec, raw_body = QueueMessageCodecs.get_codec("zlib").encode({"data": "x" * 4096})
+        
+        self.assertEqual("zlib", codec)
+        
+        sqs_client = FakeSqsClient(0)
+        sqs_client.pending = [QueueMessage(msg_id="msg-%s" % i, receipt_handle="handle-%s" % i, queue_url="/123/q",
+                                           raw_body=raw_body, codec=codec) for i in range(10)]
+        
+        consumer = SqsProcessConsumer(sqs_client, "/123/q", handle_document, processes=2, ring_size=1024)
+        consumer.start()
+        
+        deadline = time.time() + 10
+        
+        while consumer.processed + consumer.handler_errors < 10 and time.time() < deadline:
+            time.sleep(0.01)
+        
+        consumer.stop()
+        
+        self.assertEqual(10, consumer.processed)
+        self.assertEqual(0, consumer.handler_errors)
+        self.assertEqual(set("handle-%s" % i for i in range(10)), set(sqs_client.deleted))
+    
+    def test_dead_worker_replaced(self):
+        '''Test case for making sure the consumer keeps making progress after a worker process died.'''
+        
+        sqs_client = FakeSqsClient(100)
+        
+        consumer = SqsProcessConsumer(sqs_client, "/123/q", handle_or_die, processes=2, prefetch=20)
+        
+        with self.assertLogs("aws.sqs.sqs_process_consumer", "WARNING") as logs:
+            consumer.start()
+            
+            deadline = time.time() + 10
+            
+            def get_progress():
+                return consumer.processed + consumer.handler_errors, sum(process.is_alive() 
+                                                                         for process in consumer._processes)
+            
+            while get_progress() != (100, 2) and time.time() < deadline:
+                time.sleep(0.01)
+            
+            handled, alive = get_progress()
+            
+            consumer.stop()
+        
+        self.assertEqual(100, handled)
+        self.assertEqual(2, alive)
+        self.assertGreater(consumer.handler_errors, 0)
+        self.assertNotIn("handle-5", sqs_client.deleted)
+        self.assertIn("Worker process", logs.output[0])
+    
+    def test_stop_dead_worker(self):
+        '''Test case for making sure stop fails the messages of a worker process which died instead of waiting for them.'''
+        
+        sqs_client = FakeSqsClient(50)
+        
+        consumer = SqsProcessConsumer(sqs_client, "/123/q", handle_or_die, processes=2, prefetch=50)
+        consumer.start()
+        
+        deadline = time.time() + 10
+        
+        while consumer.processed < 20 and time.time() < deadline:
+            time.sleep(0.01)
+        
+        started = time.time()
+        consumer.stop()
+        
+        self.assertLess(time.time() - started, 5)
+        self.assertEqual(50, consumer.processed + consumer.handler_errors)
+        self.assertGreater(consumer.handler_errors, 0)
+        self.assertNotIn("handle-5", sqs_client.deleted)
+        self.assertEqual(consumer.processed, len(sqs_client.deleted))
\ No newline at end of file
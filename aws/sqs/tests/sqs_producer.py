@@ -0,0 +1,134 @@
+'''
+Copyright 2013 Cosnita Radu Viorel
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated 
+documentation files (the "Software"), to deal in the Software without restriction, including without limitation 
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, 
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE 
+WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR 
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, 
+ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+.. codeauthor:: Radu Viorel Cosnita <radu.cosnita@gmail.com>
+
+.. py:module:: aws.sqs.tests.sqs_producer
+
+Module used to provide the test suite for the buffered sqs producer.
+'''
+from aws.core.aws_exceptions import AwsGenericException
+from aws.sqs.sqs_domain import QueueBatchError, QueueBatchResult, QueueMessage
+from aws.sqs.sqs_producer import SqsProducer
+import queue
+import threading
+import time
+import unittest
+
+class FakeSqsClient(object):
+    '''Sqs client stand-in which records the batches it receives.'''
+    
+    def __init__(self, failed_bodies=(), gate=None):
+        self.batches = []
+        self.failed_bodies = failed_bodies
+        self.gate = gate
+    
+    def create_messages(self, queue_url, messages):
+        if self.gate is not None:
+            self.gate.wait()
+        
+        self.batches.append((queue_url, messages))
+        
+        result = QueueBatchResult()
+        
+        for message in messages:
+            if message.body in self.failed_bodies:
+                result.failed.append(QueueBatchError(message, "InternalError", "Try again.", False))
+                continue
+            
+            message.msg_id = "msg-%s" % message.body
+            result.successful.append(message)
+        
+        return result
+
+class SqsProducerTests(unittest.TestCase):
+    '''Class used to provide all test cases for the buffered sqs producer.'''
+    
+    def test_full_batches(self):
+        '''Test case for making sure buffers are sent as soon as they hold 10 messages.'''
+        
+        sqs_client = FakeSqsClient()
+        producer = SqsProducer(sqs_client, linger=60)
+        
+        futures = [producer.send(QueueMessage(body=i, queue_url="/123/q%s" % (i % 2))) for i in range(40)]
+        
+        self.assertEqual(["msg-%s" % i for i in range(40)], [future.result(timeout=5) for future in futures])
+        self.assertEqual([10] * 4, [len(batch[1]) for batch in sqs_client.batches])
+        self.assertEqual({"/123/q0", "/123/q1"}, {batch[0] for batch in sqs_client.batches})
+        
+        producer.close()
+    
+    def test_linger(self):
+        '''Test case for making sure a partial buffer is sent once its linger deadline passes.'''
+        
+        sqs_client = FakeSqsClient()
+        producer = SqsProducer(sqs_client, linger=0.05)
+        
+        started = time.time()
+        future = producer.send(QueueMessage(body=1, queue_url="/123/q"))
+        
+        self.assertEqual("msg-1", future.result(timeout=5))
+        self.assertGreaterEqual(time.time() - started, 0.04)
+        self.assertEqual(1, len(sqs_client.batches))
+        
+        producer.close()
+    
+    def test_bytes_threshold(self):
+        '''Test case for making sure buffers are sent before they go over the bytes threshold.'''
+        
+        sqs_client = FakeSqsClient()
+        producer = SqsProducer(sqs_client, linger=60, batch_max_size=1024)
+        
+        for i in range(5):
+            producer.send(QueueMessage(body="%s%s" % (i, "a" * 400), queue_url="/123/q"))
+        
+        producer.close()
+        
+        self.assertEqual([2, 2, 1], [len(batch[1]) for batch in sqs_client.batches])
+    
+    def test_failures(self):
+        '''Test case for making sure failed entries resolve their futures with an exception.'''
+        
+        producer = SqsProducer(FakeSqsClient(failed_bodies=(1, )), linger=0.01)
+        
+        futures = [producer.send(QueueMessage(body=i, queue_url="/123/q")) for i in range(3)]
+        
+        producer.flush()
+        
+        self.assertEqual("msg-0", futures[0].result())
+        self.assertEqual("msg-2", futures[2].result())
+        self.assertRaises(AwsGenericException, futures[1].result)
+        self.assertEqual("InternalError", futures[1].exception().error_code)
+        
+        producer.close()
+    
+    def test_backpressure(self):
+        '''Test case for making sure send blocks once max_buffered messages wait to be sent.'''
+        
+        gate = threading.Event()
+        producer = SqsProducer(FakeSqsClient(gate=gate), linger=0.01, max_buffered=10)
+        
+        futures = [producer.send(QueueMessage(body=i, queue_url="/123/q")) for i in range(10)]
+        
+        self.assertRaises(queue.Full, producer.send, QueueMessage(body=10, queue_url="/123/q"), timeout=0.05)
+        
+        gate.set()
+        
+        futures.append(producer.send(QueueMessage(body=10, queue_url="/123/q"), timeout=5))
+        
+        producer.close()
+        
+        self.assertEqual(["msg-%s" % i for i in range(11)], [future.result() for future in futures])
+        self.assertRaises(ValueError, producer.send, QueueMessage(body=11, queue_url="/123/q"))
\ No newline at end of file